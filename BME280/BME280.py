@@ -27,26 +27,43 @@ SOFTWARE.
 Capture data from BME280 attached to Raspberry Pi I2C bus.
 I2C pins: data / clock are board pins 3 / 5
 
-This puts the chip in a mode that is continuously taking samples and 
-smoothing the values to try to eliminate spurious data.  The sample rate
-is 250 mSec and 8 samples are smoothed so changes take about 2 seconds
-to be fully integrated in to the retrieved values.
+By default this puts the chip in a mode that is continuously taking
+samples and smoothing the values to try to eliminate spurious data.  The 
+sample rate is about 300 mSec and 8 samples are smoothed so changes take
+about 2.5 seconds to be fully integrated in to the retrieved values.  Other
+rates and amounts of smoothing are picked with the profile argument, see
+BME280_PROFILES, and the constructor waits for as long as the chosen
+profile takes to settle.
+
+The calibration data and configuration are cached on disk, see 
+calibration_cache.py.  A driver constructed while the chip is still running
+the profile asked for, e.g. after a program restart, skips the reset and
+only waits for what is left of the settle time.
+
+The bus is opened as an i2c_bus_manager.LockedSMBus so programs sharing
+a bus, e.g. a sample program and SensorsDaemon.py, do not interleave 
+their transfers.
+
+start_burst() switches to the fastest rate with no smoothing and collects
+raw readings in a ring buffer, see BME280_Burst.py, to catch short 
+pressure changes such as doors opening.
 
 Official datasheet available from :
 https://www.bosch-sensortec.com/bst/products/all_products/bme280
 """
 
-from ctypes import c_short
-from ctypes import c_ushort
-from ctypes import c_byte
-from ctypes import c_ubyte
-import hashlib
-import smbus
+import contextlib
+import os
+import sys
 import time
 
+import BME280_Compensation
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import calibration_cache
+import i2c_bus_manager
+
 DEBUG = 0
-if DEBUG:
-    import sys
 
 BME280_DEFAULT_I2C_ADDR = 0x76  # Default device I2C address
 
@@ -60,8 +77,15 @@ BME280_REG_RESET_ADDR   = 0xE0
 BME280_CALIBRATION_3_BASE_ADDR   = 0xE1
 BME280_CALIBRATION_3_COUNT   = 7
 BME280_REG_CONTROL_HUM_ADDR = 0xF2
+BME280_REG_CONTROL_HUM_MASK = 0x07
+BME280_REG_CONTROL_BLOCK_ADDR = BME280_REG_CONTROL_HUM_ADDR  # ctrl_hum, status, ctrl_meas, config
+BME280_REG_CONTROL_BLOCK_COUNT = 4
+BME280_REG_STATUS_ADDR = 0xF3
+BME280_REG_STATUS_MEASURING = 0x08  # set while a conversion is running
+BME280_REG_STATUS_IM_UPDATE = 0x01  # set while calibration data is copied
 BME280_REG_CONTROL_MEAS_ADDR = 0xF4
 BME280_REG_CONFIG_ADDR = 0xF5
+BME280_REG_CONFIG_MASK = 0xFD  # bit 1 is reserved
 BME280_REG_DATA_ADDR = 0xF7
 BME280_REG_DATA_COUNT = 8
 BME280_REG_HUM_MSB_ADDR = 0xFD
@@ -94,6 +118,7 @@ BME280_REG_CONTROL_MEAS_P_OS_16 = 0x14 # Temp oversampling x 16
 BME280_REG_CONTROL_MEAS_MODE_SLEEP = 0x00 # no measurements
 BME280_REG_CONTROL_MEAS_MODE_FORCED = 0x01 # Forced -- one measurement
 BME280_REG_CONTROL_MEAS_MODE_NORMAL = 0x03 # Normal -- runs continually
+BME280_REG_CONTROL_MEAS_MODE_MASK = 0x03
 BME280_REG_CONTROL_MEAS_VALUE = (BME280_REG_CONTROL_MEAS_T_OS_8 |
                                  BME280_REG_CONTROL_MEAS_P_OS_8 |
                                  BME280_REG_CONTROL_MEAS_MODE_NORMAL)
@@ -113,105 +138,208 @@ BME280_REG_CONFIG_FILTER_8 = 0x0C
 BME280_REG_CONFIG_FILTER_16 = 0x10
 BME280_REG_CONFIG_VALUE = (BME280_REG_CONFIG_T_SB_MS_250 | BME280_REG_CONFIG_FILTER_8)
 
+# Profiles of (ctrl_hum, ctrl_meas, config) register values, mostly from
+# the recommended modes of operation in section 3.5 of the datasheet
+BME280_PROFILE_DEFAULT = 'default'
+BME280_PROFILE_WEATHER = 'weather'
+BME280_PROFILE_INDOOR_NAVIGATION = 'indoor_navigation'
+BME280_PROFILE_GAMING = 'gaming'
+BME280_PROFILE_HIGH_RATE = 'high_rate'
+BME280_PROFILES = {
+    # smoothed readings 3 times a second, what this driver always did
+    BME280_PROFILE_DEFAULT: (BME280_REG_CONTROL_HUM_VALUE,
+                             BME280_REG_CONTROL_MEAS_VALUE,
+                             BME280_REG_CONFIG_VALUE),
+    # lowest power, the chip sleeps till a reading is asked for (FORCED mode)
+    BME280_PROFILE_WEATHER: (BME280_REG_CONTROL_HUM_OS_1,
+                             (BME280_REG_CONTROL_MEAS_T_OS_1 |
+                              BME280_REG_CONTROL_MEAS_P_OS_1 |
+                              BME280_REG_CONTROL_MEAS_MODE_FORCED),
+                             (BME280_REG_CONFIG_T_SB_MS_1000 | BME280_REG_CONFIG_FILTER_OFF)),
+    # low noise pressure about 20 times a second
+    BME280_PROFILE_INDOOR_NAVIGATION: (BME280_REG_CONTROL_HUM_OS_1,
+                                       (BME280_REG_CONTROL_MEAS_T_OS_2 |
+                                        BME280_REG_CONTROL_MEAS_P_OS_16 |
+                                        BME280_REG_CONTROL_MEAS_MODE_NORMAL),
+                                       (BME280_REG_CONFIG_T_SB_MS_0_5 | BME280_REG_CONFIG_FILTER_16)),
+    # filtered pressure about 70 times a second, no humidity
+    BME280_PROFILE_GAMING: (BME280_REG_CONTROL_HUM_OS_NONE,
+                            (BME280_REG_CONTROL_MEAS_T_OS_1 |
+                             BME280_REG_CONTROL_MEAS_P_OS_4 |
+                             BME280_REG_CONTROL_MEAS_MODE_NORMAL),
+                            (BME280_REG_CONFIG_T_SB_MS_0_5 | BME280_REG_CONFIG_FILTER_16)),
+    # fastest rate with no smoothing, for catching short transients
+    BME280_PROFILE_HIGH_RATE: (BME280_REG_CONTROL_HUM_OS_1,
+                               (BME280_REG_CONTROL_MEAS_T_OS_1 |
+                                BME280_REG_CONTROL_MEAS_P_OS_1 |
+                                BME280_REG_CONTROL_MEAS_MODE_NORMAL),
+                               (BME280_REG_CONFIG_T_SB_MS_0_5 | BME280_REG_CONFIG_FILTER_OFF)),
+    }
+BME280_DEFAULT_PROFILE = BME280_PROFILE_DEFAULT
+BME280_BURST_PROFILE = BME280_PROFILE_HIGH_RATE
+BME280_DEFAULT_BURST_CAPACITY = 4096  # frames, about 40 seconds at full rate
+
+# oversampling factor for each osrs_* register code, 5 and above are x 16
+OVERSAMPLING_FACTORS = (0, 1, 2, 4, 8, 16, 16, 16)
+# standby time in seconds for each t_sb register code
+STANDBY_TIMES_IN_SECONDS = (0.0005, 0.0625, 0.125, 0.25, 0.5, 1.0, 0.010, 0.020)
+# readings averaged by the IIR filter for each filter register code
+FILTER_COEFFICIENTS = (1, 2, 4, 8, 16, 16, 16, 16)
+
+BME280_STATUS_POLL_INTERVAL_IN_SECONDS = 0.0005
+BME280_FORCED_WAIT_POLL = 'poll'    # poll the status register till done
+BME280_FORCED_WAIT_SLEEP = 'sleep'  # sleep the maximum measurement time
+BME280_FORCED_WAITS = (BME280_FORCED_WAIT_POLL, BME280_FORCED_WAIT_SLEEP)
+
 BME280_RESET_TIME_IN_SECONDS = 0.001    # not specified, this seems like enough
-BME280_SETTLE_TIME_IN_SECONDS = 0.25 * 8 # normal update every 250 mS x 8 samples
+BME280_SETTLE_TIME_IN_SECONDS = 0.25 * 8 # normal update every 250 mS x 8 samples,
+                                         # see settle_time_in_seconds()
 
 SENSOR_TYPE_NAME = 'BME280'
 
 
+def max_measurement_time_in_seconds(control_hum, control_meas):
+    """
+    Return the longest time one measurement takes for the register
+    values of ctrl_hum and ctrl_meas, per appendix B of the datasheet.
+    """
+    t_os = OVERSAMPLING_FACTORS[(control_meas >> 5) & 0x07]
+    p_os = OVERSAMPLING_FACTORS[(control_meas >> 2) & 0x07]
+    h_os = OVERSAMPLING_FACTORS[control_hum & 0x07]
+    ms = 1.25 + 2.3 * t_os
+    if p_os:
+        ms += 2.3 * p_os + 0.575
+    if h_os:
+        ms += 2.3 * h_os + 0.575
+    return ms / 1000.0
+
+
+def typical_measurement_time_in_seconds(control_hum, control_meas):
+    """
+    Return the typical time one measurement takes for the register
+    values of ctrl_hum and ctrl_meas, per appendix B of the datasheet.
+    """
+    t_os = OVERSAMPLING_FACTORS[(control_meas >> 5) & 0x07]
+    p_os = OVERSAMPLING_FACTORS[(control_meas >> 2) & 0x07]
+    h_os = OVERSAMPLING_FACTORS[control_hum & 0x07]
+    ms = 1.0 + 2.0 * t_os
+    if p_os:
+        ms += 2.0 * p_os + 0.5
+    if h_os:
+        ms += 2.0 * h_os + 0.5
+    return ms / 1000.0
+
+
+def normal_mode_period_in_seconds(control_hum, control_meas, config):
+    """
+    Return the time between measurements in NORMAL mode for the register
+    values of ctrl_hum, ctrl_meas and config.
+    """
+    return (max_measurement_time_in_seconds(control_hum, control_meas) +
+            STANDBY_TIMES_IN_SECONDS[(config >> 5) & 0x07])
+
+
+def settle_time_in_seconds(control_hum, control_meas, config):
+    """
+    Return how long to wait after configuring NORMAL mode for the filter
+    to hold a full set of readings.  FORCED mode readings are taken when
+    asked for so there is nothing to wait for.
+    """
+    if (control_meas & BME280_REG_CONTROL_MEAS_MODE_MASK) != BME280_REG_CONTROL_MEAS_MODE_NORMAL:
+        return 0.0
+    return (normal_mode_period_in_seconds(control_hum, control_meas, config) *
+            FILTER_COEFFICIENTS[(config >> 2) & 0x07])
+
+
+def configured_registers(control_hum, control_meas, config):
+    """
+    Return the (ctrl_hum, ctrl_meas, config) values read back from a chip
+    configured with these values, without the reserved bits.  A FORCED
+    mode chip reads back in SLEEP mode between measurements.
+    """
+    if (control_meas & BME280_REG_CONTROL_MEAS_MODE_MASK) == BME280_REG_CONTROL_MEAS_MODE_FORCED:
+        control_meas &= ~BME280_REG_CONTROL_MEAS_MODE_MASK
+    return (control_hum & BME280_REG_CONTROL_HUM_MASK,
+            control_meas,
+            config & BME280_REG_CONFIG_MASK)
+
+
 class BME280:
     
-    def __init__(self, i2c_bus=None, i2c_addr=BME280_DEFAULT_I2C_ADDR):
+    def __init__(self, i2c_bus=None, i2c_addr=BME280_DEFAULT_I2C_ADDR,
+                 profile=BME280_DEFAULT_PROFILE,
+                 cache_directory=calibration_cache.DEFAULT_CACHE_DIRECTORY,
+                 smbus_handle=None):
+        if profile not in BME280_PROFILES:
+            raise ValueError('profile "{}" is not one of {}'.format(profile,
+                                                                  sorted(BME280_PROFILES.keys())))
         self.__i2c_bus = i2c_bus
         self.__i2c_addr = i2c_addr
         
-        if self.__i2c_bus:
+        if smbus_handle is not None:
+            # shared with other drivers, e.g. by i2c_bus_manager
+            if self.__i2c_bus is None:
+                raise ValueError('i2c_bus must be given with smbus_handle')
+            self.__smbus = smbus_handle
+        elif self.__i2c_bus:
             # a bus was specified use only that value
-            self.__smbus = smbus.SMBus(self.__i2c_bus)
+            self.__smbus = i2c_bus_manager.LockedSMBus(self.__i2c_bus)
         else:
             try: # the usual address is tried first
-                self.__smbus = smbus.SMBus(1)
+                self.__smbus = i2c_bus_manager.LockedSMBus(1)
                 self.__i2c_bus = 1
             except Exception as _: # not on 1 -- if not on 0 it is an error
-                self.__smbus = smbus.SMBus(0)
+                self.__smbus = i2c_bus_manager.LockedSMBus(0)
                 self.__i2c_bus = 0
  
-        # soft reset
-        self.__smbus.write_byte_data(self.__i2c_addr, BME280_REG_RESET_ADDR, BME280_REG_RESET_CMD)
-        time.sleep(BME280_RESET_TIME_IN_SECONDS)
+        self.__cache_directory = cache_directory
+        self.__uid = None
+        
         # make sure we have the expected type of chip
         self.__chip_id = self.__smbus.read_i2c_block_data(self.__i2c_addr, BME280_REG_CHIP_ID_ADDR, 1)[0]
         if BME280_REG_CHIP_ID != self.__chip_id:
             raise Exception('expected chip ID of 0x{:02x} but got 0x{:02x}'.format(BME280_REG_CHIP_ID, self.__chip_id))
 
-        # Read blocks of calibration data from EEPROM
-        # See data sheet
-        self.__cal1 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
-                                                       BME280_CALIBRATION_1_BASE_ADDR,
-                                                       BME280_CALIBRATION_1_COUNT)
-        self.__cal2 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
-                                                       BME280_CALIBRATION_2_BASE_ADDR,
-                                                       BME280_CALIBRATION_2_COUNT)
-        self.__cal3 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
-                                                       BME280_CALIBRATION_3_BASE_ADDR,
-                                                       BME280_CALIBRATION_3_COUNT)
+        # a chip still running the profile from an earlier start, with the
+        # calibration data cached, needs no reset or settling
+        entry = None
+        if self.__cache_directory is not None:
+            entry = calibration_cache.load_entry(SENSOR_TYPE_NAME, self.__i2c_bus,
+                                                 self.__i2c_addr, self.__chip_id,
+                                                 self.__cache_directory)
+        if entry is not None:
+            # the entry is only for this chip if the calibration matches, 
+            # another chip of the same type may have been put at the address
+            self.__read_calibration()
+        self.__warm_start = (entry is not None and 
+                             entry['uid'] == calibration_cache.calibration_uid((self.__cal1, self.__cal2, self.__cal3)) and
+                             self.__is_configured(entry, profile))
+        if not self.__warm_start:
+            # soft reset
+            self.__smbus.write_byte_data(self.__i2c_addr, BME280_REG_RESET_ADDR, BME280_REG_RESET_CMD)
+            time.sleep(BME280_RESET_TIME_IN_SECONDS)
+            self.__read_calibration()
         
         # Convert byte data to word values
-        self.__dig_T1 = self.__getUShort(self.__cal1, 0)
-        self.__dig_T2 = self.__getShort(self.__cal1, 2)
-        self.__dig_T3 = self.__getShort(self.__cal1, 4)
-        
-        self.__dig_P1 = self.__getUShort(self.__cal1, 6)
-        self.__dig_P2 = self.__getShort(self.__cal1, 8)
-        self.__dig_P3 = self.__getShort(self.__cal1, 10)
-        self.__dig_P4 = self.__getShort(self.__cal1, 12)
-        self.__dig_P5 = self.__getShort(self.__cal1, 14)
-        self.__dig_P6 = self.__getShort(self.__cal1, 16)
-        self.__dig_P7 = self.__getShort(self.__cal1, 18)
-        self.__dig_P8 = self.__getShort(self.__cal1, 20)
-        self.__dig_P9 = self.__getShort(self.__cal1, 22)
-        
-        self.__dig_H1 = self.__getUChar(self.__cal2, 0)
-        self.__dig_H2 = self.__getShort(self.__cal3, 0)
-        self.__dig_H3 = self.__getUChar(self.__cal3, 2)
-        self.__dig_H4 = self.__getChar(self.__cal3, 3)
-        self.__dig_H4 = (self.__dig_H4 << 24) >> 20
-        self.__dig_H4 = self.__dig_H4 | (self.__getChar(self.__cal3, 4) & 0x0F)
-        self.__dig_H5 = self.__getChar(self.__cal3, 5)
-        self.__dig_H5 = (self.__dig_H5 << 24) >> 20
-        self.__dig_H5 = self.__dig_H5 | (self.__getUChar(self.__cal3, 4) >> 4 & 0x0F)
-        self.__dig_H6 = self.__getChar(self.__cal3, 6)
-
-        # set the control registers to oversample and continuously monitor so we 
-        # can read at any time
-        
-        if DEBUG:
-            print('BME280_REG_CONTROL_MEAS_MODE_SLEEP: 0x{:2x}'.format(BME280_REG_CONTROL_MEAS_MODE_SLEEP), file=sys.stderr)
-            print('BME280_REG_CONFIG_VALUE: 0x{:2x}'.format(BME280_REG_CONFIG_VALUE), file=sys.stderr)
-            print('BME280_REG_CONTROL_HUM_VALUE: 0x{:2x}'.format(BME280_REG_CONTROL_HUM_VALUE), file=sys.stderr)
-            print('BME280_REG_CONTROL_MEAS_VALUE: 0x{:2x}'.format(BME280_REG_CONTROL_MEAS_VALUE), file=sys.stderr)
-        
-        # put in sleep node as docs says other register writes must be seen in SLEEP mode
-        self.__smbus.write_byte_data(self.__i2c_addr, 
-                                     BME280_REG_CONTROL_MEAS_ADDR, 
-                                     BME280_REG_CONTROL_MEAS_MODE_SLEEP)
-        self.__smbus.write_byte_data(self.__i2c_addr, 
-                                     BME280_REG_CONFIG_ADDR, 
-                                     BME280_REG_CONFIG_VALUE)
-        self.__smbus.write_byte_data(self.__i2c_addr, 
-                                     BME280_REG_CONTROL_HUM_ADDR, 
-                                     BME280_REG_CONTROL_HUM_VALUE)
-        self.__smbus.write_byte_data(self.__i2c_addr, 
-                                     BME280_REG_CONTROL_MEAS_ADDR, 
-                                     BME280_REG_CONTROL_MEAS_VALUE)
-        # wait 2 second for samples to get averaged out
-        time.sleep(BME280_SETTLE_TIME_IN_SECONDS)
-        
-        h = hashlib.new('md5')
-        h.update(bytes(self.__cal1))
-        h.update(bytes(self.__cal2))
-        h.update(bytes(self.__cal3))
-        self.__uid = h.hexdigest()
+        self.__calibration = BME280_Compensation.parse_calibration(self.__cal1,
+                                                                   self.__cal2,
+                                                                   self.__cal3)
+        self.__uid = calibration_cache.calibration_uid((self.__cal1, self.__cal2, self.__cal3))
+
+        if self.__warm_start:
+            self.__control_hum, self.__control_meas, self.__config = BME280_PROFILES[profile]
+            self.__profile = profile
+            # only wait for what is left of the settle time
+            time.sleep(max(0.0, min(self.get_settle_time(),
+                                    entry['configured'] + self.get_settle_time() - time.time())))
+        else:
+            # set the control registers to oversample and continuously monitor so we 
+            # can read at any time
+            
+            # wait for samples to get averaged out
+            self.set_profile(profile)
+        self.__last_measurement_time = None
+        self.__burst = None
 
         
     def get_chip_type(self):
@@ -232,6 +360,201 @@ class BME280:
         '''
         return self.__uid
     
+    def get_warm_start(self):
+        '''
+        return True if the chip was found running the profile asked for,
+        with its calibration data cached, so it was not reset
+        '''
+        return self.__warm_start
+    
+    def __read_calibration(self):
+        '''
+        Read blocks of calibration data from EEPROM
+        See data sheet
+        '''
+        self.__cal1 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
+                                                       BME280_CALIBRATION_1_BASE_ADDR,
+                                                       BME280_CALIBRATION_1_COUNT)
+        self.__cal2 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
+                                                       BME280_CALIBRATION_2_BASE_ADDR,
+                                                       BME280_CALIBRATION_2_COUNT)
+        self.__cal3 = self.__smbus.read_i2c_block_data(self.__i2c_addr, 
+                                                       BME280_CALIBRATION_3_BASE_ADDR,
+                                                       BME280_CALIBRATION_3_COUNT)
+    
+    def __is_configured(self, entry, profile):
+        '''
+        return True if the chip registers and the cache entry both hold
+        the configuration of profile
+        '''
+        expected = list(configured_registers(*BME280_PROFILES[profile]))
+        data = self.__smbus.read_i2c_block_data(self.__i2c_addr,
+                                                BME280_REG_CONTROL_BLOCK_ADDR,
+                                                BME280_REG_CONTROL_BLOCK_COUNT)
+        registers = configured_registers(data[0], data[2], data[3])
+        if DEBUG:
+            print('cached registers: {}  chip registers: {}  profile registers: {}'.format(
+                  entry['registers'], list(registers), expected), file=sys.stderr)
+        return entry['registers'] == expected and list(registers) == expected
+    
+    def __transaction(self):
+        '''
+        return a context manager which holds a shared bus for a sequence
+        of transfers, see i2c_bus_manager.LockedSMBus
+        '''
+        if hasattr(self.__smbus, 'transaction'):
+            return self.__smbus.transaction()
+        return contextlib.nullcontext()
+    
+    def __save_cache_entry(self):
+        '''
+        record the calibration data and the configuration just written
+        '''
+        if self.__cache_directory is None or self.__uid is None:
+            return
+        entry = {'chip_type': SENSOR_TYPE_NAME,
+                 'chip_id': self.__chip_id,
+                 'i2c_bus': self.__i2c_bus,
+                 'i2c_addr': self.__i2c_addr,
+                 'uid': self.__uid,
+                 'calibration': [list(block) for block in (self.__cal1, self.__cal2, self.__cal3)],
+                 'registers': list(configured_registers(self.__control_hum, self.__control_meas, self.__config)),
+                 'configured': time.time()}
+        calibration_cache.save_entry(entry, self.__cache_directory)
+    
+    def configure(self, control_hum, control_meas, config):
+        '''
+        Write the ctrl_hum, ctrl_meas and config registers.  The chip is put
+        in SLEEP mode first as the datasheet says config writes may be 
+        ignored in NORMAL mode and ctrl_hum only takes effect after a
+        write to ctrl_meas.
+        A FORCED mode ctrl_meas is written with SLEEP mode so no reading
+        is taken till trigger_forced_measurement() is called.
+        '''
+        with self.__transaction():
+            self.__smbus.write_byte_data(self.__i2c_addr, 
+                                         BME280_REG_CONTROL_MEAS_ADDR, 
+                                         BME280_REG_CONTROL_MEAS_MODE_SLEEP)
+            self.__smbus.write_byte_data(self.__i2c_addr, 
+                                         BME280_REG_CONFIG_ADDR, 
+                                         config)
+            self.__smbus.write_byte_data(self.__i2c_addr, 
+                                         BME280_REG_CONTROL_HUM_ADDR, 
+                                         control_hum)
+            if (control_meas & BME280_REG_CONTROL_MEAS_MODE_MASK) == BME280_REG_CONTROL_MEAS_MODE_FORCED:
+                # sleep till a reading is asked for
+                self.__smbus.write_byte_data(self.__i2c_addr, 
+                                             BME280_REG_CONTROL_MEAS_ADDR, 
+                                             control_meas & ~BME280_REG_CONTROL_MEAS_MODE_MASK)
+            else:
+                self.__smbus.write_byte_data(self.__i2c_addr, 
+                                             BME280_REG_CONTROL_MEAS_ADDR, 
+                                             control_meas)
+        self.__control_hum = control_hum
+        self.__control_meas = control_meas
+        self.__config = config
+        self.__save_cache_entry()
+    
+    def set_profile(self, profile, wait=True):
+        '''
+        Configure the chip with one of BME280_PROFILES and, if wait, sleep
+        till the readings have settled.
+        '''
+        if profile not in BME280_PROFILES:
+            raise ValueError('profile "{}" is not one of {}'.format(profile,
+                                                                  sorted(BME280_PROFILES.keys())))
+        control_hum, control_meas, config = BME280_PROFILES[profile]
+        if DEBUG:
+            print('profile: {}'.format(profile), file=sys.stderr)
+            print('control_hum: 0x{:2x}'.format(control_hum), file=sys.stderr)
+            print('control_meas: 0x{:2x}'.format(control_meas), file=sys.stderr)
+            print('config: 0x{:2x}'.format(config), file=sys.stderr)
+        self.configure(control_hum, control_meas, config)
+        self.__profile = profile
+        if wait:
+            time.sleep(self.get_settle_time())
+    
+    def get_profile(self):
+        '''
+        return the name of the profile in use
+        '''
+        return self.__profile
+    
+    def get_settle_time(self):
+        '''
+        return the seconds the readings take to settle after the chip is
+        configured
+        '''
+        return settle_time_in_seconds(*self.get_configuration())
+    
+    def get_configuration(self):
+        '''
+        return the (ctrl_hum, ctrl_meas, config) register values in use
+        '''
+        return self.__control_hum, self.__control_meas, self.__config
+    
+    def is_forced_mode(self):
+        '''
+        return True if the chip only measures when asked to (FORCED mode)
+        '''
+        return ((self.__control_meas & BME280_REG_CONTROL_MEAS_MODE_MASK) ==
+                BME280_REG_CONTROL_MEAS_MODE_FORCED)
+    
+    def get_max_measurement_time(self):
+        '''
+        return the longest time in seconds one measurement takes with the
+        configuration in use
+        '''
+        return max_measurement_time_in_seconds(self.__control_hum, self.__control_meas)
+    
+    def get_last_measurement_time(self):
+        '''
+        return the seconds the last FORCED mode measurement took from 
+        trigger till the result could be read, or None
+        '''
+        return self.__last_measurement_time
+    
+    def trigger_forced_measurement(self, wait=BME280_FORCED_WAIT_POLL):
+        '''
+        Start one measurement in FORCED mode, with the oversampling of the 
+        configuration in use, and return when it is done.  The chip goes
+        back to SLEEP mode by itself.
+        
+        With BME280_FORCED_WAIT_POLL the status register is polled after the
+        typical measurement time.  With BME280_FORCED_WAIT_SLEEP the maximum
+        measurement time is slept without any I2C traffic.  Either way it
+        takes no longer than the maximum measurement time plus one poll.
+        '''
+        if wait not in BME280_FORCED_WAITS:
+            raise ValueError('wait "{}" is not one of {}'.format(wait, BME280_FORCED_WAITS))
+        control_meas = ((self.__control_meas & ~BME280_REG_CONTROL_MEAS_MODE_MASK) |
+                        BME280_REG_CONTROL_MEAS_MODE_FORCED)
+        max_time = max_measurement_time_in_seconds(self.__control_hum, self.__control_meas)
+        # no other transfer may start while the chip is measuring
+        with self.__transaction():
+            start = time.monotonic()
+            self.__smbus.write_byte_data(self.__i2c_addr, 
+                                         BME280_REG_CONTROL_MEAS_ADDR, 
+                                         control_meas)
+            if wait == BME280_FORCED_WAIT_SLEEP:
+                time.sleep(max_time)
+            else:
+                time.sleep(typical_measurement_time_in_seconds(self.__control_hum, self.__control_meas))
+                deadline = start + max_time + BME280_STATUS_POLL_INTERVAL_IN_SECONDS
+                while (self.__smbus.read_byte_data(self.__i2c_addr, BME280_REG_STATUS_ADDR) &
+                       BME280_REG_STATUS_MEASURING):
+                    if time.monotonic() > deadline:
+                        raise IOError('measurement not done after {:.4f} seconds'.format(time.monotonic() - start))
+                    time.sleep(BME280_STATUS_POLL_INTERVAL_IN_SECONDS)
+            self.__last_measurement_time = time.monotonic() - start
+    
+    def get_calibration(self):
+        '''
+        return a dictionary of the dig_* calibration values for use with
+        BME280_Compensation
+        '''
+        return dict(self.__calibration)
+    
     def __get_cal_1_data(self):
         return self.__cal1
     
@@ -248,60 +571,52 @@ class BME280:
         determine temperature, pressure and relative humidity
         Return the tuple <temperature in degrees C>, <pressure in hPa>, <relative humidity %>
         '''
-        # Read temperature/pressure/humidity
-        data = self.__smbus.read_i2c_block_data(self.__i2c_addr, BME280_REG_DATA_ADDR, BME280_REG_DATA_COUNT)
-        pres_raw = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
-        temp_raw = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
-        hum_raw = (data[6] << 8) | data[7]
-        
-        # Refine temperature
-        var1 = ((((temp_raw >> 3) - (self.__dig_T1 << 1))) * (self.__dig_T2)) >> 11
-        var2 = (((((temp_raw >> 4) - (self.__dig_T1)) * ((temp_raw >> 4) - (self.__dig_T1))) >> 12) * (self.__dig_T3)) >> 14
-        t_fine = var1 + var2
-        temperature = float(((t_fine * 5) + 128) >> 8);
-        
-        # Refine pressure and adjust for temperature
-        var1 = t_fine / 2.0 - 64000.0
-        var2 = var1 * var1 * self.__dig_P6 / 32768.0
-        var2 = var2 + var1 * self.__dig_P5 * 2.0
-        var2 = var2 / 4.0 + self.__dig_P4 * 65536.0
-        var1 = (self.__dig_P3 * var1 * var1 / 524288.0 + self.__dig_P2 * var1) / 524288.0
-        var1 = (1.0 + var1 / 32768.0) * self.__dig_P1
-        if var1 == 0:
-            pressure = 0
-        else:
-            pressure = 1048576.0 - pres_raw
-            pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
-            var1 = self.__dig_P9 * pressure * pressure / 2147483648.0
-            var2 = pressure * self.__dig_P8 / 32768.0
-            pressure = pressure + (var1 + var2 + self.__dig_P7) / 16.0
-        
-        # Refine humidity
-        humidity = t_fine - 76800.0
-        humidity = (hum_raw - (self.__dig_H4 * 64.0 + self.__dig_H5 / 16384.0 * humidity)) * (self.__dig_H2 / 65536.0 * (1.0 + self.__dig_H6 / 67108864.0 * humidity * (1.0 + self.__dig_H3 / 67108864.0 * humidity)))
-        humidity = humidity * (1.0 - self.__dig_H1 * humidity / 524288.0)
-        if humidity > 100:
-            humidity = 100.0
-        elif humidity < 0:
-            humidity = 0.0
-        
-        return temperature / 100.0, pressure / 100.0, humidity
-        
-    def __getShort(self, data, index):
-        # return two bytes from data as a signed 16-bit value
-        return c_short((data[index + 1] << 8) + data[index]).value
+        with self.__transaction():
+            if self.is_forced_mode():
+                self.trigger_forced_measurement()
+            # Read temperature/pressure/humidity
+            data = self.__smbus.read_i2c_block_data(self.__i2c_addr, BME280_REG_DATA_ADDR, BME280_REG_DATA_COUNT)
+        pres_raw, temp_raw, hum_raw = BME280_Compensation.raw_from_data(data)
+        return BME280_Compensation.compensate(self.__calibration, pres_raw, temp_raw, hum_raw)
     
-    def __getUShort(self, data, index):
-        # return two bytes from data as an unsigned 16-bit value
-        return c_ushort((data[index + 1] << 8) + data[index]).value
+    def retrieve_raw_frame(self):
+        '''
+        Return the 8 bytes of the data registers without compensation, 
+        see BME280_Compensation.raw_from_data()
+        '''
+        return self.__smbus.read_i2c_block_data(self.__i2c_addr, BME280_REG_DATA_ADDR, BME280_REG_DATA_COUNT)
     
-    def __getChar(self, data, index):
-        # return one byte from data as a signed char
-        return c_byte(data[index]).value
+    def start_burst(self, capacity=BME280_DEFAULT_BURST_CAPACITY):
+        '''
+        Switch to the fastest sampling rate and collect raw frames in a
+        ring buffer from a background thread.  Return the 
+        BME280_Burst.BurstReader which holds the frames.
+        
+        This needs NumPy.
+        '''
+        import BME280_Burst
+        if self.__burst is not None:
+            raise ValueError('burst already started')
+        self.__saved_configuration = self.get_configuration()
+        self.configure(*BME280_PROFILES[BME280_BURST_PROFILE])
+        period = normal_mode_period_in_seconds(*self.get_configuration())
+        self.__burst = BME280_Burst.BurstReader(self.retrieve_raw_frame,
+                                                self.get_calibration(),
+                                                capacity,
+                                                period)
+        self.__burst.start()
+        return self.__burst
     
-    def __getUChar(self, data, index):
-        # return one byte from data as an unsigned char
-        return c_ubyte(data[index]).value
+    def stop_burst(self):
+        '''
+        Stop collecting frames and go back to the configuration used before
+        start_burst().  The frames collected stay in the BurstReader.
+        '''
+        if self.__burst is None:
+            return
+        self.__burst.stop()
+        self.__burst = None
+        self.configure(*self.__saved_configuration)
     
 
 #
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Collect raw BME280 frames at full rate into a ring buffer.
+
+A BurstReader reads the 8 data register bytes of the chip once each 
+period from a background thread and stores them, with the time they were
+read, in arrays which are allocated once when the reader is made.  Nothing
+is converted while reading so the thread keeps up with the chip.
+
+Frames are numbered from 0 as they are read.  get_views() returns NumPy 
+views into the ring buffer of the frames from a given number on, one view 
+or two if the frames wrap around the end of the buffer, without copying
+them.  A view holds good till the reader writes over those slots, which
+is capacity frames later, so use or copy it well before then.  compensate()
+converts frames to temperature, pressure and humidity arrays in one go with
+BME280_Compensation.compensate_arrays().
+
+Use BME280.start_burst() which sets the chip to its fastest rate and 
+makes the reader.
+"""
+
+import threading
+import time
+
+import numpy
+
+import BME280_Compensation
+
+FRAME_LENGTH = BME280_Compensation.FRAME_LENGTH
+
+
+class BurstReader:
+    """
+    Read frames with read_frame() every period seconds into a ring buffer
+    of capacity frames.
+    """
+    def __init__(self, read_frame, calibration, capacity, period):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1')
+        self.__read_frame = read_frame
+        self.__calibration = calibration
+        self.__capacity = capacity
+        self.__period = period
+        self.__frames = numpy.zeros((capacity, FRAME_LENGTH), dtype=numpy.uint8)
+        self.__times = numpy.zeros(capacity, dtype=numpy.float64)
+        self.__count = 0
+        self.__errors = 0
+        self.__late = 0
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        if self.__thread is not None:
+            raise ValueError('reader already started')
+        self.__thread = threading.Thread(target=self.__run, 
+                                         name='BME280_Burst',
+                                         daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __run(self):
+        next_time = time.monotonic()
+        while not self.__stop_event.is_set():
+            try:
+                frame = self.__read_frame()
+            except OSError:
+                # a bad transfer loses one frame, keep going
+                self.__errors += 1
+            else:
+                slot = self.__count % self.__capacity
+                self.__frames[slot] = frame
+                self.__times[slot] = time.time()
+                self.__count += 1  # publish the frame after it is stored
+            next_time += self.__period
+            delay = next_time - time.monotonic()
+            if delay < 0:
+                # fell behind, skip the missed periods rather than rush
+                self.__late += 1
+                next_time = time.monotonic()
+                delay = 0
+            self.__stop_event.wait(delay)
+
+    def get_capacity(self):
+        return self.__capacity
+
+    def get_period(self):
+        return self.__period
+
+    def get_count(self):
+        '''
+        return the number of frames read so far
+        '''
+        return self.__count
+
+    def get_errors(self):
+        '''
+        return the number of frames lost to I2C errors
+        '''
+        return self.__errors
+
+    def get_late(self):
+        '''
+        return the number of times the thread fell behind the period
+        '''
+        return self.__late
+
+    def get_views(self, since=0):
+        '''
+        Return (list of (frames, times) views, next frame number, frames
+        lost) for the frames numbered since and later.  frames lost counts
+        the frames after since which were written over before being asked
+        for.  Pass next frame number as since on the following call.
+        '''
+        end = self.__count
+        lost = 0
+        if end - since > self.__capacity:
+            lost = end - since - self.__capacity
+            since = end - self.__capacity
+        if since >= end:
+            return [], end, lost
+        first = since % self.__capacity
+        last = end % self.__capacity
+        if first < last or last == 0:
+            stop = last if last else self.__capacity
+            views = [(self.__frames[first:stop], self.__times[first:stop])]
+        else:
+            views = [(self.__frames[first:], self.__times[first:]),
+                     (self.__frames[:last], self.__times[:last])]
+        return views, end, lost
+
+    def compensate(self, since=0):
+        '''
+        Return (times, temperatures, pressures, humidities, next frame
+        number, frames lost) as arrays for the frames numbered since and
+        later.
+        '''
+        views, end, lost = self.get_views(since)
+        if views:
+            frames = numpy.concatenate([f for f, _ in views])
+            times = numpy.concatenate([t for _, t in views])
+        else:
+            frames = numpy.zeros((0, FRAME_LENGTH), dtype=numpy.uint8)
+            times = numpy.zeros(0, dtype=numpy.float64)
+        pres_raw, temp_raw, hum_raw = BME280_Compensation.raw_arrays_from_frames(frames)
+        temperature, pressure, humidity = BME280_Compensation.compensate_arrays(self.__calibration,
+                                                                                pres_raw,
+                                                                                temp_raw,
+                                                                                hum_raw)
+        return times, temperature, pressure, humidity, end, lost
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    import sys
+    import BME280
+    
+    seconds = 10.0
+    if len(sys.argv) > 1:
+        seconds = float(sys.argv[1])
+    
+    sensor = BME280.BME280()
+    reader = sensor.start_burst()
+    print('period {:.4f} seconds, capacity {} frames'.format(reader.get_period(),
+                                                             reader.get_capacity()))
+    since = 0
+    stop_time = time.monotonic() + seconds
+    while time.monotonic() < stop_time:
+        time.sleep(1.0)
+        times, temperature, pressure, humidity, since, lost = reader.compensate(since)
+        if len(pressure):
+            print('{} frames, pressure {:.2f} to {:.2f} hPa, {} lost'.format(len(pressure),
+                                                                             pressure.min(),
+                                                                             pressure.max(),
+                                                                             lost))
+    sensor.stop_burst()
+    print('{} frames, {} errors, {} late'.format(reader.get_count(),
+                                                 reader.get_errors(),
+                                                 reader.get_late()))
@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Convert raw BMP280 readings to temperature and pressure.
+
+The formulas are the floating point ones from the Bosch datasheet (with
+the integer temperature formula) and are kept apart from the driver so
+raw readings can be compensated on a system without an I2C bus.
+
+compensate() works on one reading and is what BMP280 uses.  
+compensate_arrays() does the same operations, in the same order, on NumPy
+arrays of raw readings so bursts of samples can be converted at once with
+results which are identical to compensate().  NumPy is only imported by 
+the functions which use it.
+
+The calibration is a dictionary of the dig_* values from the datasheet as
+returned by parse_calibration() and BMP280.get_calibration().
+"""
+
+from ctypes import c_short
+from ctypes import c_ushort
+
+FRAME_LENGTH = 8  # bytes read from the data registers for one reading,
+                  # the last 2 are not used by the BMP280
+
+
+def _getShort(data, index):
+    # return two bytes from data as a signed 16-bit value
+    return c_short((data[index + 1] << 8) + data[index]).value
+
+def _getUShort(data, index):
+    # return two bytes from data as an unsigned 16-bit value
+    return c_ushort((data[index + 1] << 8) + data[index]).value
+
+def parse_calibration(cal1):
+    """
+    Return the dictionary of dig_* values for the block of calibration
+    bytes read from the chip.
+    """
+    c = {}
+    c['dig_T1'] = _getUShort(cal1, 0)
+    c['dig_T2'] = _getShort(cal1, 2)
+    c['dig_T3'] = _getShort(cal1, 4)
+    
+    c['dig_P1'] = _getUShort(cal1, 6)
+    c['dig_P2'] = _getShort(cal1, 8)
+    c['dig_P3'] = _getShort(cal1, 10)
+    c['dig_P4'] = _getShort(cal1, 12)
+    c['dig_P5'] = _getShort(cal1, 14)
+    c['dig_P6'] = _getShort(cal1, 16)
+    c['dig_P7'] = _getShort(cal1, 18)
+    c['dig_P8'] = _getShort(cal1, 20)
+    c['dig_P9'] = _getShort(cal1, 22)
+
+    return c
+
+
+def raw_from_data(data):
+    """
+    Return (pres_raw, temp_raw) from the bytes of the data registers.
+    """
+    pres_raw = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
+    temp_raw = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
+    return pres_raw, temp_raw
+
+
+def compensate(c, pres_raw, temp_raw):
+    """
+    Return (<temperature in degrees C>, <pressure in hPa>) for one raw
+    reading using calibration c.
+    """
+    # Refine temperature
+    var1 = ((((temp_raw >> 3) - (c['dig_T1'] << 1))) * (c['dig_T2'])) >> 11
+    var2 = (((((temp_raw >> 4) - (c['dig_T1'])) * ((temp_raw >> 4) - (c['dig_T1']))) >> 12) * (c['dig_T3'])) >> 14
+    t_fine = var1 + var2
+    temperature = float(((t_fine * 5) + 128) >> 8);
+    
+    # Refine pressure and adjust for temperature
+    var1 = t_fine / 2.0 - 64000.0
+    var2 = var1 * var1 * c['dig_P6'] / 32768.0
+    var2 = var2 + var1 * c['dig_P5'] * 2.0
+    var2 = var2 / 4.0 + c['dig_P4'] * 65536.0
+    var1 = (c['dig_P3'] * var1 * var1 / 524288.0 + c['dig_P2'] * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * c['dig_P1']
+    if var1 == 0:
+        pressure = 0
+    else:
+        pressure = 1048576.0 - pres_raw
+        pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
+        var1 = c['dig_P9'] * pressure * pressure / 2147483648.0
+        var2 = pressure * c['dig_P8'] / 32768.0
+        pressure = pressure + (var1 + var2 + c['dig_P7']) / 16.0
+
+    return temperature / 100.0, pressure / 100.0
+
+
+def raw_arrays_from_frames(frames):
+    """
+    Return (pres_raw, temp_raw) int64 arrays from an array of shape (n, 8)
+    holding the bytes of n readings of the data registers.
+    """
+    import numpy
+    d = numpy.asarray(frames, dtype=numpy.uint8).reshape(-1, FRAME_LENGTH).astype(numpy.int64)
+    pres_raw = (d[:, 0] << 12) | (d[:, 1] << 4) | (d[:, 2] >> 4)
+    temp_raw = (d[:, 3] << 12) | (d[:, 4] << 4) | (d[:, 5] >> 4)
+    return pres_raw, temp_raw
+
+
+def compensate_arrays(c, pres_raw, temp_raw):
+    """
+    Return arrays of (<temperature in degrees C>, <pressure in hPa>) for
+    arrays of raw readings using calibration c.
+    
+    The operations are those of compensate() in the same order so the
+    results are the same to the last bit.
+    """
+    import numpy
+    pres_raw = numpy.asarray(pres_raw, dtype=numpy.int64)
+    temp_raw = numpy.asarray(temp_raw, dtype=numpy.int64)
+    
+    # Refine temperature, integer arithmetic with arithmetic shifts
+    var1 = ((((temp_raw >> 3) - (c['dig_T1'] << 1))) * (c['dig_T2'])) >> 11
+    var2 = (((((temp_raw >> 4) - (c['dig_T1'])) * ((temp_raw >> 4) - (c['dig_T1']))) >> 12) * (c['dig_T3'])) >> 14
+    t_fine = var1 + var2
+    temperature = (((t_fine * 5) + 128) >> 8).astype(numpy.float64)
+    
+    # Refine pressure and adjust for temperature
+    var1 = t_fine / 2.0 - 64000.0
+    var2 = var1 * var1 * c['dig_P6'] / 32768.0
+    var2 = var2 + var1 * c['dig_P5'] * 2.0
+    var2 = var2 / 4.0 + c['dig_P4'] * 65536.0
+    var1 = (c['dig_P3'] * var1 * var1 / 524288.0 + c['dig_P2'] * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * c['dig_P1']
+    zero = (var1 == 0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        pressure = 1048576.0 - pres_raw
+        pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
+        var1 = c['dig_P9'] * pressure * pressure / 2147483648.0
+        var2 = pressure * c['dig_P8'] / 32768.0
+        pressure = pressure + (var1 + var2 + c['dig_P7']) / 16.0
+    pressure = numpy.where(zero, 0.0, pressure)
+
+    return temperature / 100.0, pressure / 100.0
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    # check compensate_arrays() matches compensate() and time them using
+    # typical calibration bytes and random raw readings
+    import random
+    import time
+    import numpy
+    
+    cal1 = [0x70, 0x6b, 0x43, 0x67, 0x18, 0xfc, 0x7d, 0x8e, 0x43, 0xd6, 0xd0, 0x0b,
+            0x27, 0x0b, 0x8c, 0x00, 0xf9, 0xff, 0x8c, 0x3c, 0xf8, 0xc6, 0x70, 0x17]
+    c = parse_calibration(cal1)
+    
+    count = 100000
+    pres_raw = [random.randrange(1 << 20) for _ in range(count)]
+    temp_raw = [random.randrange(400000, 600000) for _ in range(count)]
+    
+    start = time.perf_counter()
+    scalar = [compensate(c, p, t) for p, t in zip(pres_raw, temp_raw)]
+    scalar_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    arrays = compensate_arrays(c, pres_raw, temp_raw)
+    array_time = time.perf_counter() - start
+    
+    mismatches = 0
+    for k in range(count):
+        if scalar[k] != (arrays[0][k], arrays[1][k]):
+            mismatches += 1
+    print('{} readings, {} mismatches'.format(count, mismatches))
+    print('compensate()        {:.1f} readings/second'.format(count / scalar_time))
+    print('compensate_arrays() {:.1f} readings/second'.format(count / array_time))
@@ -29,8 +29,11 @@ BMP280 devices.
 """
 
 import datetime
-import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sensor_web_server
 
 import BMP280
 
@@ -41,30 +44,26 @@ DEFAULT_LISTEN_PORT = 20280           # IP port 20280
 DEFAULT_SERVER_ADDRESS = (DEFAULT_LISTEN_ADDRESS, DEFAULT_LISTEN_PORT)
 
 
-class BMP280_HTTPServer_RequestHandler(BaseHTTPRequestHandler):
+DEFAULT_REFRESH_INTERVAL_IN_SECONDS = 2 # chip smooths over 2 seconds
+
+
+class BMP280_Sampler:
     '''
-    A subclass of BaseHTTPRequestHandler to provide information about
-    BMP280 sensors.
+    Take samples from a BMP280 for the sensor_web_server.SampleCache.
     '''
     
-    # holds the device class, it will be created when needed
-    __device = None
+    def __init__(self):
+        # holds the device class, it will be created when needed
+        self.__device = None
     
-    def do_GET(self):
+    def __call__(self):
         '''
-        handle the HTTP GET request
+        return a list with one sample from the device
         '''
-        # first time through get create the controller
+        # first time through get create the device
         if self.__device is None:
             self.__device = BMP280.BMP280()
         
-        # Send response status code
-        self.send_response(200)
- 
-        # Send headers
-        self.send_header('Content-type','application/json')
-        self.end_headers()
-
         result=[]
         sample = {}
         sample['type'] = self.__device.get_chip_type()
@@ -76,16 +75,12 @@ class BMP280_HTTPServer_RequestHandler(BaseHTTPRequestHandler):
         sample['when'] = \
             datetime.datetime.now(datetime.timezone.utc).isoformat()
         result.append(sample)
-        
-        # Write content as utf-8 data
-        self.wfile.write(bytes(json.dumps(result, indent=1), "utf8"))
-        return
+        return result
     
  
 def run():
-    httpd_server = HTTPServer(DEFAULT_SERVER_ADDRESS,
-                              BMP280_HTTPServer_RequestHandler)
-    print('running server listening on {}...'.format(DEFAULT_SERVER_ADDRESS))
-    httpd_server.serve_forever()
+    sensor_web_server.run(DEFAULT_SERVER_ADDRESS,
+                          BMP280_Sampler(),
+                          DEFAULT_REFRESH_INTERVAL_IN_SECONDS)
     
 run()
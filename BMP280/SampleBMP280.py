@@ -29,48 +29,72 @@ periodically send the results to a file.
 
 send data in format of:
   <Timestamp> <Device> <ID> <degrees C> <Pressure in hPa>
+or, with --format binary, in the format of binary_sample_log.py
 
 Official datasheet available from :
 https://www.bosch-sensortec.com/bst/products/all_products/bme280
 """
 
+import argparse
 import datetime
+import os
+import signal
+import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sample_writer
+
 import BMP280
 
 DEBUG = 0
-if DEBUG:
-    import sys
 
 SAMPLE_INTERVAL_IN_SECONDS = 60 * 10
-OUTPUT_FORMAT = '{} {} {} {:.3f} {:.3f}\n'
 RESULT_FILENAME_BASE = '/opt/Sensors/logs/BMP280_'
+FIELD_NAMES = ('temp_C', 'pressure')
 
 #
 # main
 #
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Capture and log data from a BMP280.')
+    parser.add_argument('-d', '--debug',
+                        help='turn on debugging',
+                        action='store_true')
+    parser.add_argument('-p', '--profile',
+                        help='oversampling, filter and standby settings of the chip, '
+                             '"weather" sleeps the chip between FORCED mode readings',
+                        choices=sorted(BMP280.BMP280_PROFILES.keys()),
+                        default=BMP280.BMP280_DEFAULT_PROFILE)
+    sample_writer.add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    if (args.debug):
+        DEBUG = 1
+        print('turned on DEBUG from command line.',
+              file=sys.stderr, flush=True)
     
-    sensor = BMP280.BMP280()
+    sensor = BMP280.BMP280(profile=args.profile)
     if DEBUG:
         print('sensor.get_uid() = "{}"'.format(sensor.get_uid()),
               file=sys.stderr)
     
     data_name = RESULT_FILENAME_BASE + sensor.get_uid()
     
-    with open(data_name, 'a') as output:
+    # systemd stops the service with SIGTERM, exit so queued samples are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writer = sample_writer.SampleWriter(**sample_writer.get_writer_options(args))
+    try:
         next_sample_time = time.time()
         while True:
-            when = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            when = datetime.datetime.now(datetime.timezone.utc)
             temperature,pressure = sensor.retrieve_temperature_pressure()    
-            result = OUTPUT_FORMAT.format(when,
-                                          sensor.get_chip_type(), 
-                                          sensor.get_uid(), 
-                                          temperature,
-                                          pressure)
-            output.write(result)
-            output.flush()
+            writer.write_samples(data_name,
+                                 [(sensor.get_chip_type(), 
+                                   sensor.get_uid(), 
+                                   (temperature, pressure))],
+                                 when,
+                                 FIELD_NAMES)
             
             next_sample_time = next_sample_time + SAMPLE_INTERVAL_IN_SECONDS
             delay_time = next_sample_time - time.time()
@@ -80,3 +104,5 @@ if __name__ == '__main__':
         
             if 0 < delay_time:  # don't sleep if already next sample time
                 time.sleep(delay_time)
+    finally:
+        writer.close()
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Measure how long time range queries take with sample_log_query compared
+with reading and splitting every line of a log.
+
+A synthetic BME280 text log of the given size is written, with one sample
+every second, unless a log of that size is already there from an earlier
+run.  Then these are timed:
+  index       building the sparse index of the whole log (first query)
+  last 24h    the samples of the last 24 hours, pressure column only
+  min/max 1h  min and max pressure over an hour in the middle of the log
+  full scan   the last 24 hours found by reading every line
+
+The log is left in place for later runs unless --remove is given.  Use
+--skip_scan on large logs to leave out the slow full scan.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -s, --size           size of the log in MB
+  -l, --log_filename   name of the synthetic log
+  --skip_scan          do not time the full scan
+  --remove             remove the log and its index when done
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+import sample_log_query
+import sample_writer
+
+DEFAULT_SIZE_IN_MB = 2048
+DEFAULT_LOG_FILENAME = '/tmp/BenchmarkSampleLogQuery.log'
+SAMPLE_INTERVAL = datetime.timedelta(seconds=1)
+ONE_DAY = datetime.timedelta(days=1)
+ONE_HOUR = datetime.timedelta(hours=1)
+WRITE_BLOCK_LINES = 10000
+
+
+def make_log(filename, size):
+    """
+    Write a log of at least size bytes and return (time of first sample,
+    time of last sample).
+    """
+    when = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    first = when
+    written = 0
+    n = 0
+    with open(filename, 'w') as f:
+        while written < size:
+            lines = []
+            for _ in range(WRITE_BLOCK_LINES):
+                lines.append(sample_writer.format_sample(when, 'BME280', 'synthetic',
+                                                         (20.0 + (n % 1000) / 100.0,
+                                                          1000.0 + (n % 5000) / 100.0,
+                                                          40.0 + (n % 300) / 10.0)))
+                when += SAMPLE_INTERVAL
+                n += 1
+            text = ''.join(lines)
+            f.write(text)
+            written += len(text)
+    return first, when - SAMPLE_INTERVAL
+
+
+def log_times(filename):
+    """
+    Return (time of first sample, time of last sample) of an existing log.
+    """
+    with open(filename, 'rb') as f:
+        first = sample_log_query.parse_timestamp(f.readline().split()[0])
+        f.seek(-4096, os.SEEK_END)
+        last = sample_log_query.parse_timestamp(f.readlines()[-1].split()[0])
+    return (sample_log_query.binary_sample_log.ns_to_datetime(first),
+            sample_log_query.binary_sample_log.ns_to_datetime(last))
+
+
+def full_scan(filename, start, end):
+    """
+    Return the pressures from start to end found by reading every line.
+    """
+    start_ns = sample_log_query.to_ns(start)
+    end_ns = sample_log_query.to_ns(end)
+    result = []
+    with open(filename, 'rb') as f:
+        for line in f:
+            parts = line.split()
+            t = sample_log_query.parse_timestamp(parts[0])
+            if start_ns <= t < end_ns:
+                result.append(float(parts[4]))
+    return result
+
+
+def pressure_range(log, start, end):
+    """
+    Return (min, max) of the pressure from start to end.
+    """
+    result = log.query(start, end)
+    return result.get_min('pressure'), result.get_max('pressure')
+
+
+def timed(function):
+    start_time = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start_time, result
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark time range queries of sample logs.')
+    parser.add_argument('-s', '--size',
+                        help='size of the log in MB',
+                        type=int,
+                        default=DEFAULT_SIZE_IN_MB)
+    parser.add_argument('-l', '--log_filename',
+                        help='name of the synthetic log',
+                        default=DEFAULT_LOG_FILENAME)
+    parser.add_argument('--skip_scan',
+                        help='do not time the full scan',
+                        action='store_true')
+    parser.add_argument('--remove',
+                        help='remove the log and its index when done',
+                        action='store_true')
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    filename = args.log_filename
+    index_filename = filename + sample_log_query.INDEX_FILENAME_SUFFIX
+    if os.path.exists(filename) and size <= os.path.getsize(filename) < size + 1024 * 1024:
+        first, last = log_times(filename)
+        print('using existing {} of {} bytes'.format(filename, os.path.getsize(filename)))
+    else:
+        elapsed, (first, last) = timed(lambda: make_log(filename, size))
+        print('wrote {} of {} bytes in {:.1f} seconds'.format(filename,
+                                                             os.path.getsize(filename),
+                                                             elapsed))
+    if os.path.exists(index_filename):
+        os.remove(index_filename)
+
+    log = sample_log_query.SampleLog(filename)
+    elapsed, entries = timed(log.update_index)
+    print('{:>12} {:>10.4f} seconds, {} entries'.format('index', elapsed, entries))
+
+    start = last - ONE_DAY
+    elapsed, pressure = timed(lambda: log.query(start, None).get_column('pressure'))
+    print('{:>12} {:>10.4f} seconds, {} samples'.format('last 24h', elapsed, len(pressure)))
+
+    middle = first + (last - first) / 2
+    elapsed, (low, high) = timed(lambda: pressure_range(log, middle, middle + ONE_HOUR))
+    print('{:>12} {:>10.4f} seconds, min {} max {}'.format('min/max 1h', elapsed, low, high))
+    log.close()
+
+    if not args.skip_scan:
+        elapsed, scanned = timed(lambda: full_scan(filename, start, last + SAMPLE_INTERVAL))
+        print('{:>12} {:>10.4f} seconds, {} samples'.format('full scan', elapsed, len(scanned)))
+        if scanned != pressure:
+            print('full scan and query do not match')
+
+    if args.remove:
+        os.remove(filename)
+        if os.path.exists(index_filename):
+            os.remove(index_filename)
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Measure how fast a SampleWriter accepts samples and how many write system
+calls it makes per sample for a few batching and fsync settings.
+
+Write system calls are counted from the syscw line of /proc/self/io, which
+counts every write made by the process.  The samples go to files in a
+temporary directory, which may be on different storage than the logs.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -n, --samples        number of samples to write for each setting
+  -f, --files          number of log files the samples are spread over
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import sample_writer
+
+DEFAULT_SAMPLE_COUNT = 20000
+DEFAULT_FILE_COUNT = 4
+PROC_IO_FILENAME = '/proc/self/io'
+
+SETTINGS = (('unbatched', {'batch_count': 1, 'batch_time': 0.0}),
+            ('batch 64', {'batch_count': 64}),
+            ('batch 1024', {'batch_count': 1024}),
+            ('batch 64 fsync', {'batch_count': 64,
+                                'fsync_policy': sample_writer.FSYNC_BATCH}),
+            ('batch 1024 fsync', {'batch_count': 1024,
+                                  'fsync_policy': sample_writer.FSYNC_BATCH}),
+            )
+
+
+def read_write_syscalls():
+    """
+    Return the count of write system calls made by this process or None.
+    """
+    try:
+        with open(PROC_IO_FILENAME) as f:
+            for line in f:
+                name, value = line.split(':')
+                if 'syscw' == name:
+                    return int(value)
+    except OSError:
+        pass
+    return None
+
+
+def run_setting(directory, sample_count, file_count, options):
+    """
+    Write sample_count samples and return (seconds, write syscalls, stats).
+    """
+    filenames = [os.path.join(directory, 'test_{}.log'.format(i))
+                 for i in range(file_count)]
+    sample = ('test_sensor', 'id', (21.5, 1013.25, 45.0))
+    writer = sample_writer.SampleWriter(queue_size=sample_count + 1, **options)
+    start_syscalls = read_write_syscalls()
+    start_time = time.perf_counter()
+    for i in range(sample_count):
+        writer.write_samples(filenames[i % file_count], [sample])
+    writer.close()
+    elapsed = time.perf_counter() - start_time
+    end_syscalls = read_write_syscalls()
+    syscalls = None
+    if start_syscalls is not None and end_syscalls is not None:
+        syscalls = end_syscalls - start_syscalls
+    return elapsed, syscalls, writer.get_stats()
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the batching of SampleWriter.')
+    parser.add_argument('-n', '--samples',
+                        help='number of samples to write for each setting',
+                        type=int,
+                        default=DEFAULT_SAMPLE_COUNT)
+    parser.add_argument('-f', '--files',
+                        help='number of log files the samples are spread over',
+                        type=int,
+                        default=DEFAULT_FILE_COUNT)
+    args = parser.parse_args()
+
+    print('{:>18} {:>12} {:>14} {:>12} {:>8}'.format('setting',
+                                                    'samples/sec',
+                                                    'syscalls/sample',
+                                                    'writes',
+                                                    'fsyncs'))
+    for name, options in SETTINGS:
+        with tempfile.TemporaryDirectory() as directory:
+            elapsed, syscalls, stats = run_setting(directory, 
+                                                   args.samples, 
+                                                   args.files, 
+                                                   options)
+        if syscalls is None:
+            syscalls_per_sample = 'n/a'
+        else:
+            syscalls_per_sample = '{:.4f}'.format(syscalls / args.samples)
+        print('{:>18} {:>12.0f} {:>14} {:>12} {:>8}'.format(name,
+                                                          args.samples / elapsed,
+                                                          syscalls_per_sample,
+                                                          stats['writes'],
+                                                          stats['fsyncs']))
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Measure how long it takes to construct a BME280 or BMP280 driver with and
+without the calibration cache, see calibration_cache.py.
+
+These are timed:
+  uncached    cache_directory=None, reset, calibration read and settling
+  cold        the first start with an empty cache, which fills the cache
+  warm        later starts that find the chip already configured
+
+The cache is kept in a temporary directory so the real cache is not
+touched.  This needs the chip to be attached.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -t, --type           BME280 or BMP280
+  -b, --bus            I2C bus number, found if not given
+  -a, --address        I2C address of the chip
+  -p, --profile        profile to configure
+  -n, --count          number of warm starts to time
+"""
+
+import argparse
+import tempfile
+import time
+
+import sensor_adapters
+
+CHIP_TYPES = ('BME280', 'BMP280')
+DEFAULT_CHIP_TYPE = 'BME280'
+DEFAULT_WARM_COUNT = 10
+
+
+def time_start(driver_class, **kwargs):
+    """
+    Return (seconds, driver) for one construction of driver_class.
+    """
+    start = time.perf_counter()
+    driver = driver_class(**kwargs)
+    return time.perf_counter() - start, driver
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time BME280 / BMP280 driver startup with and without the calibration cache.')
+    parser.add_argument('-t', '--type',
+                        help='type of chip',
+                        choices=CHIP_TYPES,
+                        default=DEFAULT_CHIP_TYPE)
+    parser.add_argument('-b', '--bus',
+                        help='I2C bus number',
+                        type=int,
+                        default=None)
+    parser.add_argument('-a', '--address',
+                        help='I2C address of the chip, e.g. 0x77',
+                        type=lambda s: int(s, 0),
+                        default=None)
+    parser.add_argument('-p', '--profile',
+                        help='profile to configure, the driver default if not given',
+                        default=None)
+    parser.add_argument('-n', '--count',
+                        help='number of warm starts to time',
+                        type=int,
+                        default=DEFAULT_WARM_COUNT)
+    args = parser.parse_args()
+
+    module = sensor_adapters.import_driver(args.type, args.type)
+    driver_class = getattr(module, args.type)
+    kwargs = {'i2c_bus': args.bus}
+    if args.address is not None:
+        kwargs['i2c_addr'] = args.address
+    if args.profile is not None:
+        kwargs['profile'] = args.profile
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        seconds, driver = time_start(driver_class, cache_directory=None, **kwargs)
+        print('{:<10} {:9.4f} s'.format('uncached', seconds))
+        print('UID:  {}  profile: {}'.format(driver.get_uid(), driver.get_profile()))
+        
+        # the chip is running the profile now but the cache is empty
+        seconds, driver = time_start(driver_class, cache_directory=cache_directory, **kwargs)
+        print('{:<10} {:9.4f} s  warm start: {}'.format('cold', seconds, driver.get_warm_start()))
+        
+        times = []
+        warm = 0
+        for _ in range(args.count):
+            seconds, driver = time_start(driver_class, cache_directory=cache_directory, **kwargs)
+            times.append(seconds)
+            warm += driver.get_warm_start()
+        if times:
+            print('{:<10} {:9.4f} s  mean of {}, {:.4f} s min, {:.4f} s max, {} warm starts'.format(
+                  'warm', sum(times) / len(times), len(times), min(times), max(times), warm))
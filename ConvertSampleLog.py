@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Convert text sample logs to the binary format of binary_sample_log.py.
+
+Each line of a text log is
+  <UTC-Timestamp> <Device-Type> <ID> <Data>+
+and the samples of each sensor are appended to the binary log named by
+binary_sample_log.binary_filename() so the result is the same as if the
+samples had been written with --format binary.  Converting the same text
+log twice appends the samples twice.
+
+Lines which can not be parsed are reported and skipped.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -o, --output         base name of the binary logs, defaults to the name
+                       of the text log
+  -d, --debug          turn on debugging
+  log_filename         text logs to convert
+"""
+
+import argparse
+import datetime
+import sys
+
+import binary_sample_log
+import sample_writer
+
+DEBUG = 0
+
+
+def parse_line(line):
+    """
+    Return (datetime, sensor type name, sensor id, values) for a line of
+    a text log.
+    """
+    parts = line.split()
+    if len(parts) < 4:
+        raise ValueError('too few fields')
+    when = datetime.datetime.fromisoformat(parts[0])
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return when, parts[1], parts[2], tuple([float(v) for v in parts[3:]])
+
+
+def convert(log_filename, output_base=None):
+    """
+    Append the samples in the text log log_filename to binary logs.
+    
+    Return (dictionary of binary filename to record count, count of bad
+    lines).
+    """
+    if output_base is None:
+        output_base = log_filename
+    logs = {}
+    chunks = {}
+    counts = {}
+    bad_lines = 0
+    try:
+        with open(log_filename) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    when, type_name, sensor_id, values = parse_line(line)
+                    name = binary_sample_log.binary_filename(output_base, sensor_id)
+                    log = logs.get(name)
+                    if log is None:
+                        field_names = sample_writer.FIELD_NAMES_BY_TYPE.get(type_name)
+                        if field_names is None or len(field_names) != len(values):
+                            field_names = ['value_{}'.format(n) for n in range(len(values))]
+                        log = binary_sample_log.BinarySampleLog(name, type_name, 
+                                                                sensor_id, field_names)
+                        logs[name] = log
+                        chunks[name] = []
+                        counts[name] = 0
+                    chunks[name].append(log.pack(when, values))
+                except Exception as ex:
+                    bad_lines += 1
+                    print('{}:{} skipped "{}": {}'.format(log_filename, line_number,
+                                                          line.rstrip(), ex),
+                          file=sys.stderr, flush=True)
+                    continue
+                counts[name] += 1
+                if len(chunks[name]) >= 4096:
+                    log.write(b''.join(chunks[name]))
+                    chunks[name] = []
+    finally:
+        for name, log in logs.items():
+            log.write(b''.join(chunks[name]))
+            log.close()
+    return counts, bad_lines
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert text sample logs to binary logs.')
+    parser.add_argument('-o', '--output',
+                        help='base name of the binary logs',
+                        default=None)
+    parser.add_argument('-d', '--debug',
+                        help='turn on debugging',
+                        action='store_true')
+    parser.add_argument('log_filename',
+                        help='text log to convert',
+                        nargs='+')
+    args = parser.parse_args()
+
+    if (args.debug):
+        DEBUG = 1
+        print('turned on DEBUG from command line.',
+              file=sys.stderr, flush=True)
+
+    total_bad_lines = 0
+    for log_filename in args.log_filename:
+        counts, bad_lines = convert(log_filename, args.output)
+        total_bad_lines += bad_lines
+        for name in sorted(counts.keys()):
+            print('{} -> {} : {} samples'.format(log_filename, name, counts[name]))
+        if DEBUG:
+            print('{} bad lines in {}'.format(bad_lines, log_filename),
+                  file=sys.stderr, flush=True)
+    if total_bad_lines:
+        sys.exit(1)
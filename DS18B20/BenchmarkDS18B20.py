@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Compare the time to sweep a string of DS18B20 devices for each of the
+DS18B20_Controller.retrieve_all_temps() modes.
+
+The benchmark builds a fake w1 sysfs tree in a temporary directory.  Each
+w1_slave file is a named pipe served by a thread which waits the
+conversion time before returning data, the same way reads of the real 
+sysfs files block while the device converts.  A therm_bulk_read pipe
+records when a bulk conversion was triggered so following device reads
+only wait for what is left of that conversion.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -c, --counts         probe counts to try (comma separated)
+  -t, --conversion     simulated conversion time in seconds
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import DS18B20_Controller
+
+DEFAULT_PROBE_COUNTS = '1,2,5,10,20'
+DEFAULT_CONVERSION_TIME_IN_SECONDS = 0.75
+BULK_TRIGGER_TEXT = DS18B20_Controller.BULK_READ_TRIGGER.strip()
+W1_SLAVE_DATA = ('50 05 4b 46 7f ff 0c 10 1c : crc=1c YES\n'
+                 '50 05 4b 46 7f ff 0c 10 1c t=85000\n')
+
+
+class FakeW1Bus:
+    """
+    A fake /sys/bus/w1/devices tree with count DS18B20 devices on a
+    single bus master.
+    """
+    def __init__(self, count, conversion_time):
+        self.__conversion_time = conversion_time
+        self.__trigger_time = None
+        self.__lock = threading.Lock()
+        self.__tmpdir = tempfile.TemporaryDirectory()
+        self.devices_dir = self.__tmpdir.name
+        self.__stopping = False
+        self.__pipes = []
+
+        master_dir = os.path.join(self.devices_dir, 'w1_bus_master1')
+        os.mkdir(master_dir)
+        bulk_filename = os.path.join(master_dir, 'therm_bulk_read')
+        os.mkfifo(bulk_filename)
+        self.__pipes.append((bulk_filename, 'r'))
+        threading.Thread(target=self.__serve_bulk_read, 
+                         args=(bulk_filename,),
+                         daemon=True).start()
+
+        for i in range(count):
+            device_dir = os.path.join(self.devices_dir, 
+                                      '28-{:012x}'.format(0x0316a2790000 + i))
+            os.mkdir(device_dir)
+            w1_slave_filename = os.path.join(device_dir, 'w1_slave')
+            os.mkfifo(w1_slave_filename)
+            self.__pipes.append((w1_slave_filename, 'w'))
+            threading.Thread(target=self.__serve_w1_slave,
+                             args=(w1_slave_filename,),
+                             daemon=True).start()
+
+    def close(self):
+        """
+        stop the threads and remove the tree
+        """
+        self.__stopping = True
+        # open the other end of each pipe so the serving threads wake up
+        for filename, mode in self.__pipes:
+            fd = os.open(filename, 
+                         (os.O_WRONLY if 'r' == mode else os.O_RDONLY) | os.O_NONBLOCK)
+            time.sleep(0.01)
+            os.close(fd)
+        self.__tmpdir.cleanup()
+
+    def __serve_bulk_read(self, filename):
+        while not self.__stopping:
+            with open(filename) as f:
+                if BULK_TRIGGER_TEXT in f.read():
+                    with self.__lock:
+                        self.__trigger_time = time.monotonic()
+
+    def __serve_w1_slave(self, filename):
+        while not self.__stopping:
+            try:
+                with open(filename, 'w') as f:
+                    with self.__lock:
+                        trigger_time = self.__trigger_time
+                    if trigger_time is None:
+                        delay = self.__conversion_time
+                    else:
+                        delay = trigger_time + self.__conversion_time - time.monotonic()
+                    if 0 < delay:
+                        time.sleep(delay)
+                    f.write(W1_SLAVE_DATA)
+            except BrokenPipeError:
+                pass
+
+    def clear_trigger(self):
+        """
+        forget any bulk conversion that was triggered
+        """
+        with self.__lock:
+            self.__trigger_time = None
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark DS18B20_Controller.retrieve_all_temps() modes.')
+    parser.add_argument('-c', '--counts',
+                        help='probe counts to try (comma separated)',
+                        default=DEFAULT_PROBE_COUNTS)
+    parser.add_argument('-t', '--conversion',
+                        help='simulated conversion time in seconds',
+                        type=float,
+                        default=DEFAULT_CONVERSION_TIME_IN_SECONDS)
+    args = parser.parse_args()
+
+    modes = (DS18B20_Controller.RETRIEVE_MODE_SERIAL,
+             DS18B20_Controller.RETRIEVE_MODE_THREADS,
+             DS18B20_Controller.RETRIEVE_MODE_BULK)
+    print('sweep time in seconds with {} second conversions'.format(args.conversion))
+    print('{:>6} {}'.format('probes', ' '.join('{:>8}'.format(m) for m in modes)))
+    for count in [int(c) for c in args.counts.split(',')]:
+        bus = FakeW1Bus(count, args.conversion)
+        controller = DS18B20_Controller.DS18B20_Controller(devices_dir=bus.devices_dir)
+        times = []
+        for mode in modes:
+            bus.clear_trigger()
+            start_time = time.monotonic()
+            temps = controller.retrieve_all_temps(mode=mode)
+            times.append(time.monotonic() - start_time)
+            if len(temps) != count:
+                raise RuntimeError('expected {} temperatures but got {}'.format(count, len(temps)))
+        print('{:>6} {}'.format(count, ' '.join('{:8.3f}'.format(t) for t in times)))
+        bus.close()
@@ -27,20 +27,200 @@ SOFTWARE.
 Capture data from DS18B20 probes attached to Raspberry Pi GPIO_4
 """
 
+import concurrent.futures
+import ctypes
+import ctypes.util
 import glob
+import os
 import struct
+import threading
+import time
 
-SENSOR_BASE_FILENAME = '/sys/bus/w1/devices/28-'
+DEBUG = 0
+if DEBUG:
+    import sys
+
+W1_DEVICES_DIR = '/sys/bus/w1/devices'
+SENSOR_BASE_FILENAME = W1_DEVICES_DIR + '/28-'
 SENSOR_BASE_FILENAME_GLOB = SENSOR_BASE_FILENAME + '*'
+BUS_MASTER_GLOB = 'w1_bus_master*'
+BULK_READ_FILENAME = 'therm_bulk_read'
+BULK_READ_TRIGGER = 'trigger\n'
 SENSOR_TYPE_NAME = 'DS1820'
 
+# ways retrieve_all_temps() can read the devices
+RETRIEVE_MODE_SERIAL = 'serial'    # one device at a time, like retrieve_temp()
+RETRIEVE_MODE_THREADS = 'threads'  # read all devices from a pool of threads
+RETRIEVE_MODE_BULK = 'bulk'        # one conversion for all devices on a bus
+RETRIEVE_MODE_AUTO = 'auto'        # bulk if the kernel supports it else threads
+RETRIEVE_MODES = (RETRIEVE_MODE_SERIAL,
+                  RETRIEVE_MODE_THREADS,
+                  RETRIEVE_MODE_BULK,
+                  RETRIEVE_MODE_AUTO)
+DEFAULT_RETRIEVE_MODE = RETRIEVE_MODE_AUTO
+MAX_RETRIEVE_THREADS = 32
+
+# sysfs does not always report changes so rescan at least this often
+DEFAULT_REGISTRY_TTL_IN_SECONDS = 60
+
+# from <sys/inotify.h>
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+REGISTRY_INOTIFY_MASK = (IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO |
+                         IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+INOTIFY_READ_SIZE = 4096
+
+
+class DS18B20_DeviceRegistry:
+    """
+    Cache of the IDs of the DS18B20 devices found in a w1 devices directory.
+    
+    The directory is only scanned again when it has changed.  Changes are
+    noticed with inotify where the C library provides it, otherwise by a
+    change of the directory mtime.  Because sysfs does not promise to
+    report either, the directory is also scanned when the cached list is
+    older than ttl seconds.  refresh() forces a scan.
+    """
+    def __init__(self, devices_dir=W1_DEVICES_DIR,
+                 ttl=DEFAULT_REGISTRY_TTL_IN_SECONDS):
+        self.__devices_dir = devices_dir
+        self.__base_filename = os.path.join(devices_dir, '28-')
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__ids = None
+        self.__scan_time = None
+        self.__mtime = None
+        self.__inotify_fd = self.__open_inotify()
+
+    def close(self):
+        """
+        release the inotify watch, if any
+        """
+        with self.__lock:
+            if self.__inotify_fd is not None:
+                os.close(self.__inotify_fd)
+                self.__inotify_fd = None
+
+    def uses_inotify(self):
+        """
+        return True if changes are detected with inotify
+        """
+        return self.__inotify_fd is not None
+
+    def get_ids(self):
+        """
+        return a list of IDs for connected DS18B20 devices, scanning the
+        directory only if it might have changed
+        """
+        with self.__lock:
+            if self.__is_stale():
+                self.__scan()
+            return list(self.__ids)
+
+    def refresh(self):
+        """
+        scan the directory now and return the list of IDs
+        """
+        with self.__lock:
+            self.__scan()
+            return list(self.__ids)
+
+    def invalidate(self):
+        """
+        make the next get_ids() scan the directory
+        """
+        with self.__lock:
+            self.__ids = None
+
+    def __open_inotify(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            return None
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        wd = libc.inotify_add_watch(fd, 
+                                    os.fsencode(self.__devices_dir),
+                                    REGISTRY_INOTIFY_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def __directory_changed(self):
+        if self.__inotify_fd is not None:
+            changed = False
+            try:
+                while os.read(self.__inotify_fd, INOTIFY_READ_SIZE):
+                    changed = True
+            except BlockingIOError:
+                pass
+            return changed
+        try:
+            mtime = os.stat(self.__devices_dir).st_mtime_ns
+        except OSError:
+            mtime = None
+        return mtime != self.__mtime
+
+    def __is_stale(self):
+        if self.__ids is None:
+            return True
+        if time.monotonic() - self.__scan_time > self.__ttl:
+            return True
+        return self.__directory_changed()
+
+    def __scan(self):
+        if self.__inotify_fd is not None:
+            self.__directory_changed()  # drain events that came before this scan
+        else:
+            try:
+                self.__mtime = os.stat(self.__devices_dir).st_mtime_ns
+            except OSError:
+                self.__mtime = None
+        result = []
+        for e in glob.glob(self.__base_filename + '*'):
+            i = e.replace(self.__base_filename, '')
+            result.append(i)
+        if DEBUG:
+            print('scanned "{}" and found {}'.format(self.__devices_dir, result),
+                  file=sys.stderr, flush=True)
+        self.__ids = result
+        self.__scan_time = time.monotonic()
+
+
 class DS18B20_Controller:
     """
     This class provides access to multiple DS18B20 devices attached to a Raspberry Pi
     on the default pin (GPIO_4).
+    
+    The devices_dir can be changed to point at a copy of the w1 sysfs tree
+    which is handy for testing.
+    
+    The list of devices is held in a DS18B20_DeviceRegistry so sampling
+    does not scan the directory each time.  registry_ttl sets how old the
+    list can get before the directory is scanned anyway.
     """
-    def __init__(self):
-        pass
+    def __init__(self, devices_dir=W1_DEVICES_DIR,
+                 registry_ttl=DEFAULT_REGISTRY_TTL_IN_SECONDS):
+        self.__devices_dir = devices_dir
+        self.__base_filename = os.path.join(devices_dir, '28-')
+        self.__registry = DS18B20_DeviceRegistry(devices_dir, registry_ttl)
+    
+    def close(self):
+        """
+        release resources held by the controller
+        """
+        self.__registry.close()
     
     def get_sensor_type(self):
         """
@@ -52,12 +232,13 @@ class DS18B20_Controller:
         """
         return a list of IDs for connected DS18B20 devices
         """
-        result = []
-        for e in glob.glob(SENSOR_BASE_FILENAME_GLOB):
-            i = e.replace(SENSOR_BASE_FILENAME, '')
-            result.append(i)
+        return self.__registry.get_ids()
 
-        return result
+    def refresh(self):
+        """
+        look for connected DS18B20 devices now and return the list of IDs
+        """
+        return self.__registry.refresh()
         
     def retrieve_temp(self, i):
         """
@@ -67,7 +248,7 @@ class DS18B20_Controller:
         The id is a string with the numeric sensor id value.
         """
         
-        sensor_filename = SENSOR_BASE_FILENAME + i + '/w1_slave' 
+        sensor_filename = self.__base_filename + i + '/w1_slave' 
         with open(sensor_filename) as f:
             raw_line_1 = f.readline().split()
             raw_line_2 = f.readline().split()
@@ -84,6 +265,98 @@ class DS18B20_Controller:
         
         return temp
 
+    def get_bulk_read_filenames(self):
+        """
+        return a list of the therm_bulk_read files of the w1 bus masters.
+        
+        The list is empty when the kernel does not support bulk reads.
+        """
+        return glob.glob(os.path.join(self.__devices_dir,
+                                      BUS_MASTER_GLOB,
+                                      BULK_READ_FILENAME))
+
+    def trigger_bulk_read(self):
+        """
+        Ask every w1 bus master to start a temperature conversion on all
+        its devices at once.  Following reads of the devices wait only for
+        whatever is left of that single conversion.
+        
+        Return True if any bus master accepted the trigger.
+        """
+        triggered = False
+        for bulk_filename in self.get_bulk_read_filenames():
+            try:
+                with open(bulk_filename, 'w') as f:
+                    f.write(BULK_READ_TRIGGER)
+                triggered = True
+            except OSError as ex:
+                if DEBUG:
+                    print('bulk trigger on "{}" failed with "{}"'.format(bulk_filename, ex),
+                          file=sys.stderr, flush=True)
+        return triggered
+
+    def retrieve_all_temps(self, mode=DEFAULT_RETRIEVE_MODE, ids=None):
+        """
+        Retrieve the temperature of all the DS18B20 devices (or the devices
+        in the ids list) and return a map of {device_id, degrees_c}.
+        
+        mode selects how the devices are read:
+          RETRIEVE_MODE_SERIAL  -- one after the other, each read waits for
+                                   its own ~750 mSec conversion
+          RETRIEVE_MODE_THREADS -- all devices are read from a pool of
+                                   threads so conversions can overlap
+                                   (some kernels serialize the reads of
+                                   devices on the same bus master)
+          RETRIEVE_MODE_BULK    -- trigger one conversion for all devices
+                                   with therm_bulk_read then read the results
+          RETRIEVE_MODE_AUTO    -- BULK if the kernel provides therm_bulk_read
+                                   otherwise THREADS
+        
+        Devices which can not be read are left out of the result.
+        """
+        if mode not in RETRIEVE_MODES:
+            raise ValueError('mode "{}" is not one of {}'.format(mode, RETRIEVE_MODES))
+        if ids is None:
+            ids = self.get_ids()
+        if not ids:
+            return {}
+
+        if mode in (RETRIEVE_MODE_BULK, RETRIEVE_MODE_AUTO):
+            if self.trigger_bulk_read():
+                # conversions are running in parallel on the devices
+                mode = RETRIEVE_MODE_SERIAL
+            elif mode == RETRIEVE_MODE_BULK:
+                raise IOError('no w1 bus master in "{}" supports {}'.format(self.__devices_dir,
+                                                                          BULK_READ_FILENAME))
+            else:
+                mode = RETRIEVE_MODE_THREADS
+
+        result = {}
+        if mode == RETRIEVE_MODE_SERIAL:
+            for i in ids:
+                try:
+                    result[i] = self.retrieve_temp(i)
+                except FileNotFoundError:
+                    self.__registry.invalidate()  # device went away
+                except (OSError, ValueError) as ex:
+                    if DEBUG:
+                        print('reading "{}" failed with "{}"'.format(i, ex),
+                              file=sys.stderr, flush=True)
+        else:
+            workers = min(len(ids), MAX_RETRIEVE_THREADS)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [(i, executor.submit(self.retrieve_temp, i)) for i in ids]
+                for i, future in futures:
+                    try:
+                        result[i] = future.result()
+                    except FileNotFoundError:
+                        self.__registry.invalidate()  # device went away
+                    except (OSError, ValueError) as ex:
+                        if DEBUG:
+                            print('reading "{}" failed with "{}"'.format(i, ex),
+                                  file=sys.stderr, flush=True)
+        return result
+
 
 #
 # main
@@ -95,6 +368,6 @@ if __name__ == '__main__':
     controller = DS18B20_Controller()  # take defaults
     ids = controller.get_ids()
     print("DS18B20s found: {}".format(ids))
+    temps = controller.retrieve_all_temps()
     for i in ids:
-        temp = controller.retrieve_temp(i)
-        print ("{} : Temperature :  {} C".format(i, temp))
+        print ("{} : Temperature :  {} C".format(i, temps.get(i)))
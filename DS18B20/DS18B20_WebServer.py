@@ -32,8 +32,11 @@ Datasheet at https://datasheets.maximintegrated.com/en/ds/DS18B20.pdf
 """
 
 import datetime
-import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sensor_web_server
 
 import DS18B20_Controller
 
@@ -44,51 +47,44 @@ DEFAULT_LISTEN_PORT = 1820            # IP port 1820
 DEFAULT_SERVER_ADDRESS = (DEFAULT_LISTEN_ADDRESS, DEFAULT_LISTEN_PORT)
 
 
-class DS18B20_HTTPServer_RequestHandler(BaseHTTPRequestHandler):
+DEFAULT_REFRESH_INTERVAL_IN_SECONDS = 10
+
+
+class DS18B20_Sampler:
     '''
-    A subclass of BaseHTTPRequestHandler to provide information about
-    DS18B20 sensors.
+    Take samples from DS18B20 devices for the sensor_web_server.SampleCache.
     '''
     
-    # holds the controller for the DS18B20 devices, will be created
-    # when first needed
-    __controller = None
+    def __init__(self):
+        # holds the controller for the DS18B20 devices, will be created
+        # when first needed
+        self.__controller = None
     
-    def do_GET(self):
+    def __call__(self):
         '''
-        handle the HTTP GET request
+        return a list with a sample for each DS18B20 device
         '''
         # first time through get create the controller
         if self.__controller is None:
             self.__controller = DS18B20_Controller.DS18B20_Controller()
         
-        # Send response status code
-        self.send_response(200)
- 
-        # Send headers
-        self.send_header('Content-type','application/json')
-        self.end_headers()
-
         result=[]
          
-        for i in self.__controller.get_ids():
+        temps = self.__controller.retrieve_all_temps()
+        when = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for i in temps.keys():
             sample = {}
             sample['type'] = self.__controller.get_sensor_type()
             sample['id']=i
-            temp = self.__controller.retrieve_temp(i)
-            sample['temp_C'] = temp
-            sample['when'] = \
-                datetime.datetime.now(datetime.timezone.utc).isoformat()
+            sample['temp_C'] = temps[i]
+            sample['when'] = when
             result.append(sample)
-        # Write content as utf-8 data
-        self.wfile.write(bytes(json.dumps(result, indent=1), "utf8"))
-        return
+        return result
     
  
 def run():
-    httpd_server = HTTPServer(DEFAULT_SERVER_ADDRESS,
-                              DS18B20_HTTPServer_RequestHandler)
-    print('running server listening on {}...'.format(DEFAULT_SERVER_ADDRESS))
-    httpd_server.serve_forever()
+    sensor_web_server.run(DEFAULT_SERVER_ADDRESS,
+                          DS18B20_Sampler(),
+                          DEFAULT_REFRESH_INTERVAL_IN_SECONDS)
     
 run()
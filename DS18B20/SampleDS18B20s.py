@@ -27,42 +27,63 @@ SOFTWARE.
 Capture data from DS18B20 sensors in /sys/bus/w1/devices and 
 send data to /opt/sensors/logs/DS18B20.log in format of:
   <Timestamp> <Device> <ID> <degrees C>
+or, with --format binary, one file per sensor in the format of
+binary_sample_log.py
   
 Datasheet at https://datasheets.maximintegrated.com/en/ds/DS18B20.pdf
 
 """
 
+import argparse
 import datetime
+import os
+import signal
+import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sample_writer
+
 import DS18B20_Controller
 
 DEBUG = 0
-if DEBUG:
-    import sys
 
 SAMPLE_INTERVAL_IN_SECONDS = 60 * 10
-OUTPUT_FORMAT = '{} DS18B20 {} {:.3f}\n'
+SENSOR_TYPE_NAME = 'DS18B20'
 RESULT_FILENAME = '/opt/Sensors/logs/DS18B20.log'
+FIELD_NAMES = ('temp_C',)
 
 #
 # main
 #
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Capture and log data from DS18B20 sensors.')
+    parser.add_argument('-d', '--debug',
+                        help='turn on debugging',
+                        action='store_true')
+    sample_writer.add_writer_arguments(parser)
+    args = parser.parse_args()
+
+    if (args.debug):
+        DEBUG = 1
+        print('turned on DEBUG from command line.',
+              file=sys.stderr, flush=True)
     
     controller = DS18B20_Controller.DS18B20_Controller()
 
-    with open(RESULT_FILENAME, 'a') as output:
+    # systemd stops the service with SIGTERM, exit so queued samples are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writer = sample_writer.SampleWriter(**sample_writer.get_writer_options(args))
+    try:
         next_sample_time = time.time()
         while True:
-            for device_id in controller.get_ids():
-                when = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                temperature = controller.retrieve_temp(device_id)
-                result = OUTPUT_FORMAT.format(when,
-                                              device_id,
-                                              temperature)
-                output.write(result)
-                output.flush()
+            when = datetime.datetime.now(datetime.timezone.utc)
+            temperatures = controller.retrieve_all_temps()
+            writer.write_samples(RESULT_FILENAME,
+                                 [(SENSOR_TYPE_NAME, device_id, (temperatures[device_id],))
+                                  for device_id in temperatures.keys()],
+                                 when,
+                                 FIELD_NAMES)
                 
             next_sample_time = next_sample_time + SAMPLE_INTERVAL_IN_SECONDS
             delay_time = next_sample_time - time.time()
@@ -72,3 +93,5 @@ if __name__ == '__main__':
         
             if 0 < delay_time:  # don't sleep if already next sample time
                 time.sleep(delay_time)
+    finally:
+        writer.close()
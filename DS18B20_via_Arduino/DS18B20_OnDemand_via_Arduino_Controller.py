@@ -27,10 +27,37 @@ SOFTWARE.
 A Controller to retrieve temperatures from one of the DS18B20_*_SampleOnDemand
 devices.
 
+retrieve_all_temperatures() asks all the Arduinos for samples at once and 
+gathers the responses as they arrive, so a sweep takes as long as the 
+slowest Arduino rather than the sum of them.
+
+probe_ports() opens all the candidate ports at once, each in its own thread,
+and gives up on those not done by a shared deadline, so startup takes about
+one Arduino reset rather than one per port.  What was found on each USB 
+device is kept in a JSON file keyed by the USB serial number, or VID:PID and
+location when there is none, so ports known not to hold a usable Arduino 
+are not probed again after a restart, even if the port names change.
+They are probed again once NEGATIVE_CACHE_TTL_IN_SEC has passed, in case
+the Arduino was programmed since.
+
+Opening a serial port normally raises DTR, which resets an Arduino Nano, 
+and the controller then waits RESET_TIME_IN_SEC for it to boot.  Unless
+reset_on_open is given the port is opened with DTR and RTS held as they 
+are and HUPCL cleared, so closing the port does not drop DTR and the next
+open does not reset the Arduino.  Readiness is found by sending the '`' 
+version command with short timeouts until the version comes back, which
+takes milliseconds when the Arduino is already running.  The first open
+after the Arduino is plugged in still resets it, the polling waits for 
+that too.
+
 """
 
 import argparse
+import json
+import os
+import selectors
 import sys
+import threading
 import time
 
 import serial.tools.list_ports
@@ -43,8 +70,16 @@ FILTERED_OUT_PORTS = ['COM1', # windows seems to use this
                       '/dev/ttyAMA0'] # raspberry pi console
 
 PORT_SPEED = 115200
+PROBE_DEADLINE_IN_SEC = 15.0
+DEFAULT_CACHE_DIRECTORY = '/opt/Sensors/cache/'
+PORT_CACHE_FILENAME = 'DS18B20_via_Arduino_ports.json'
+TEMPORARY_SUFFIX = '.tmp'
+NEGATIVE_CACHE_TTL_IN_SEC = 24 * 60 * 60  # probe ports without a usable program again after this
 TIMEOUT_IN_SEC = 2.0
 RESET_TIME_IN_SEC = 3.0
+RESET_ON_OPEN = False               # default, see the module description
+READY_POLL_TIMEOUT_IN_SEC = 0.1     # wait this long for each version reply
+READY_TIMEOUT_IN_SEC = 5.0          # give up if not ready by then
 MAX_VERSION_LINE_LENGTH = 256
 MAX_SAMPLE_LINE_LENGTH = 256
 MINIMUM_VERSION = 4
@@ -55,34 +90,52 @@ READ_TEMPERATURE_SENSORS_COMMAND = '?'.encode('UTF-8')
 
 SENSOR_TYPE_NAME = 'DS18B20'
 
+
+def parse_sample_line(line, result):
+    """
+    Add the {device_id, degrees_c} from a "DS18B20 <id> <degrees_c>" line
+    to result, other lines are ignored.
+    """
+    part = line.split()
+    try:
+        if 'DS18B20' == part[0]:
+            result[part[1].replace('.','')] = float(part[2])
+    except:
+        pass # ignore ill-formed lines
+
+
 class DS18B20_OnDemand_via_Arduino_Controller:
     
-    def __init__(self, serial_port_name=None, speed=PORT_SPEED, timeout=TIMEOUT_IN_SEC):
+    def __init__(self, serial_port_name=None, speed=PORT_SPEED, timeout=TIMEOUT_IN_SEC,
+                 reset_on_open=RESET_ON_OPEN):
         self.__serial_port_name = serial_port_name
         self.__speed = speed
         self.__timeout_in_seconds = timeout
         if DEBUG:
             print(f'looking for usable device on port "{self.__serial_port_name}"',
                   file=sys.stderr, flush=True)
-        self.__serial_port = serial.Serial(self.__serial_port_name, 
-                                           baudrate=self.__speed, 
-                                           timeout=self.__timeout_in_seconds)
-        # give Arduino time to reset after serial open which causes a reset
-        time.sleep(RESET_TIME_IN_SEC)  
-
-        self.__serial_port.reset_input_buffer() #clears buffer before reading to remove any residual data.
-        if DEBUG:
-            print(f'on "{self.__serial_port_name}" made "{self.__serial_port}"',
-                  file=sys.stderr, flush=True)
-        if DEBUG:
-            print(f'reading program version on "{self.__serial_port_name}"',
-                  file=sys.stderr, flush=True)
-        self.__serial_port.write(READ_VERSION_COMMAND)
-        self.__serial_port.flush()
+        if reset_on_open:
+            self.__serial_port = serial.Serial(self.__serial_port_name, 
+                                               baudrate=self.__speed, 
+                                               timeout=self.__timeout_in_seconds)
+            # give Arduino time to reset after serial open which causes a reset
+            time.sleep(RESET_TIME_IN_SEC)  
+
+            self.__serial_port.reset_input_buffer() #clears buffer before reading to remove any residual data.
+            if DEBUG:
+                print(f'on "{self.__serial_port_name}" made "{self.__serial_port}"',
+                      file=sys.stderr, flush=True)
+            if DEBUG:
+                print(f'reading program version on "{self.__serial_port_name}"',
+                      file=sys.stderr, flush=True)
+            self.__serial_port.write(READ_VERSION_COMMAND)
+            self.__serial_port.flush()
 
-        version = self.__serial_port.read(MAX_VERSION_LINE_LENGTH).decode('UTF-8').strip()
-#        version = self.__serial_port.read(MAX_VERSION_LINE_LENGTH)
-#TBD        version = self.__serial_port.readline().decode('UTF-8').strip()
+            version = self.__serial_port.read(MAX_VERSION_LINE_LENGTH).decode('UTF-8').strip()
+            booted = True
+        else:
+            self.__serial_port = self.__open_without_reset()
+            version, booted = self.__poll_version()
         if DEBUG:
             print(f'version command returned "{version}"',
                   file=sys.stderr, flush=True)
@@ -99,7 +152,68 @@ class DS18B20_OnDemand_via_Arduino_Controller:
             print(f'on port "{self.__serial_port_name}" found "{self.__program_version}"',
                   file=sys.stderr, flush=True)
 
-        _junk = self.retrieve_temperatures()  # first read might be incomplete
+        # partial response of a retrieve started with start_retrieve()
+        self.__pending_bytes = bytearray()
+        self.__pending_result = {}
+
+        if booted:
+            _junk = self.retrieve_temperatures()  # first read might be incomplete
+
+    def __open_without_reset(self):
+        """
+        Open the serial port with DTR and RTS left asserted, so an Arduino
+        that is running is not reset, and clear HUPCL so closing the port
+        leaves them asserted for the next open.
+        """
+        port = serial.Serial()
+        port.port = self.__serial_port_name
+        port.baudrate = self.__speed
+        port.timeout = self.__timeout_in_seconds
+        port.dtr = True   # the state the kernel gives the lines on open
+        port.rts = True
+        port.open()
+        try:
+            import termios
+            attributes = termios.tcgetattr(port.fileno())
+            attributes[2] &= ~termios.HUPCL
+            termios.tcsetattr(port.fileno(), termios.TCSANOW, attributes)
+        except (ImportError, AttributeError, OSError) as e:
+            # e.g. Windows, which keeps the lines as set anyway
+            if DEBUG:
+                print(f'could not clear HUPCL on "{self.__serial_port_name}": {e}',
+                      file=sys.stderr, flush=True)
+        return port
+
+    def __poll_version(self):
+        """
+        Send the version command until a version line comes back or 
+        READY_TIMEOUT_IN_SEC passes.  Return the version line, or the last
+        line read if there was no version, and True if the Arduino did not
+        answer the first poll, e.g. because it was booting.
+        """
+        deadline = time.monotonic() + READY_TIMEOUT_IN_SEC
+        self.__serial_port.timeout = READY_POLL_TIMEOUT_IN_SEC
+        version = ''
+        polls = 0
+        try:
+            while time.monotonic() < deadline:
+                polls += 1
+                self.__serial_port.reset_input_buffer() #clears buffer before reading to remove any residual data.
+                self.__serial_port.write(READ_VERSION_COMMAND)
+                self.__serial_port.flush()
+                # skip what an interrupted sample sweep may still be sending
+                line = self.__serial_port.readline(MAX_VERSION_LINE_LENGTH)
+                while len(line) and time.monotonic() < deadline:
+                    version = line.decode('UTF-8', errors='replace').strip()
+                    if '_DS18B20_' in version:
+                        if DEBUG:
+                            print(f'"{self.__serial_port_name}" ready after {polls} polls',
+                                  file=sys.stderr, flush=True)
+                        return version, polls > 1
+                    line = self.__serial_port.readline(MAX_VERSION_LINE_LENGTH)
+        finally:
+            self.__serial_port.timeout = self.__timeout_in_seconds
+        return version, True
 
         
     def __repr__(self):
@@ -114,6 +228,12 @@ class DS18B20_OnDemand_via_Arduino_Controller:
         """
         return SENSOR_TYPE_NAME
             
+    def close(self):
+        """
+        close the serial port, the controller can not be used after this.
+        """
+        self.__serial_port.close()
+            
     def get_arduino_program_version(self):
         """
         return the version string from the Arduino program.
@@ -136,12 +256,7 @@ class DS18B20_OnDemand_via_Arduino_Controller:
             print(f'first line read: "{line}"',
                   file=sys.stderr, flush=True)
         while len(line):  # there are non-empty lines to read
-            part = line.split()
-            try:
-                if 'DS18B20' == part[0]:
-                    result[part[1].replace('.','')] = float(part[2])
-            except:
-                pass # ignore ill-formed lines
+            parse_sample_line(line, result)
             
             # get next line
             line = self.__serial_port.readline(MAX_SAMPLE_LINE_LENGTH).decode('UTF-8').strip()
@@ -151,6 +266,93 @@ class DS18B20_OnDemand_via_Arduino_Controller:
 
         return result        
         
+    def fileno(self):
+        """
+        return the file descriptor of the serial port so the controller
+        can be used with selectors.
+        """
+        return self.__serial_port.fileno()
+
+    def start_retrieve(self):
+        """
+        Ask the Arduino for samples without waiting for the response.
+        Feed the response with feed_retrieve() when the port is readable.
+        """
+        self.__pending_bytes = bytearray()
+        self.__pending_result = {}
+        self.__serial_port.reset_input_buffer() #clears buffer before reading to remove any residual data.
+        self.__serial_port.write(READ_TEMPERATURE_SENSORS_COMMAND)
+        self.__serial_port.flush()
+
+    def feed_retrieve(self):
+        """
+        Read what the Arduino has sent so far, without blocking, and parse
+        the complete lines.  Return True once the empty line ending the
+        response has been read, the result is then in finish_retrieve().
+        """
+        data = self.__serial_port.read(self.__serial_port.in_waiting or 1)
+        self.__pending_bytes.extend(data)
+        while True:
+            end = self.__pending_bytes.find(b'\n')
+            if end < 0:
+                if len(self.__pending_bytes) > MAX_SAMPLE_LINE_LENGTH:
+                    self.__pending_bytes.clear()  # same as readline giving up
+                return False
+            line = self.__pending_bytes[:end].decode('UTF-8', errors='replace').strip()
+            del self.__pending_bytes[:end + 1]
+            if DEBUG:
+                print(f'line read on "{self.__serial_port_name}": "{line}"',
+                      file=sys.stderr, flush=True)
+            if not len(line):
+                return True
+            parse_sample_line(line, self.__pending_result)
+
+    def finish_retrieve(self):
+        """
+        Return the map of {device_id, degrees_c} of the retrieve started 
+        with start_retrieve(), it is partial if the response did not end.
+        """
+        result = self.__pending_result
+        self.__pending_result = {}
+        self.__pending_bytes = bytearray()
+        return result
+
+
+def retrieve_all_temperatures(controller_map, timeout=TIMEOUT_IN_SEC):
+    """
+    Retrieve temperatures from all the controllers in the map of 
+    {name, controller} at the same time.  A controller that has not 
+    finished within timeout seconds gives what it sent so far.
+    
+    Return a map of {name, {device_id, degrees_c}}
+    """
+    if not controller_map:
+        return {}
+    try:
+        for c in controller_map.values():
+            c.fileno()
+    except Exception:
+        # no file descriptors to select on, e.g. Windows, one at a time
+        return {name: c.retrieve_temperatures() for name, c in controller_map.items()}
+
+    with selectors.DefaultSelector() as selector:
+        for name, c in controller_map.items():
+            c.start_retrieve()
+            selector.register(c, selectors.EVENT_READ, name)
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if DEBUG:
+                    print(f'timed out waiting for {sorted(k.data for k in selector.get_map().values())}',
+                          file=sys.stderr, flush=True)
+                break
+            for key, _ in selector.select(remaining):
+                if key.fileobj.feed_retrieve():
+                    selector.unregister(key.fileobj)
+
+    return {name: c.finish_retrieve() for name, c in controller_map.items()}
+        
 
 #####################
    
@@ -180,29 +382,185 @@ def determine_ports():
     return filtered_ports
 
 
-def find_DS18B20_device(port_list):
+def port_identities():
     """
-    Try to find usable DS18B20 on the given ports.
-    
-    return a map of {name, controller}
+    Return a map of {port name, USB identity} for the USB serial ports, the
+    identity is the USB serial number or VID:PID and location if there is
+    no serial number.
     """
     result = {}
-    for p in port_list:
+    for comport in serial.tools.list_ports.comports():
+        if comport.serial_number:
+            result[comport.device] = f'SN:{comport.serial_number}'
+        elif comport.vid is not None:
+            result[comport.device] = f'{comport.vid:04X}:{comport.pid:04X}@{comport.location}'
+    return result
+
+
+def load_port_cache(cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Return the map of {USB identity, entry} from the port cache, empty if
+    there is no usable cache.  Entries hold:
+      port        port name when last probed
+      found       True if a usable Arduino program was found
+      version     the Arduino program version or None
+      probe_time  seconds the probe took
+      checked     time.time() of the probe
+    """
+    filename = os.path.join(cache_directory, PORT_CACHE_FILENAME)
+    try:
+        with open(filename, 'r') as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            raise ValueError('not a map')
+        return cache
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        if DEBUG:
+            print(f'ignoring port cache "{filename}": {e}',
+                  file=sys.stderr, flush=True)
+        return {}
+
+
+def is_known_unusable(entry, now):
+    """
+    Return True if the port cache entry says the USB device had no usable
+    Arduino program when probed less than NEGATIVE_CACHE_TTL_IN_SEC before
+    now.  Older entries, and those without a valid checked time, are not
+    trusted.
+    """
+    if not isinstance(entry, dict) or entry.get('found', True):
+        return False
+    checked = entry.get('checked')
+    if not isinstance(checked, (int, float)):
+        return False
+    return 0 <= now - checked < NEGATIVE_CACHE_TTL_IN_SEC
+
+
+def save_port_cache(cache, cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Write the port cache.  Return True if it was written, a cache that 
+    cannot be written only costs time so errors are not raised.
+    """
+    filename = os.path.join(cache_directory, PORT_CACHE_FILENAME)
+    temporary_filename = filename + TEMPORARY_SUFFIX
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        with open(temporary_filename, 'w') as f:
+            json.dump(cache, f, sort_keys=True, indent=1)
+        # readers see the old cache or the new one, never part of one
+        os.replace(temporary_filename, filename)
+        return True
+    except OSError as e:
+        if DEBUG:
+            print(f'could not write port cache "{filename}": {e}',
+                  file=sys.stderr, flush=True)
+        return False
+
+
+def probe_ports(port_list, deadline_in_sec=PROBE_DEADLINE_IN_SEC, 
+                cache_directory=DEFAULT_CACHE_DIRECTORY, reset_on_open=RESET_ON_OPEN):
+    """
+    Try to find usable DS18B20 on the given ports, all probed at once.
+    Probes not done deadline_in_sec after the start are given up and their 
+    ports closed when they finish.  USB devices the port cache says did 
+    not hold a usable Arduino, see is_known_unusable(), are skipped, 
+    cache_directory of None neither reads nor writes the cache.  
+    reset_on_open is given to the controllers.
+    
+    return a map of {name, controller} and a map of {name, seconds} of how
+    long each probe took, None for those given up
+    """
+    identities = port_identities() if cache_directory else {}
+    cache = load_port_cache(cache_directory) if cache_directory else {}
+
+    lock = threading.Lock()
+    controllers = {}
+    probe_times = {}
+    abandoned = [False]
+
+    def probe(p):
+        start = time.monotonic()
+        controller = None
         try:
             if DEBUG:
                 print(f'looking for device on "{p}"',
                       file=sys.stderr, flush=True)
             # get serial port access for each serial device
-            controller = DS18B20_OnDemand_via_Arduino_Controller(p)
-            result[p] = controller
+            controller = DS18B20_OnDemand_via_Arduino_Controller(p, reset_on_open=reset_on_open)
             if DEBUG:
-                print(f'found "{result[p]}"',
+                print(f'found "{controller}"',
                       file=sys.stderr, flush=True)
         except Exception as ex:
             if DEBUG:
                 print(f'while looking for device on "{p}" caught "{ex}"',
                       file=sys.stderr, flush=True)            
-    return result
+        with lock:
+            if abandoned[0]:
+                if controller is not None:
+                    controller.close()
+                return
+            probe_times[p] = time.monotonic() - start
+            if controller is not None:
+                controllers[p] = controller
+
+    threads = []
+    now = time.time()
+    for p in port_list:
+        if is_known_unusable(cache.get(identities.get(p)), now):
+            if DEBUG:
+                print(f'skipping "{p}", {identities[p]} had no usable program',
+                      file=sys.stderr, flush=True)
+            continue
+        t = threading.Thread(target=probe, args=(p,), name=f'probe {p}', daemon=True)
+        t.start()
+        threads.append((p, t))
+
+    deadline = time.monotonic() + deadline_in_sec
+    for _, t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    with lock:
+        abandoned[0] = True
+        result = dict(controllers)
+        times = dict(probe_times)
+    for p, _ in threads:
+        if p not in times:
+            times[p] = None
+            if DEBUG:
+                print(f'gave up on "{p}" after {deadline_in_sec} seconds',
+                      file=sys.stderr, flush=True)
+
+    if cache_directory:
+        now = time.time()
+        for p, seconds in times.items():
+            if p in identities and seconds is not None:
+                cache[identities[p]] = {'port': p,
+                                        'found': p in result,
+                                        'version': result[p].get_arduino_program_version() if p in result else None,
+                                        'probe_time': seconds,
+                                        'checked': now}
+        save_port_cache(cache, cache_directory)
+
+    # keep the order of the port list
+    return ({p: result[p] for p in port_list if p in result}, 
+            {p: times[p] for p in port_list if p in times})
+
+
+def find_DS18B20_device(port_list, deadline_in_sec=PROBE_DEADLINE_IN_SEC,
+                        cache_directory=DEFAULT_CACHE_DIRECTORY, reset_on_open=RESET_ON_OPEN):
+    """
+    Try to find usable DS18B20 on the given ports, see probe_ports().
+    
+    return a map of {name, controller}
+    """
+    controllers, probe_times = probe_ports(port_list, deadline_in_sec, cache_directory,
+                                           reset_on_open)
+    if DEBUG:
+        for p, seconds in probe_times.items():
+            print(f'probe of "{p}" took {seconds} seconds',
+                  file=sys.stderr, flush=True)
+    return controllers
 
 #
 # main
@@ -215,6 +573,9 @@ if __name__ == "__main__":
     parser.add_argument("-p", "--port", 
                         help="port to which Arduino is connected (suggested, otherwise looks at all ports)", 
                         required=False)
+    parser.add_argument("--reset_on_open", 
+                        help="let opening the port reset the Arduino and wait for it to boot", 
+                        action="store_true")
     args = parser.parse_args()
 
     if (args.debug):
@@ -237,8 +598,16 @@ if __name__ == "__main__":
               file=sys.stderr, flush=True)
     
     # get serial port access for each serial device
-    controller_map = find_DS18B20_device(port_name_list)
+    controller_map, probe_times = probe_ports(port_name_list, reset_on_open=args.reset_on_open)
+    for p in probe_times.keys():
+        print(f'probe of {p} took {probe_times[p]} seconds')
 
     for c in controller_map.keys():
         print(f'    {c} : {controller_map[c].get_type()} : {controller_map[c].get_arduino_program_version()}')
-        print(controller_map[c].retrieve_temperatures())
\ No newline at end of file
+        print(controller_map[c].retrieve_temperatures())
+
+    start = time.monotonic()
+    all_samples = retrieve_all_temperatures(controller_map)
+    print(f'all at once in {time.monotonic() - start:.3f} seconds:')
+    for c in all_samples.keys():
+        print(f'    {c} : {all_samples[c]}')
\ No newline at end of file
@@ -31,11 +31,13 @@ Datasheet at https://datasheets.maximintegrated.com/en/ds/DS18B20.pdf
 
 """
 
-import json
+import os
 import serial
 import serial.tools.list_ports
 import sys
-from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sensor_web_server
 
 import DS18B20_OnDemand_via_Arduino_Controller
 
@@ -48,6 +50,8 @@ DEFAULT_LISTEN_PORT = 18820                 # IP port 18820
 #DEFAULT_LISTEN_PORT = TBD                  # Pick some other port if you prefer
 DEFAULT_SERVER_ADDRESS = (DEFAULT_LISTEN_ADDRESS, DEFAULT_LISTEN_PORT)
 
+DEFAULT_REFRESH_INTERVAL_IN_SECONDS = 30
+
 
 # remove these devices from list -- this list is ad hoc
 # probably best to put the port names on the command line
@@ -87,81 +91,58 @@ def find_DS18B20_devices():
     
     return a map of {name, controller}
     """
-    result = {}
-    for p in determine_ports():
-        try:
-            if DEBUG:
-                print(f'looking for device on "{p}"',
-                      file=sys.stderr, flush=True)
-            # get serial port access for each serial device
-            controller = DS18B20_OnDemand_via_Arduino_Controller.DS18B20_OnDemand_via_Arduino_Controller(p)
-            result[p] = controller
-            if DEBUG:
-                print(f'found "{result[p]}"',
-                      file=sys.stderr, flush=True)
-        except Exception as ex:
-            if DEBUG:
-                print(f'while looking for device on "{p}" caught "{ex}"',
-                      file=sys.stderr, flush=True)            
-    return result
+    # all the ports are probed at once
+    controllers, probe_times = \
+        DS18B20_OnDemand_via_Arduino_Controller.probe_ports(determine_ports())
+    if DEBUG:
+        for p in probe_times.keys():
+            print(f'probe of "{p}" took {probe_times[p]} seconds',
+                  file=sys.stderr, flush=True)
+    return controllers
 
 
 
-class DS18B20_via_Arduino_HTTPServer_RequestHandler(BaseHTTPRequestHandler):
+class DS18B20_via_Arduino_Sampler:
     '''
-    A subclass of BaseHTTPRequestHandler to provide information about DS18B20 sensors.
+    Take samples from DS18B20 sensors on Arduino devices for the 
+    sensor_web_server.SampleCache.
     '''
     
-    # holds the controllers for the DS18B20 devices, will be created when first needed
-    __controllers = None
+    def __init__(self):
+        # holds the controllers for the DS18B20 devices, will be created when first needed
+        self.__controllers = None
     
-    def do_GET(self):
+    def __call__(self):
         '''
-        handle the HTTP GET request
+        return a map of {device_id, degrees_c} for all the sensors
         '''
         if DEBUG:
-            print(f'{DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers}',
+            print(f'{self.__controllers}',
                   file=sys.stderr, flush=True)
         
         # first time through get create the ports list
-        if None == DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers:
-            DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers = find_DS18B20_devices()
+        if None == self.__controllers:
+            self.__controllers = find_DS18B20_devices()
             if DEBUG:
-                for c in DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers.keys():
-                    print(f'    {c} : {DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers[c].get_type()} : {DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers[c].get_arduino_program_version()}',
-                          file=sys.stderr, flush=True)
-                    print(DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers[c].retrieve_temperatures(),
+                for c in self.__controllers.keys():
+                    print(f'    {c} : {self.__controllers[c].get_type()} : {self.__controllers[c].get_arduino_program_version()}',
                           file=sys.stderr, flush=True)
             
-        # Send response status code
-        self.send_response(200)
- 
-        # Send headers
-        self.send_header('Content-type','application/json')
-        self.end_headers()
-
         result={}
-        for c in DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers.keys():
-            result.update(DS18B20_via_Arduino_HTTPServer_RequestHandler.__controllers[c].retrieve_temperatures())
+        all_samples = DS18B20_OnDemand_via_Arduino_Controller.retrieve_all_temperatures(self.__controllers)
+        for c in self.__controllers.keys():
+            result.update(all_samples[c])
         if DEBUG:
             print(f'results are: {result}',
                   file=sys.stderr, flush=True)
             
-        # Write content as utf-8 data
-        self.wfile.write(bytes(json.dumps(result, indent=1), "utf8"))
-        return
-
-    def log_request(self, junk):
-        pass
-
-    def log_message(self, junk):
-        pass
+        return result
 
     
  
 def run():
-    httpd_server = HTTPServer(DEFAULT_SERVER_ADDRESS, DS18B20_via_Arduino_HTTPServer_RequestHandler)
-    print('running server listening on {}...'.format(DEFAULT_SERVER_ADDRESS))
-    httpd_server.serve_forever()
+    sensor_web_server.run(DEFAULT_SERVER_ADDRESS,
+                          DS18B20_via_Arduino_Sampler(),
+                          DEFAULT_REFRESH_INTERVAL_IN_SECONDS)
     
 run()
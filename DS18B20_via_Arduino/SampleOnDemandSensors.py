@@ -32,12 +32,15 @@ It is assumed this code runs as root and by default will place the data it
 collects in 
   /opt/sensors/DS18B20-via-Arduinos.log
 the file is created if it does not exist and is appended if it does exist.
-There are no provisions to prune or manage the file size.
+Use --rotate and/or --rotate_size to split the log into segments named for
+the time they start, and --compress to gzip the segments which are done.
 
 By default the sensors are sampled about every 60 seconds.
 
 Data in the file is of the form:
   <Timestamp> <Device> <ID> <degrees C>
+With --format binary each sensor gets its own file in the format of
+binary_sample_log.py named from the log filename and the sensor id.
 
 The program looks for serially attached Arduino devices on '/dev/ttyUSB*', and 
 '/dev/ttyACM*'.  The line rate is 115200 baud.  The Arduino code can be found
@@ -48,6 +51,11 @@ The program takes the following command-line arguments:
   -p, --ports          ports which holds Arduino with sensors (comma separated)
   -l, --log_filename   filename for the log file
   -i, --interval       the sampling period in seconds
+  --reset_on_open      let opening the ports reset the Arduinos
+  -f, --format         write the log as "text" or "binary"
+  -r, --rotate         start a new log segment "hourly" or "daily"
+  --rotate_size        start a new log segment after this many MB
+  -z, --compress       gzip log segments when they are done
   -d, --debug          turn on debugging
   
 Note:  If this program finds no active USB serial ports to sample it will 
@@ -57,16 +65,20 @@ happily run, create/append to the log file and monitor nothing.
 import argparse
 import datetime
 import os
+import signal
 import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sample_writer
+
 import DS18B20_OnDemand_via_Arduino_Controller
 
 DEBUG = 0
 
 DEFAULT_SAMPLE_INTERVAL_IN_SECONDS = 60 * 10  # every 10 minutes by default
-OUTPUT_FORMAT = '{} {} {} {}\n'
 DEFAULT_LOG_FILE_NAME = '/opt/Sensors/logs/DS18B20-via-Arduinos.log'
+FIELD_NAMES = ('temp_C',)
 
 #
 # main
@@ -81,6 +93,9 @@ if __name__ == "__main__":
                         default=DEFAULT_LOG_FILE_NAME)
     parser.add_argument("-i", "--interval", help="how often to sample sensors in seconds", 
                         default=DEFAULT_SAMPLE_INTERVAL_IN_SECONDS)
+    parser.add_argument("--reset_on_open", help="let opening the ports reset the Arduinos and wait for them to boot",
+                        action="store_true")
+    sample_writer.add_writer_arguments(parser)
     args = parser.parse_args()
 
     if (args.debug):
@@ -115,28 +130,33 @@ if __name__ == "__main__":
     ##
 
     # get serial port access for each serial device
-    controller_map = DS18B20_OnDemand_via_Arduino_Controller.find_DS18B20_device(port_name_list)
+    controller_map = DS18B20_OnDemand_via_Arduino_Controller.find_DS18B20_device(port_name_list,
+                                                                                 reset_on_open=args.reset_on_open)
     if DEBUG:
         print(f'controller_map = "{controller_map}"',
               file=sys.stderr, flush=True)
 
 
-    os.makedirs(os.path.dirname(log_filename), exist_ok=True)
-    with open(log_filename, 'a') as output:
+    # systemd stops the service with SIGTERM, exit so queued samples are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writer = sample_writer.SampleWriter(**sample_writer.get_writer_options(args))
+    try:
         next_sample_time = time.time()
         while True:
+            when = datetime.datetime.now(datetime.timezone.utc)
+            # ask all the Arduinos at once
+            all_samples = DS18B20_OnDemand_via_Arduino_Controller.retrieve_all_temperatures(controller_map)
             for c in controller_map.keys():
-                when = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                samples = controller_map[c].retrieve_temperatures()
-                for s in samples.keys():
-                    if DEBUG:
+                samples = all_samples[c]
+                if DEBUG:
+                    for s in samples.keys():
                         print(f'sample at {when} {controller_map[c].get_type()} {s} {samples[s]}  ')
-                    result = OUTPUT_FORMAT.format(when,
-                                                  controller_map[c].get_type(),
-                                                  s,
-                                                  samples[s])
-                    output.write(result)
-            output.flush()
+                writer.write_samples(log_filename,
+                                     [(controller_map[c].get_type(), s, (samples[s],))
+                                      for s in samples.keys()],
+                                     when,
+                                     FIELD_NAMES,
+                                     sample_writer.PLAIN_FORMAT)
             
             next_sample_time = next_sample_time + sample_interval_in_seconds
             delay_time = next_sample_time - time.time()
@@ -146,4 +166,6 @@ if __name__ == "__main__":
         
             if 0 < delay_time:  # don't sleep if already next sample time
                 time.sleep(delay_time)
+    finally:
+        writer.close()
 
@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Measure how many transactions a second I2cAccess can run bit by bit, with
+the send_start(), send_byte(), receive_byte() and send_stop() methods, and
+with plans precompiled by I2cPort.compile_plan(), on each GPIO backend 
+asked for, see GpioBackend.py.
+
+The mock backend needs no hardware, it simulates the two pins, with pull
+ups, and a device which ACKs its address and reads and writes a 256 byte
+memory.  The other backends need a device at --address which allows 
+reads of the register at --offset, and the write transactions are left
+out for them.  The rates include the busy wait delays for the I2C clock
+timing unless --zero_delays is given, which shows only the Python overhead.
+The backend calls made by each transaction are counted for the mock 
+backend.
+
+HTU21D/I2cAccess.py and Si702x/I2cAccess.py are the same so this measures
+both.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -b, --backend        GPIO backend to measure, may be repeated
+  -n, --count          number of each transaction to run
+  -a, --address        I2C address of the device on real hardware
+  -o, --offset         register read on real hardware
+  -c, --clock_pin      board pin of the clock
+  -d, --data_pin       board pin of the data
+  -z, --zero_delays    set the clock timing delays to zero
+"""
+
+import argparse
+import time
+
+import GpioBackend
+import I2cAccess
+
+DEFAULT_COUNT = 200
+DEFAULT_CLOCK_PIN = 13
+DEFAULT_DATA_PIN = 11
+DEFAULT_DEVICE_ADDR = 0x40
+DEFAULT_OFFSET = 0xE7   # user register of the HTU21D and Si702x
+
+
+def bitwise_ping(port, addr):
+    """
+    ping_address() as it was before plans
+    """
+    port.send_start()
+    ack = port.send_byte(addr << 1)
+    port.send_stop()
+    return ack
+
+
+def bitwise_receive_8bit_offset(port, addr, offset, count):
+    """
+    I2cDevice.receive_bytes_8bit_offset() as it was before plans
+    """
+    port.send_start()
+    if not port.send_byte(addr << 1):
+        port.send_stop()
+        raise I2cAccess.I2cIllegalStateError('device did not ack its address')
+    if not port.send_byte(offset & 0xff):
+        port.send_stop()
+        raise I2cAccess.I2cIllegalStateError('device did not ack after offset')
+    port.send_restart()
+    if not port.send_byte((addr << 1) | 1):
+        port.send_stop()
+        raise I2cAccess.I2cIllegalStateError('device did not ack its address')
+    result = [port.receive_byte(i < (count - 1)) for i in range(count)]
+    port.send_stop()
+    return result
+
+
+def bitwise_send_8bit_offset(port, addr, offset, data):
+    """
+    I2cDevice.send_bytes_8bit_offset() as it was before plans
+    """
+    port.send_start()
+    if not port.send_byte(addr << 1):
+        port.send_stop()
+        raise I2cAccess.I2cIllegalStateError('device did not ack its address')
+    if not port.send_byte(offset & 0xff):
+        port.send_stop()
+        raise I2cAccess.I2cIllegalStateError('device did not ack after offset')
+    ack = False
+    for d in data:
+        ack = port.send_byte(d)
+    port.send_stop()
+    return ack
+
+
+def run(backend, name, function, count):
+    """
+    Run function count times, print the rate and, for the mock backend, 
+    the backend calls, and return the last result.
+    """
+    counted = isinstance(backend, GpioBackend.MockBackend)
+    if counted:
+        backend.release_count = backend.drive_low_count = backend.read_count = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        result = function()
+    seconds = time.perf_counter() - start
+    calls = ''
+    if counted:
+        calls = '  {:6.1f} release() {:6.1f} drive_low() {:6.1f} read() per transaction'.format(
+                backend.release_count / count, backend.drive_low_count / count, backend.read_count / count)
+    print('    {:<9} {:9.1f} transactions/sec{}'.format(name, count / seconds, calls))
+    return result
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare bit by bit and precompiled I2cAccess transactions on GPIO backends.')
+    parser.add_argument('-b', '--backend',
+                        help='GPIO backend to measure, may be repeated',
+                        choices=sorted(GpioBackend.BACKENDS.keys()),
+                        action='append')
+    parser.add_argument('-n', '--count',
+                        help='number of each transaction to run',
+                        type=int,
+                        default=DEFAULT_COUNT)
+    parser.add_argument('-a', '--address',
+                        help='I2C address of the device on real hardware',
+                        type=lambda s: int(s, 0),
+                        default=DEFAULT_DEVICE_ADDR)
+    parser.add_argument('-o', '--offset',
+                        help='register read on real hardware',
+                        type=lambda s: int(s, 0),
+                        default=DEFAULT_OFFSET)
+    parser.add_argument('-c', '--clock_pin',
+                        help='board pin of the clock',
+                        type=int,
+                        default=DEFAULT_CLOCK_PIN)
+    parser.add_argument('-d', '--data_pin',
+                        help='board pin of the data',
+                        type=int,
+                        default=DEFAULT_DATA_PIN)
+    parser.add_argument('-z', '--zero_delays',
+                        help='set the clock timing delays to zero',
+                        action='store_true')
+    args = parser.parse_args()
+
+    if args.zero_delays:
+        I2cAccess.I2cPort.MIN_LOW_TIME_SEC = 0.0
+        I2cAccess.I2cPort.MIN_HIGH_TIME_SEC = 0.0
+
+    for backend_name in (args.backend or [GpioBackend.BACKEND_MOCK]):
+        print(backend_name)
+        if GpioBackend.BACKEND_MOCK == backend_name:
+            backend = GpioBackend.MockBackend(args.clock_pin, args.data_pin, 
+                                              [GpioBackend.SimulatedI2cDevice(args.address)])
+        else:
+            backend = GpioBackend.make_backend(backend_name, args.clock_pin, args.data_pin)
+        port = I2cAccess.I2cPort(clock_pin=args.clock_pin, data_pin=args.data_pin, backend=backend)
+        i2c_dev = I2cAccess.I2cDevice(port, args.address)
+
+        transactions = [('ping',
+                         lambda: bitwise_ping(port, args.address),
+                         lambda: port.ping_address(args.address)),
+                        ('read 3 bytes at an 8 bit offset',
+                         lambda: bitwise_receive_8bit_offset(port, args.address, args.offset, 3),
+                         lambda: i2c_dev.receive_bytes_8bit_offset(args.offset, 3))]
+        if GpioBackend.BACKEND_MOCK == backend_name:
+            transactions.append(('write 2 bytes at an 8 bit offset',
+                                 lambda: bitwise_send_8bit_offset(port, args.address, 0x10, (0x5A, 0xA5)),
+                                 lambda: i2c_dev.send_bytes_8bit_offset(0x10, (0x5A, 0xA5))))
+        for name, bitwise, planned in transactions:
+            print('  ' + name)
+            before = run(backend, 'bitwise', bitwise, args.count)
+            after = run(backend, 'plan', planned, args.count)
+            if before != after:
+                print('    results differ: {} and {}'.format(before, after))
+        port.close()
@@ -26,6 +26,8 @@ SOFTWARE.
 
 Capture data from HTU21D attached to Raspberry Pi GPIO pins.
 By default CLOCK is board pin 13 and DATA is board pin 11.
+With i2c_bus the kernel I2C driver is used instead, see I2cDevAccess.py,
+e.g. bus 1 on board pins 3 (DATA) and 5 (CLOCK).
 The device should be powered at 3.3 volts.
 
 Datasheet available from :
@@ -34,7 +36,9 @@ https://www.silabs.com/documents/public/data-sheets/Si7021-A20.pdf
 
 import time
 
+import GpioBackend
 import I2cAccess
+import I2cDevAccess
 
 DEFAULT_DATA_BOARD_PIN = 11
 DEFAULT_CLOCK_BOARD_PIN = 13  
@@ -54,14 +58,84 @@ HTU21D_REST_TIME_IN_SEC = 0.1
 HTU21D_MAX_TEMP_CONVERSION_TIME_IN_SEC = 0.06
 HTU21D_MAX_RH_CONVERSION_TIME_IN_SEC = 0.02
 
+# resolution (<RH bits>, <temperature bits>) : (<USER_REG bits>, 
+#     <max RH conversion time>, <max temperature conversion time>)
+# times are the datasheet maximum with some margin
+HTU21D_USER_REG_RESOLUTION_MASK = 0x81
+HTU21D_RESOLUTIONS = {(12, 14): (0x00, HTU21D_MAX_RH_CONVERSION_TIME_IN_SEC, HTU21D_MAX_TEMP_CONVERSION_TIME_IN_SEC),
+                      (8, 12): (0x01, 0.004, 0.015),
+                      (10, 13): (0x80, 0.006, 0.03),
+                      (11, 11): (0x81, 0.01, 0.008)}
+HTU21D_DEFAULT_RESOLUTION = (12, 14)
+
+# how a measurement waits for the conversion
+# (the Pi hardware I2C controller mishandles clock stretching, use the hold
+# mode with the bit-banged port)
+HTU21D_MODE_SLEEP = 'sleep'  # NO_HOLD command, sleep the maximum conversion time
+HTU21D_MODE_HOLD = 'hold'    # HOLD_MASTER command, the chip stretches the clock till done
+HTU21D_MODE_POLL = 'poll'    # NO_HOLD command, read till the chip stops NACKing its address
+HTU21D_MODES = (HTU21D_MODE_SLEEP, HTU21D_MODE_HOLD, HTU21D_MODE_POLL)
+HTU21D_DEFAULT_MODE = HTU21D_MODE_SLEEP
+HTU21D_POLL_INTERVAL_IN_SEC = 0.002
+HTU21D_POLL_MARGIN_IN_SEC = 0.01   # keep polling this long past the maximum conversion time
+
+HTU21D_CRC8_POLYNOMIAL = 0x31  # x^8 + x^5 + x^4 + 1, initial value 0
+
+DEFAULT_RETRIES = 5
+
+
+def crc8_table(polynomial):
+    '''
+    return the 256 entry lookup table of a MSB first CRC-8 with the given
+    polynomial, the CRC of a single byte is table[byte]
+    '''
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ polynomial) & 0xff
+            else:
+                crc = (crc << 1) & 0xff
+        table.append(crc)
+    return table
+
+HTU21D_CRC8_TABLE = crc8_table(HTU21D_CRC8_POLYNOMIAL)
+
+
+def crc8(data):
+    '''
+    return the CRC-8 the HTU21D sends after the MSB and LSB of a result
+    '''
+    crc = 0
+    for byte in data:
+        crc = HTU21D_CRC8_TABLE[crc ^ byte]
+    return crc
+
+
 class HTU21D:
     
     def __init__(self, i2c_addr=HTU21D_DEFAULT_I2C_ADDR, 
-                 gpio_clock=DEFAULT_CLOCK_BOARD_PIN, gpio_data=DEFAULT_DATA_BOARD_PIN):
+                 gpio_clock=DEFAULT_CLOCK_BOARD_PIN, gpio_data=DEFAULT_DATA_BOARD_PIN,
+                 gpio_backend=GpioBackend.DEFAULT_BACKEND, i2c_bus=None,
+                 mode=HTU21D_DEFAULT_MODE, resolution=HTU21D_DEFAULT_RESOLUTION):
+        if mode not in HTU21D_MODES:
+            raise ValueError('mode "{}" is not one of {}'.format(mode, HTU21D_MODES))
         self.__i2c_addr = i2c_addr
+        self.__mode = mode
+        self.__measurement_times = []
+        self.__phase_times = {}
+        self.__phase_retries = {}
+        self.__read_start = None
         
-        self.__i2c_port = I2cAccess.I2cPort(clock_pin=gpio_clock, data_pin=gpio_data)
-        self.__i2c_dev = I2cAccess.I2cDevice(self.__i2c_port, self.__i2c_addr)
+        if i2c_bus is not None:
+            # hardware I2C through /dev/i2c-<i2c_bus>
+            self.__i2c_port = None
+            self.__i2c_dev = I2cDevAccess.I2cDevDevice(i2c_bus, self.__i2c_addr)
+        else:
+            self.__i2c_port = I2cAccess.I2cPort(clock_pin=gpio_clock, data_pin=gpio_data,
+                                                backend=gpio_backend)
+            self.__i2c_dev = I2cAccess.I2cDevice(self.__i2c_port, self.__i2c_addr)
 
         # reset the device
         self.__i2c_dev.send_bytes_no_offset((HTU21D_CMD_RESET,))
@@ -70,6 +144,7 @@ class HTU21D:
         ur_val = self.__i2c_dev.receive_bytes_8bit_offset(HTU21D_CMD_READ_USER_REG_1, 1)
         if 0x02 != ur_val[0]:
             raise Exception('expected 0x02 from USER_REG after reset but got 0x{:02x}'.format(ur_val[0]))
+        self.set_resolution(resolution)
     
         self.__chip_type = 'HTU21D'
 
@@ -89,30 +164,261 @@ class HTU21D:
     
     
 
-    def retrieve_temp_humidity(self):
+    def get_resolution(self):
         '''
-        Retrieve the raw data from the HTU21D and apply the various correction factors to
-        determine temperature and relative humidity
-        Return the tuple <temperature in degrees C>, <relative humidity %>
+        return the measurement resolution, (<RH bits>, <temperature bits>)
         '''
-        # Read humidity -- wait...
-        self.__i2c_dev.send_bytes_no_offset((HTU21D_CMD_MEASURE_RH_NO_HOLD_MASTER_MODE,))
-        time.sleep(HTU21D_MAX_RH_CONVERSION_TIME_IN_SEC)
-        raw_bytes = self.__i2c_dev.receive_bytes_no_offset(3)
+        return self.__resolution
+
+
+    def set_resolution(self, resolution):
+        '''
+        Set the measurement resolution, one of the keys of HTU21D_RESOLUTIONS.
+        Lower resolutions convert faster and the waits follow.
+        '''
+        if resolution not in HTU21D_RESOLUTIONS:
+            raise ValueError('resolution {} is not one of {}'.format(resolution, sorted(HTU21D_RESOLUTIONS.keys())))
+        res_bits = HTU21D_RESOLUTIONS[resolution][0]
+        # read-modify-write so the heater and reserved bits are kept
+        ur_val = self.__i2c_dev.receive_bytes_8bit_offset(HTU21D_CMD_READ_USER_REG_1, 1)
+        new_val = (ur_val[0] & ~HTU21D_USER_REG_RESOLUTION_MASK) | res_bits
+        if new_val != ur_val[0]:
+            self.__i2c_dev.send_bytes_8bit_offset(HTU21D_CMD_WRITE_USER_REG_1, (new_val,))
+            ur_val = self.__i2c_dev.receive_bytes_8bit_offset(HTU21D_CMD_READ_USER_REG_1, 1)
+            if new_val != ur_val[0]:
+                raise IOError('wrote 0x{:02x} to USER_REG but read back 0x{:02x}'.format(new_val, ur_val[0]))
+        self.__resolution = resolution
+        self.__conversion_times = HTU21D_RESOLUTIONS[resolution][1:]
+
+
+    def get_measurement_mode(self):
+        '''
+        return how measurements wait for the conversion, one of HTU21D_MODES
+        '''
+        return self.__mode
+
+
+    def get_measurement_times(self):
+        '''
+        return the seconds each conversion of the last retrieve took, from
+        sending the command till the result was read
+        '''
+        return self.__measurement_times
+
+
+    def get_phase_times(self):
+        '''
+        return a dict of the seconds each phase of the last pipelined
+        retrieve took: rh_conversion, rh_transfer, temp_conversion,
+        temp_transfer and total.  host is the part of temp_conversion spent
+        checking and converting the RH result.
+        '''
+        return self.__phase_times
+
+
+    def get_phase_retries(self):
+        '''
+        return a dict of how often the RH and temperature measurements of
+        the last retrieve were repeated after a bad CRC or failed transfer
+        '''
+        return self.__phase_retries
+
+
+    def __measure(self, hold_cmd, no_hold_cmd, max_conversion_time):
+        '''
+        Start a measurement, wait for it as the mode says and return the 
+        3 bytes read, MSB, LSB and CRC
+        '''
+        start = time.perf_counter()
+        if HTU21D_MODE_HOLD == self.__mode:
+            # the chip holds the clock low after the read address till the
+            # conversion is done
+            self.__read_start = start
+            raw_bytes = self.__i2c_dev.receive_bytes_8bit_offset(hold_cmd, 3)
+        else:
+            self.__i2c_dev.send_bytes_no_offset((no_hold_cmd,))
+            raw_bytes = self.__read_result(start, max_conversion_time)
+        self.__measurement_times.append(time.perf_counter() - start)
+        return raw_bytes
+
+
+    def __read_result(self, start, max_conversion_time):
+        '''
+        Wait for the NO_HOLD conversion started at start and return the 3
+        bytes read.  Poll mode polls, the others sleep what is left of the
+        maximum conversion time.  The read that succeeded started at
+        self.__read_start.
+        '''
+        if HTU21D_MODE_POLL != self.__mode:
+            remaining = start + max_conversion_time - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            self.__read_start = time.perf_counter()
+            return self.__i2c_dev.receive_bytes_no_offset(3)
+
+        # the chip NACKs its read address till the conversion is done
+        deadline = start + max_conversion_time + HTU21D_POLL_MARGIN_IN_SEC
+        while True:
+            time.sleep(HTU21D_POLL_INTERVAL_IN_SEC)
+            self.__read_start = time.perf_counter()
+            try:
+                return self.__i2c_dev.receive_bytes_no_offset(3)
+            except I2cAccess.I2cIllegalStateError:
+                if time.perf_counter() > deadline:
+                    raise
+
+
+    def __measure_checked(self, hold_cmd, no_hold_cmd, max_conversion_time, phase, retries):
+        '''
+        __measure and check the CRC.  A bad CRC or failed transfer repeats
+        only this measurement, up to retries times, then the error is raised.
+        '''
+        for attempt in range(retries + 1):
+            try:
+                raw_bytes = self.__measure(hold_cmd, no_hold_cmd, max_conversion_time)
+                self.__check_crc(raw_bytes, phase)
+                return raw_bytes
+            except (IOError, I2cAccess.I2cIllegalStateError):
+                if attempt == retries:
+                    raise
+                self.__phase_retries[phase] += 1
+
+
+    def __check_crc(self, raw_bytes, what):
+        '''
+        raise IOError if the CRC byte does not match the MSB and LSB
+        '''
+        crc = crc8(raw_bytes[:2])
+        if crc != raw_bytes[2]:
+            raise IOError('{} CRC mismatch, read 0x{:02x} but computed 0x{:02x}'.format(what, raw_bytes[2], crc))
+
+
+    @staticmethod
+    def __convert_rh(raw_bytes):
         raw = ((raw_bytes[0] & 0xff) << 8) + (raw_bytes[1] & 0xff)
         rh = (raw * 125 / 65536.0) - 6.0
         if rh > 100:
             rh = 100.0
         elif rh < 0:
             rh = 0.0
+        return rh
+
+
+    @staticmethod
+    def __convert_temp(raw_bytes):
+        raw = ((raw_bytes[0] & 0xff) << 8) + (raw_bytes[1] & 0xff)
+        return (raw * 175.72 / 65536.0) - 46.85
+
+
+    def __measure_rh(self, retries):
+        return self.__measure_checked(HTU21D_CMD_MEASURE_RH_HOLD_MASTER_MODE,
+                                      HTU21D_CMD_MEASURE_RH_NO_HOLD_MASTER_MODE,
+                                      self.__conversion_times[0], 'RH', retries)
+
+
+    def __measure_temp(self, retries):
+        return self.__measure_checked(HTU21D_CMD_MEASURE_TEMP_HOLD_MASTER_MODE,
+                                      HTU21D_CMD_MEASURE_TEMP_NO_HOLD_MASTER_MODE,
+                                      self.__conversion_times[1], 'temperature', retries)
+
+
+    def retrieve_temp_humidity(self, retries=0):
+        '''
+        Retrieve the raw data from the HTU21D and apply the various correction factors to
+        determine temperature and relative humidity
+        The CRC of each result is checked, a bad CRC or failed transfer 
+        repeats just that measurement up to retries times before the IOError
+        or I2cAccess.I2cIllegalStateError is raised.
+        Return the tuple <temperature in degrees C>, <relative humidity %>
+        '''
+        self.__measurement_times = []
+        self.__phase_retries = {'RH': 0, 'temperature': 0}
+        # Read humidity -- wait...
+        rh = self.__convert_rh(self.__measure_rh(retries))
 
         # Then get the temperature
+        temp = self.__convert_temp(self.__measure_temp(retries))
+
+        return temp, rh
+
+
+    def retrieve_temp_humidity_with_retries(self, retries=DEFAULT_RETRIES):
+        """
+        Retrieve the temperature and humidity.  A measurement that fails is
+        repeated up to "retries" times before giving up.
+        """
+        try:
+            return self.retrieve_temp_humidity(retries)
+        except (IOError, I2cAccess.I2cIllegalStateError) as e:
+            raise RuntimeError('exceeded {} retries while retrieving data'.format(retries)) from e
+
+
+    def retrieve_temp_humidity_pipelined(self, retries=0):
+        '''
+        Like retrieve_temp_humidity but the temperature conversion is started
+        as soon as the RH result is read, and the RH CRC check and conversion
+        are done while the chip converts the temperature.  The chip does one
+        conversion at a time so the NO_HOLD commands are used in every mode,
+        hold mode waits as sleep mode does.  A measurement that fails is
+        repeated afterwards as retrieve_temp_humidity does, the other result
+        is kept.  get_phase_times() has the timing of the pipelined pass.
+        Return the tuple <temperature in degrees C>, <relative humidity %>
+        '''
+        self.__measurement_times = []
+        self.__phase_retries = {'RH': 0, 'temperature': 0}
+        start = time.perf_counter()
+        self.__i2c_dev.send_bytes_no_offset((HTU21D_CMD_MEASURE_RH_NO_HOLD_MASTER_MODE,))
+        try:
+            rh_bytes = self.__read_result(start, self.__conversion_times[0])
+        except I2cAccess.I2cIllegalStateError:
+            if 0 == retries:
+                raise
+            # nothing to overlap with, measure it again before the temperature
+            self.__phase_retries['RH'] += 1
+            rh_bytes = self.__measure_rh(retries - 1)
+        rh_read_start = self.__read_start
+        rh_done = time.perf_counter()
+
         self.__i2c_dev.send_bytes_no_offset((HTU21D_CMD_MEASURE_TEMP_NO_HOLD_MASTER_MODE,))
-        time.sleep(HTU21D_MAX_TEMP_CONVERSION_TIME_IN_SEC)
-        raw_bytes = self.__i2c_dev.receive_bytes_no_offset(3)
-        raw = ((raw_bytes[0] & 0xff) << 8) + (raw_bytes[1] & 0xff)
-        temp = (raw * 175.72 / 65536.0) - 46.85
+        temp_start = time.perf_counter()
+        # overlapped with the temperature conversion
+        rh = None
+        try:
+            self.__check_crc(rh_bytes, 'RH')
+            rh = self.__convert_rh(rh_bytes)
+        except IOError:
+            if 0 == retries:
+                raise
+        host_done = time.perf_counter()
+
+        temp = None
+        try:
+            temp_bytes = self.__read_result(temp_start, self.__conversion_times[1])
+            temp_read_start = self.__read_start
+            temp_done = time.perf_counter()
+            self.__check_crc(temp_bytes, 'temperature')
+            temp = self.__convert_temp(temp_bytes)
+        except (IOError, I2cAccess.I2cIllegalStateError):
+            if 0 == retries:
+                raise
+            temp_read_start = self.__read_start
+            temp_done = time.perf_counter()
 
+        self.__measurement_times = [rh_done - start, temp_done - temp_start]
+        self.__phase_times = {'rh_conversion': rh_read_start - start,
+                              'rh_transfer': rh_done - rh_read_start,
+                              'temp_conversion': temp_read_start - temp_start,
+                              'temp_transfer': temp_done - temp_read_start,
+                              'host': host_done - temp_start,
+                              'total': temp_done - start}
+
+        # repeat only what failed
+        if rh is None:
+            self.__phase_retries['RH'] += 1
+            rh = self.__convert_rh(self.__measure_rh(retries - 1))
+        if temp is None:
+            self.__phase_retries['temperature'] += 1
+            temp = self.__convert_temp(self.__measure_temp(retries - 1))
         return temp, rh
 
 #
@@ -126,3 +432,8 @@ if __name__ == '__main__':
     temp,rh = sensor.retrieve_temp_humidity()
     print ("Temperature :  {} C".format(temp))
     print ("Rel Humidity : {} %".format(rh))
+
+    temp,rh = sensor.retrieve_temp_humidity_pipelined()
+    print ("Pipelined    :  {} C, {} %".format(temp, rh))
+    for phase, seconds in sensor.get_phase_times().items():
+        print ("  {:16s} {:.4f} s".format(phase, seconds))
@@ -26,7 +26,8 @@ SOFTWARE.
 """
 
 import time
-import RPi.GPIO as GPIO
+
+import GpioBackend
 
 """
 SEND_START
@@ -45,6 +46,7 @@ DELAY
 
 TO DO:
 -- Create state machine for these classes in order to reduce # of transitions needed and hence run faster
+---- I2cPort.compile_plan() leaves out pin changes which change nothing, I2cDevice uses the plans
 -- Could use 4.7 uS and 4.0 uS for minimum LOW and HIGH clock times respectively.
 ---- Need to not violate max clock freq as seen between falling clock edges.
 -- Could overlap data hold time with clock lOW time???
@@ -91,6 +93,38 @@ class I2cLostArbitration(Exception):
         Exception.__init__(self, exception_text)
         
         
+# steps of a transaction for I2cPort.compile_plan()
+I2C_START = 'start'      # (I2C_START,)
+I2C_RESTART = 'restart'  # (I2C_RESTART,)
+I2C_STOP = 'stop'        # (I2C_STOP,)
+I2C_WRITE = 'write'      # (I2C_WRITE, byte, message) raise message on NACK or record the ACK if None
+I2C_READ = 'read'        # (I2C_READ, ack) read a byte then send ack
+
+# pin operations of an I2cPlan, each is (op, pin, argument)
+OP_DELAY = 0         # busy wait argument seconds
+OP_RELEASE = 1       # input with pull up, wait till high, argument is (timeout, message)
+OP_WAIT_HIGH = 2     # wait till high without touching the pin, argument is (timeout, message)
+OP_DRIVE_LOW = 3     # output low, wait till low, argument is (timeout, message)
+OP_FLOAT = 4         # input with pull up, the value is not known
+OP_READ_BIT = 5      # shift the pin value into the byte being read
+OP_STORE_BYTE = 6    # append the byte being read to the result
+OP_CHECK_BIT = 7     # raise I2cLostArbitration if the pin is not argument
+OP_READ_ACK = 8      # sample the ACK bit
+OP_CHECK_ACK = 9     # on NACK stop and raise I2cIllegalStateError(argument), or record the ACK if None
+OP_REQUIRE = 10      # raise I2cIllegalStateError(argument[1]) if the pin is not argument[0]
+
+MAX_CACHED_PLANS = 256
+
+
+class I2cPlan:
+    """
+    A transaction compiled by I2cPort.compile_plan() into a flat list of pin
+    operations which I2cPort.run_plan() executes in one loop.
+    """
+    def __init__(self, ops, read_count):
+        self.ops = tuple(ops)
+        self.read_count = read_count
+
 
 class I2cPort:
     VALID_ADDRESS_LIST = range(0x08, 0x78)
@@ -108,9 +142,11 @@ class I2cPort:
     
     DEFAULT_DEBOUNCE_TIME = 1 / 1000000.0  # de-bounce signals for at least 1 uSec
     
-    def __init__(self, clock_pin=0, data_pin=0):
+    def __init__(self, clock_pin=0, data_pin=0, backend=GpioBackend.DEFAULT_BACKEND):
         '''
         Must provide clock_pin and data_pin values between 1 and 39
+        backend is the name of a GpioBackend or a backend object, e.g. a 
+        GpioBackend.MockBackend
         '''
         if (clock_pin < 1 or clock_pin > 39):
             raise ValueError('clock_pin value of {} is not between 0 and 39'.format(clock_pin))
@@ -119,11 +155,22 @@ class I2cPort:
 
         self.clock_pin = clock_pin
         self.data_pin = data_pin
+        self.plans = {}  # steps : I2cPlan, see run_steps()
         
-        GPIO.setmode(GPIO.BOARD)
+        if isinstance(backend, str):
+            backend = GpioBackend.make_backend(backend, clock_pin, data_pin)
+        self.backend = backend
         self.set_idle()
         self.state = 'initialized'
 
+    def close(self):
+        """
+        Leave both pins pulled up and give them back to the backend.
+        """
+        self.set_idle()
+        self.backend.close()
+        self.state = 'closed'
+
 #     def __del__(self):
 #         GPIO.setup(self.data_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 #         GPIO.setup(self.clock_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
@@ -134,14 +181,14 @@ class I2cPort:
         """
         Return current value of clock pin.
         """
-        value = GPIO.input(self.clock_pin)
+        value = self.backend.read(self.clock_pin)
         return value
 
     def read_data(self):
         """
         Return current value of data pin.
         """
-        value = GPIO.input(self.data_pin)
+        value = self.backend.read(self.data_pin)
         return value
 
     def read_stable_clock(self, debounce_time=DEFAULT_DEBOUNCE_TIME):
@@ -150,8 +197,8 @@ class I2cPort:
         """
         last_value = self.read_clock()
         while True:
-            done_time = time.time() + debounce_time
-            while done_time > time.time():
+            done_time = time.perf_counter() + debounce_time
+            while done_time > time.perf_counter():
                 pass
             value = self.read_clock()
             if value == last_value:
@@ -170,11 +217,11 @@ class I2cPort:
 # TBD            print('clock not low in raise_clock')
 # TBD             raise I2cIllegalStateError('clock is not low at start of raise_clock()')
 
-        GPIO.setup(self.clock_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.backend.release(self.clock_pin)
 
-        timeout_time = time.time() + timeout
-        while time.time() < timeout_time:
-            if GPIO.input(self.clock_pin) is 1:
+        timeout_time = time.perf_counter() + timeout
+        while time.perf_counter() < timeout_time:
+            if self.backend.read(self.clock_pin) == 1:
                 return 1
             
         raise I2cIllegalStateError('clock did not rise before timeout')
@@ -191,11 +238,11 @@ class I2cPort:
 # TBD            print('clock not high in lower_clock')
 # TBD            raise I2cIllegalStateError('clock is not high at start of lower_clock()')
 
-        GPIO.setup(self.clock_pin, GPIO.OUT, initial=0)
+        self.backend.drive_low(self.clock_pin)
         
-        timeout_time = time.time() + timeout
-        while time.time() < timeout_time:
-            if GPIO.input(self.clock_pin) is 0:
+        timeout_time = time.perf_counter() + timeout
+        while time.perf_counter() < timeout_time:
+            if self.backend.read(self.clock_pin) == 0:
                 return 0
             
         raise I2cIllegalStateError('clock did not fall before timeout')
@@ -207,11 +254,11 @@ class I2cPort:
         Loop till timeout occurs, waiting for data pin to be high then return 1
         if timeout occurs raise I2cIllegalStateError
         """
-        GPIO.setup(self.data_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.backend.release(self.data_pin)
 
-        timeout_time = time.time() + timeout
-        while time.time() < timeout_time:
-            if GPIO.input(self.data_pin) is 1:
+        timeout_time = time.perf_counter() + timeout
+        while time.perf_counter() < timeout_time:
+            if self.backend.read(self.data_pin) == 1:
                 return 1
             
         raise I2cIllegalStateError('data did not rise before timeout')
@@ -221,7 +268,7 @@ class I2cPort:
         Set mode of data pin to be input with pull up
         Some other device might be pulling the data signal down so we can't be sure of the value
         """
-        GPIO.setup(self.data_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.backend.release(self.data_pin)
 
     def lower_data(self, timeout=MAX_DATA_FALL_TIME_SEC):
         """
@@ -230,11 +277,11 @@ class I2cPort:
         Loop till timeout occurs, waiting for clock to be low then return 0
         if timeout occurs raise I2cIllegalStateError
         """
-        GPIO.setup(self.data_pin, GPIO.OUT, initial=0)
+        self.backend.drive_low(self.data_pin)
 
-        timeout_time = time.time() + timeout
-        while time.time() < timeout_time:
-            if GPIO.input(self.data_pin) is 0:
+        timeout_time = time.perf_counter() + timeout
+        while time.perf_counter() < timeout_time:
+            if self.backend.read(self.data_pin) == 0:
                 return 0
             
         raise I2cIllegalStateError('data did not fall before timeout')
@@ -244,8 +291,222 @@ class I2cPort:
         Ignores current state and puts clock and data pins in high state using pulls ups.
         TBD -- try to do a better job with this from various states
         """
-        GPIO.setup(self.data_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(self.clock_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.backend.release(self.data_pin)
+        self.backend.release(self.clock_pin)
+
+    def compile_plan(self, steps):
+        """
+        Compile a transaction, a sequence of I2C_START, I2C_RESTART, I2C_STOP,
+        I2C_WRITE and I2C_READ steps, into an I2cPlan with the same pin 
+        operations and delays as send_start(), send_byte(), receive_byte()
+        and the rest.  Pin changes that would not change anything, such as
+        lowering the clock at the start of each bit when it is already low,
+        are left out and the delays around them are merged.
+        raise I2cInvalidArgumentError for a bad step or byte
+        raise I2cIllegalStateError for steps in an order the bus does not allow
+        """
+        ops = []
+        state = {self.clock_pin: None, self.data_pin: None}   # None, 'high', 'low' or 'float'
+        clock = self.clock_pin
+        data = self.data_pin
+
+        def delay(seconds):
+            if ops and OP_DELAY == ops[-1][0]:
+                ops[-1] = (OP_DELAY, None, max(seconds, ops[-1][2]))
+            else:
+                ops.append((OP_DELAY, None, seconds))
+
+        def raise_pin(pin, timeout, message):
+            if state[pin] in ('high', 'float'):
+                ops.append((OP_WAIT_HIGH, pin, (timeout, message)))
+            else:
+                ops.append((OP_RELEASE, pin, (timeout, message)))
+            state[pin] = 'high'
+
+        def lower_pin(pin, timeout, message):
+            if state[pin] != 'low':
+                ops.append((OP_DRIVE_LOW, pin, (timeout, message)))
+                state[pin] = 'low'
+
+        def raise_clock():
+            raise_pin(clock, I2cPort.MAX_CLOCK_RISE_TIME_SEC, 'clock did not rise before timeout')
+
+        def lower_clock():
+            if state[clock] != 'low':
+                lower_pin(clock, I2cPort.MAX_CLOCK_FALL_TIME_SEC, 'clock did not fall before timeout')
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+
+        def raise_data():
+            raise_pin(data, I2cPort.MAX_DATA_RISE_TIME_SEC, 'data did not rise before timeout')
+
+        def lower_data():
+            lower_pin(data, I2cPort.MAX_DATA_FALL_TIME_SEC, 'data did not fall before timeout')
+
+        def float_data():
+            if state[data] not in ('high', 'float'):
+                ops.append((OP_FLOAT, data, None))
+            state[data] = 'float'
+
+        def send_bit(value):
+            lower_clock()
+            if value:
+                raise_data()
+            else:
+                lower_data()
+            raise_clock()
+            delay(I2cPort.MIN_HIGH_TIME_SEC)
+            ops.append((OP_CHECK_BIT, data, value))
+            lower_clock()
+
+        def receive_bit(op):
+            lower_clock()
+            float_data()
+            raise_clock()
+            delay(I2cPort.MIN_HIGH_TIME_SEC)
+            ops.append((op, data, None))
+            lower_clock()
+
+        started = False
+        read_count = 0
+        for step in steps:
+            kind = step[0]
+            if I2C_START == kind:
+                if started:
+                    raise I2cIllegalStateError('START inside a transaction, use RESTART')
+                ops.append((OP_REQUIRE, clock, (1, 'can not begin START symbol unless clock and data are both high')))
+                ops.append((OP_REQUIRE, data, (1, 'can not begin START symbol unless clock and data are both high')))
+                state[clock] = state[data] = 'high'
+                delay(I2cPort.MIN_HIGH_TIME_SEC)
+                lower_data()
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+                lower_clock()
+                started = True
+            elif I2C_RESTART == kind:
+                if not started:
+                    raise I2cIllegalStateError('RESTART outside a transaction')
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+                raise_data()
+                delay(I2cPort.MIN_HIGH_TIME_SEC)
+                raise_clock()
+                delay(I2cPort.MIN_HIGH_TIME_SEC)
+                lower_data()
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+                lower_clock()
+            elif I2C_STOP == kind:
+                if not started:
+                    raise I2cIllegalStateError('STOP outside a transaction')
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+                lower_data()
+                delay(I2cPort.MIN_LOW_TIME_SEC)
+                raise_clock()
+                delay(I2cPort.MIN_HIGH_TIME_SEC)
+                raise_data()
+                delay(I2cPort.MIN_HIGH_TIME_SEC)
+                started = False
+            elif I2C_WRITE == kind:
+                if not started:
+                    raise I2cIllegalStateError('WRITE outside a transaction')
+                value = step[1]
+                if (value < 0 or value > 255):
+                    raise I2cInvalidArgumentError("value to send must be > -1 and < 256")
+                for i in range(8):
+                    send_bit((value >> (7-i)) & 1)
+                receive_bit(OP_READ_ACK)
+                ops.append((OP_CHECK_ACK, None, step[2]))
+            elif I2C_READ == kind:
+                if not started:
+                    raise I2cIllegalStateError('READ outside a transaction')
+                if not isinstance(step[1], bool):
+                    raise I2cInvalidArgumentError("ack to send must be a bool")
+                for _ in range(8):
+                    receive_bit(OP_READ_BIT)
+                ops.append((OP_STORE_BYTE, None, None))
+                send_bit(0 if step[1] else 1)
+                read_count += 1
+            else:
+                raise I2cInvalidArgumentError('unknown step {}'.format(step))
+        if started:
+            raise I2cIllegalStateError('transaction does not end with STOP')
+        return I2cPlan(ops, read_count)
+
+    def run_plan(self, plan):
+        """
+        Execute an I2cPlan and return (list of bytes read, ACK of the last
+        I2C_WRITE step without a message or False if there was none).
+        The clock is time.perf_counter() and everything used in the loop
+        is looked up once.
+        raise I2cIllegalStateError or I2cLostArbitration as the bit by bit
+        methods do
+        """
+        release = self.backend.release
+        drive_low = self.backend.drive_low
+        gpio_input = self.backend.read
+        now = time.perf_counter
+        result = []
+        value = 0
+        sampled = 1
+        ack = False
+        for op, pin, arg in plan.ops:
+            if op == OP_DELAY:
+                end_time = now() + arg
+                while now() < end_time:
+                    pass  # delay
+            elif op == OP_RELEASE:
+                release(pin)
+                if gpio_input(pin) != 1:
+                    timeout_time = now() + arg[0]
+                    while gpio_input(pin) != 1:
+                        if now() > timeout_time:
+                            raise I2cIllegalStateError(arg[1])
+            elif op == OP_DRIVE_LOW:
+                drive_low(pin)
+                if gpio_input(pin) != 0:
+                    timeout_time = now() + arg[0]
+                    while gpio_input(pin) != 0:
+                        if now() > timeout_time:
+                            raise I2cIllegalStateError(arg[1])
+            elif op == OP_WAIT_HIGH:
+                if gpio_input(pin) != 1:
+                    timeout_time = now() + arg[0]
+                    while gpio_input(pin) != 1:
+                        if now() > timeout_time:
+                            raise I2cIllegalStateError(arg[1])
+            elif op == OP_READ_BIT:
+                value = (value << 1) | gpio_input(pin)
+            elif op == OP_CHECK_BIT:
+                if gpio_input(pin) != arg:
+                    raise I2cLostArbitration('master lost arbitration')
+            elif op == OP_READ_ACK:
+                sampled = gpio_input(pin)
+            elif op == OP_CHECK_ACK:
+                if arg is None:
+                    ack = (0 == sampled)
+                elif sampled != 0:
+                    self.send_stop()
+                    raise I2cIllegalStateError(arg)
+            elif op == OP_STORE_BYTE:
+                result.append(value)
+                value = 0
+            elif op == OP_FLOAT:
+                release(pin)
+            elif op == OP_REQUIRE:
+                if gpio_input(pin) != arg[0]:
+                    raise I2cIllegalStateError(arg[1])
+        return result, ack
+
+    def run_steps(self, steps):
+        """
+        Compile the steps, or reuse the plan compiled for the same steps 
+        before, and run it.  Return what run_plan() returns.
+        """
+        steps = tuple(steps)
+        plan = self.plans.get(steps)
+        if plan is None:
+            plan = self.compile_plan(steps)
+            if len(self.plans) >= MAX_CACHED_PLANS:
+                self.plans.clear()
+            self.plans[steps] = plan
+        return self.run_plan(plan)
 
     def send_start(self):
         """
@@ -255,19 +516,19 @@ class I2cPort:
         After delaying with both high, drop data
         Then delay then drop clock and delay
         """
-        if (self.read_clock() is 0 or self.read_data() is 0):
+        if (self.read_clock() == 0 or self.read_data() == 0):
             raise I2cIllegalStateError("can not begin START symbol unless clock and data are both high")
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         
         self.lower_data()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay        
         self.lower_clock()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay        
 
     def send_restart(self):
@@ -276,28 +537,28 @@ class I2cPort:
 
 
         """    
-        if self.read_clock() is not 0:
+        if self.read_clock() != 0:
             raise I2cIllegalStateError('can not start STOP symbol with clock in high state')
         
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         self.raise_data()
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         self.raise_clock()
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
 
         self.lower_data()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay        
         self.lower_clock()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay        
 
     def send_stop(self):
@@ -307,22 +568,22 @@ class I2cPort:
         With clock low, ensure data is low
         Then raise clock then raise data
         """    
-        if self.read_clock() is not 0:
+        if self.read_clock() != 0:
             raise I2cIllegalStateError('can not start STOP symbol with clock in high state')
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         self.lower_data()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         self.raise_clock()
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
         self.raise_data()
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay
 
     def send_bit(self, value):
@@ -332,10 +593,10 @@ class I2cPort:
         has lost the arbitration.
         Return value, or raise I2cLostArbitration exception if the master lost arbitration
         """
-        if (value is 0) or (value is 1):
+        if (value == 0) or (value == 1):
             self.lower_clock()
-            end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-            while time.time() < end_time:
+            end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+            while time.perf_counter() < end_time:
                 pass  # delay till clock high time has passed
 
             if value:
@@ -344,16 +605,16 @@ class I2cPort:
                 self.lower_data()
 
             self.raise_clock()
-            end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-            while time.time() < end_time:
+            end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+            while time.perf_counter() < end_time:
                 pass  # delay till clock high time has passed
             read_value = self.read_data()
             if read_value is not value:
                 raise I2cLostArbitration('master lost arbitration')
 
             self.lower_clock()
-            end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-            while time.time() < end_time:
+            end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+            while time.perf_counter() < end_time:
                 pass  # delay till clock high time has passed
 
             return read_value
@@ -380,21 +641,21 @@ class I2cPort:
         """
 
         self.lower_clock()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay till clock high time has passed
 
         self.float_data()
 
         self.raise_clock()
-        end_time = time.time() + I2cPort.MIN_HIGH_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_HIGH_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay till clock high time has passed
         read_value = self.read_data()
         
         self.lower_clock()
-        end_time = time.time() + I2cPort.MIN_LOW_TIME_SEC
-        while time.time() < end_time:
+        end_time = time.perf_counter() + I2cPort.MIN_LOW_TIME_SEC
+        while time.perf_counter() < end_time:
             pass  # delay till clock high time has passed
         
         return read_value
@@ -404,7 +665,7 @@ class I2cPort:
         Send a bit of floated data on the I2C port.
         Sample the data signal before dropping the clock and return the value.
         """
-        return self.receive_bit() is 0
+        return self.receive_bit() == 0
 
     def send_byte(self, value):
         """"
@@ -449,11 +710,9 @@ class I2cPort:
         if addr not in self.VALID_ADDRESS_LIST:
             raise I2cInvalidArgumentError("address to ping must be >= {} and <= {}".format(self.VALID_ADDRESS_LIST[0], self.VALID_ADDRESS_LIST[:1]))
         
-        value = addr << 1
-        self.send_start()
-        ack = self.send_byte(value)
-        self.send_stop()
-        
+        _, ack = self.run_steps(((I2C_START,),
+                                 (I2C_WRITE, addr << 1, None),
+                                 (I2C_STOP,)))
         return ack
 
 class I2cDevice():
@@ -471,23 +730,52 @@ class I2cDevice():
         if not self.port.ping_address(self.addr):
             raise I2cIllegalStateError('no device detected at address {}'.format(self.addr))
 
+    def __offset_steps(self, offset, offset_count):
+        """
+        Return the steps which address the device for write and send 
+        offset_count bytes of offset, MSB first.
+        """
+        steps = [(I2C_START,),
+                 (I2C_WRITE, self.addr_byte_for_write, 'device did not ack its address')]
+        for i in range(offset_count - 1, -1, -1):
+            steps.append((I2C_WRITE, (offset >> (8 * i)) & 0xff, 'device did not ack after offset'))
+        return steps
+
+    def __send_bytes(self, offset, offset_count, data):
+        """
+        Send data after offset_count bytes of offset.
+        Return the last ack from the device
+        """
+        steps = self.__offset_steps(offset, offset_count)
+        steps.extend((I2C_WRITE, d, None) for d in data)
+        steps.append((I2C_STOP,))
+        _, ack = self.port.run_steps(steps)
+        return ack
+
+    def __receive_bytes(self, offset, offset_count, count):
+        """
+        Receive count bytes after offset_count bytes of offset, with a 
+        RESTART between them if there is an offset.
+        Send NACK on last byte read
+        return the list of data bytes received from the device
+        """
+        if offset_count:
+            steps = self.__offset_steps(offset, offset_count)
+            steps.append((I2C_RESTART,))
+        else:
+            steps = [(I2C_START,)]
+        steps.append((I2C_WRITE, self.addr_byte_for_read, 'device did not ack its address'))
+        steps.extend((I2C_READ, i < (count - 1)) for i in range(count))
+        steps.append((I2C_STOP,))
+        result, _ = self.port.run_steps(steps)
+        return result
+
     def send_bytes_no_offset(self, data):
         """
         Send the given list of data bytes to the device without sending an offset.
         Return the last ack from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = False
-        for d in data:
-            ack = p.send_byte(d)
-        p.send_stop()
-        return ack
+        return self.__send_bytes(0, 0, data)
 
     def receive_bytes_no_offset(self, count):
         """
@@ -495,20 +783,7 @@ class I2cDevice():
         Send NACK on last byte read
         return the list of data bytes received from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_read)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        result = []
-        for i in range(count):
-            result.append(p.receive_byte(i < (count - 1)))
-            
-        p.send_stop()
-
-        return result
+        return self.__receive_bytes(0, 0, count)
 
     def send_bytes_8bit_offset(self, offset, data):
         """
@@ -516,22 +791,7 @@ class I2cDevice():
         Only the 8 low order bits of offset are used, the rest are ignored.
         Return the last ack from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = False
-        for d in data:
-            ack = p.send_byte(d)
-        p.send_stop()
-        return ack
+        return self.__send_bytes(offset, 1, data)
 
     def receive_bytes_8bit_offset(self, offset, count):
         """
@@ -540,31 +800,7 @@ class I2cDevice():
         Send NACK on last byte read
         return the list of data bytes received from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        p.send_restart()
-        
-        ack = p.send_byte(self.addr_byte_for_read)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-
-        result = []
-        for i in range(count):
-            result.append(p.receive_byte(i < (count - 1)))
-            
-        p.send_stop()
-
-        return result
+        return self.__receive_bytes(offset, 1, count)
 
     def send_bytes_16bit_offset(self, offset, data):
         """
@@ -572,26 +808,7 @@ class I2cDevice():
         Only the 16 low order bits of offset are used, the rest are ignored.
         Return the last ack from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte((offset >> 8) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = False
-        for d in data:
-            ack = p.send_byte(d)
-        p.send_stop()
-        return ack
+        return self.__send_bytes(offset, 2, data)
 
     def receive_bytes_16bit_offset(self, offset, count):
         """
@@ -600,35 +817,7 @@ class I2cDevice():
         Send NACK on last byte read
         Return a list of data bytes received
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte((offset >> 8) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        p.send_restart()
-        
-        ack = p.send_byte(self.addr_byte_for_read)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-
-        result = []
-        for i in range(count):
-            result.append(p.receive_byte(i < (count - 1)))
-            
-        p.send_stop()
-
-        return result
+        return self.__receive_bytes(offset, 2, count)
 
     def send_bytes_32bit_offset(self, offset, data):
         """
@@ -636,34 +825,7 @@ class I2cDevice():
         Only the 32 low order bits of offset are used, the rest are ignored.
         Return the last ack from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte((offset >> 24) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte((offset >> 16) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte((offset >> 8) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = False
-        for d in data:
-            ack = p.send_byte(d)
-        p.send_stop()
-        return ack
+        return self.__send_bytes(offset, 4, data)
 
     def receive_bytes_32bit_offset(self, offset, count):
         """
@@ -672,65 +834,29 @@ class I2cDevice():
         Send NACK on last byte read
         return the list of data bytes received from the device
         """
-        p = self.port
-        
-        p.send_start()
-        ack = p.send_byte(self.addr_byte_for_write)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-        ack = p.send_byte((offset >> 24) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte((offset >> 16) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte((offset >> 8) & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        ack = p.send_byte(offset & 0xff)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack after offset')
-        p.send_restart()
-        
-        ack = p.send_byte(self.addr_byte_for_read)
-        if not ack:
-            p.send_stop()
-            raise I2cIllegalStateError('device did not ack its address')
-
-        result = []
-        for i in range(count):
-            result.append(p.receive_byte(i < (count - 1)))
-            
-        p.send_stop()
-
-        return result
+        return self.__receive_bytes(offset, 4, count)
 
 
         
 # ################################################################
     
-def scan_i2c_port(clock_pin, data_pin):
+def scan_i2c_port(clock_pin, data_pin, backend=GpioBackend.DEFAULT_BACKEND):
     """
     TBD how to make this a class method?
     """
-    port = I2cPort(clock_pin=clock_pin, data_pin=data_pin)
+    port = I2cPort(clock_pin=clock_pin, data_pin=data_pin, backend=backend)
     port.set_idle()
     port.set_idle()
     print('')
     print('scanning clock_pin={}, data_pin={}'.format(clock_pin, data_pin))
     total_time = 0.0
     for a in port.VALID_ADDRESS_LIST:
-        st = time.time()
+        st = time.perf_counter()
         ack = port.ping_address(a)
-        total_time += (time.time() - st)
+        total_time += (time.perf_counter() - st)
         if ack:
             print('got ACK from address 0x{:X}'.format(a))
               
     print('average ping time is {} mSec'.format(1000.0 * total_time / len(port.VALID_ADDRESS_LIST)))
     print('')
-    GPIO.cleanup()
+    port.close()
@@ -0,0 +1,200 @@
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Talk to an I2C device through the kernel I2C driver, /dev/i2c-<bus>, with
+the same methods as I2cAccess.I2cDevice so a driver can use either.
+
+Each transaction is one I2C_RDWR ioctl() with a message per direction, so
+the offset write and the read after it are joined by a repeated START and
+the kernel keeps other users of the bus out for the whole transaction.
+The hardware clocks the bits, which takes far less time and CPU than
+bit banging them in Python.
+
+A NACK, or any other failed transfer, is raised as 
+I2cAccess.I2cIllegalStateError as I2cAccess does.  The bus has to be 
+enabled, e.g. with dtparam=i2c_arm=on, and the device wired to its pins
+(board pins 3 and 5 for bus 1).
+
+HTU21D/I2cDevAccess.py and Si702x/I2cDevAccess.py are the same.
+"""
+
+import ctypes
+import fcntl
+import os
+
+import I2cAccess
+
+I2C_DEVICE_FORMAT = '/dev/i2c-{}'  # bus
+
+# from linux/i2c-dev.h and linux/i2c.h
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+
+
+class i2c_msg(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('len', ctypes.c_uint16),
+                ('buf', ctypes.POINTER(ctypes.c_uint8))]
+
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [('msgs', ctypes.POINTER(i2c_msg)),
+                ('nmsgs', ctypes.c_uint32)]
+
+
+class I2cDevBus:
+    """
+    An open /dev/i2c-<bus>.
+    """
+    def __init__(self, i2c_bus):
+        self.i2c_bus = i2c_bus
+        self.fd = os.open(I2C_DEVICE_FORMAT.format(i2c_bus), os.O_RDWR)
+
+    def transfer(self, addr, write_data=None, read_count=0):
+        """
+        Write write_data, if any, then read read_count bytes, if any, from
+        the device at addr in one transaction.
+        Return the list of bytes read.
+        raise I2cAccess.I2cIllegalStateError if the transfer fails
+        """
+        msgs = (i2c_msg * 2)()
+        count = 0
+        if write_data is not None:
+            write_buf = (ctypes.c_uint8 * max(1, len(write_data)))(*write_data)
+            msgs[count] = i2c_msg(addr, 0, len(write_data), write_buf)
+            count += 1
+        if read_count:
+            read_buf = (ctypes.c_uint8 * read_count)()
+            msgs[count] = i2c_msg(addr, I2C_M_RD, read_count, read_buf)
+            count += 1
+        ioctl_data = i2c_rdwr_ioctl_data(msgs, count)
+        try:
+            fcntl.ioctl(self.fd, I2C_RDWR, ioctl_data)
+        except OSError as e:
+            raise I2cAccess.I2cIllegalStateError('transfer with device at address {} failed: {}'.format(addr, e.strerror))
+        if read_count:
+            return list(read_buf)
+        return []
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class I2cDevDevice():
+    """
+    A device at a particular address on /dev/i2c-<bus>, with the methods of
+    I2cAccess.I2cDevice.
+    """
+    def __init__(self, i2c_bus, device_address):
+        if device_address not in I2cAccess.I2cPort.VALID_ADDRESS_LIST:
+            raise I2cAccess.I2cInvalidArgumentError('device_address of {} is not valid'.format(device_address))
+        if isinstance(i2c_bus, I2cDevBus):
+            self.bus = i2c_bus
+        else:
+            self.bus = I2cDevBus(i2c_bus)
+        self.addr = device_address
+        if not self.ping():
+            raise I2cAccess.I2cIllegalStateError('no device detected at address {}'.format(self.addr))
+
+    def ping(self):
+        """
+        Send the address for write with no data and return True if it is 
+        ACKed, like I2cPort.ping_address()
+        """
+        try:
+            self.bus.transfer(self.addr, ())
+        except I2cAccess.I2cIllegalStateError:
+            return False
+        return True
+
+    def close(self):
+        self.bus.close()
+
+    @staticmethod
+    def __offset_bytes(offset, offset_count):
+        return [(offset >> (8 * i)) & 0xff for i in range(offset_count - 1, -1, -1)]
+
+    def send_bytes_no_offset(self, data):
+        """
+        Send the given list of data bytes to the device without sending an offset.
+        Return True, a NACK raises I2cAccess.I2cIllegalStateError
+        """
+        self.bus.transfer(self.addr, list(data))
+        return True
+
+    def receive_bytes_no_offset(self, count):
+        """
+        Receive count bytes from the device without sending an offset.
+        return the list of data bytes received from the device
+        """
+        return self.bus.transfer(self.addr, None, count)
+
+    def send_bytes_8bit_offset(self, offset, data):
+        """
+        Send the given list of data bytes to the device after sending 8 bits of offset.
+        Return True, a NACK raises I2cAccess.I2cIllegalStateError
+        """
+        self.bus.transfer(self.addr, self.__offset_bytes(offset, 1) + list(data))
+        return True
+
+    def receive_bytes_8bit_offset(self, offset, count):
+        """
+        Receive count bytes from the device after sending 8 bits of offset.
+        return the list of data bytes received from the device
+        """
+        return self.bus.transfer(self.addr, self.__offset_bytes(offset, 1), count)
+
+    def send_bytes_16bit_offset(self, offset, data):
+        """
+        Send the given list of data bytes to the device after sending 16 bits of offset.
+        Return True, a NACK raises I2cAccess.I2cIllegalStateError
+        """
+        self.bus.transfer(self.addr, self.__offset_bytes(offset, 2) + list(data))
+        return True
+
+    def receive_bytes_16bit_offset(self, offset, count):
+        """
+        Receive count bytes from the device after sending 16 bits of offset.
+        return the list of data bytes received from the device
+        """
+        return self.bus.transfer(self.addr, self.__offset_bytes(offset, 2), count)
+
+    def send_bytes_32bit_offset(self, offset, data):
+        """
+        Send the given list of data bytes to the device after sending 32 bits of offset.
+        Return True, a NACK raises I2cAccess.I2cIllegalStateError
+        """
+        self.bus.transfer(self.addr, self.__offset_bytes(offset, 4) + list(data))
+        return True
+
+    def receive_bytes_32bit_offset(self, offset, count):
+        """
+        Receive count bytes from the device after sending 32 bits of offset.
+        return the list of data bytes received from the device
+        """
+        return self.bus.transfer(self.addr, self.__offset_bytes(offset, 4), count)
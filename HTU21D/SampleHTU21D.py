@@ -36,20 +36,27 @@ periodically send the results to a file.
 
 send data in format of:
   <Timestamp> <Device> <sensor_id> <degrees C> <Rel Humidity>
+or, with --format binary, in the format of binary_sample_log.py
 """
 
 import argparse
 import datetime
+import os
+import signal
 import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sample_writer
+
+import GpioBackend
 import HTU21D
 
 DEBUG = 0
 
 DEFAULT_SAMPLE_INTERVAL_IN_SECONDS = 60 * 10
-OUTPUT_FORMAT = '{} {} {} {:.3f} {:.3f}\n'
 RESULT_FILENAME_BASE = '/opt/Sensors/logs/HTU21D_'
+FIELD_NAMES = ('temp_C', 'rel_hum')
 
 #
 # main
@@ -72,6 +79,26 @@ if __name__ == '__main__':
                         help='apply a suffix to the id',
                         type=str, 
                         default=None)
+    parser.add_argument('-g', '--gpio_backend',
+                        help='how the GPIO pins are driven',
+                        choices=sorted(GpioBackend.BACKENDS.keys()),
+                        default=GpioBackend.DEFAULT_BACKEND)
+    parser.add_argument('-b', '--i2c_bus',
+                        help='use the kernel driver of this I2C bus rather than GPIO pins',
+                        type=int,
+                        default=None)
+    parser.add_argument('-m', '--mode',
+                        help='how to wait for a conversion',
+                        choices=HTU21D.HTU21D_MODES,
+                        default=HTU21D.HTU21D_DEFAULT_MODE)
+    parser.add_argument('-R', '--resolution',
+                        help='RH and temperature resolution in bits, lower is faster',
+                        choices=['{}/{}'.format(*r) for r in sorted(HTU21D.HTU21D_RESOLUTIONS.keys())],
+                        default='{}/{}'.format(*HTU21D.HTU21D_DEFAULT_RESOLUTION))
+    parser.add_argument('-p', '--pipelined',
+                        help='start the temperature conversion as soon as the RH result is read and check the CRCs',
+                        action='store_true')
+    sample_writer.add_writer_arguments(parser)
     args = parser.parse_args()
 
     if (args.debug):
@@ -123,22 +150,29 @@ if __name__ == '__main__':
     
     data_file_name = RESULT_FILENAME_BASE + sensor_id
 
-    sensor = HTU21D.HTU21D()
+    sensor = HTU21D.HTU21D(gpio_backend=args.gpio_backend, i2c_bus=args.i2c_bus,
+                           mode=args.mode,
+                           resolution=tuple(int(b) for b in args.resolution.split('/')))
     
-    with open(data_file_name, 'a') as output:
+    # systemd stops the service with SIGTERM, exit so queued samples are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writer = sample_writer.SampleWriter(**sample_writer.get_writer_options(args))
+    try:
         # start now
         next_sample_time = time.time()
 
         while True:
-            when = datetime.datetime.now(datetime.timezone.utc).isoformat()
-            temperature,rh = sensor.retrieve_temp_humidity()
-            result = OUTPUT_FORMAT.format(when,
-                                          sensor.get_chip_type(), 
-                                          sensor_id,
-                                          temperature,
-                                          rh)
-            output.write(result)
-            output.flush()
+            when = datetime.datetime.now(datetime.timezone.utc)
+            if args.pipelined:
+                temperature,rh = sensor.retrieve_temp_humidity_pipelined(HTU21D.DEFAULT_RETRIES)
+            else:
+                temperature,rh = sensor.retrieve_temp_humidity_with_retries()
+            writer.write_samples(data_file_name,
+                                 [(sensor.get_chip_type(), 
+                                   sensor_id,
+                                   (temperature, rh))],
+                                 when,
+                                 FIELD_NAMES)
             
             next_sample_time = next_sample_time + sample_interval_in_seconds
             delay_time = next_sample_time - time.time()
@@ -148,3 +182,5 @@ if __name__ == '__main__':
         
             if 0 < delay_time:  # don't sleep if already next sample time
                 time.sleep(delay_time)
+    finally:
+        writer.close()
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Sample all the sensors attached to a Raspberry Pi from one process.
+
+This replaces running a separate Sample*.py program for each type of
+sensor.  A configuration file lists the sensors with their sampling 
+intervals and the sensors are all sampled by one SamplingDriver which
+writes to the same log files the Sample*.py programs use.
+
+The configuration is a JSON file of the form:
+  {
+    "sensors": [
+      {"type": "BME280", "interval": 600},
+      {"type": "DS18B20", "interval": 60, "phase": 5, "jitter": 2},
+      {"type": "Si702x", "interval": 600, 
+       "options": {"id_suffix": "attic"},
+       "filename": "/opt/Sensors/logs/attic.log"}
+    ],
+    "writer": {"batch_time": 5.0, "fsync_policy": "interval"}
+  }
+where "type" is one of the names in sensor_adapters.SENSOR_CLASSES, 
+"interval" is in seconds, "options" are passed to the sensor and 
+"filename" replaces the default log file of the sensor.  The optional
+"phase" delays the first sample and "jitter" adds a random delay of up to
+that many seconds to each sample, both in seconds, to keep sensors on the
+same bus from being sampled at the same moment.
+
+The optional "writer" entry holds keyword arguments for the shared
+sample_writer.SampleWriter, such as batch_count, batch_time, fsync_policy,
+fsync_interval, log_format, rotate, rotate_size and compress.
+
+Sensors which can not be found when the program starts are reported and
+skipped.
+
+The program takes the following command-line arguments:
+  --help               print a help message
+  -c, --config         name of the configuration file
+  -d, --debug          turn on debugging
+  -f, --format         write logs as "text" or "binary", overrides the
+                       log_format in the configuration file
+"""
+
+import argparse
+import json
+import signal
+import sys
+
+import sample_writer
+import sampling_driver
+import sensor_adapters
+
+DEBUG = 0
+
+DEFAULT_CONFIG_FILENAME = '/opt/Sensors/SensorsDaemon.json'
+
+
+def load_config(config_filename):
+    """
+    Read the configuration file and return the list of sensor entries
+    and the dictionary of writer options.
+    """
+    with open(config_filename) as f:
+        config = json.load(f)
+    sensors = config.get('sensors')
+    if not isinstance(sensors, list):
+        raise ValueError('"{}" must hold a list of "sensors"'.format(config_filename))
+    for entry in sensors:
+        if 'type' not in entry:
+            raise ValueError('sensor entry {} has no "type"'.format(entry))
+    writer_options = config.get('writer', {})
+    if not isinstance(writer_options, dict):
+        raise ValueError('"writer" in "{}" must be a dictionary'.format(config_filename))
+    return sensors, writer_options
+
+
+def build_driver(sensor_entries, writer_options=None):
+    """
+    Create the sensors listed in sensor_entries and return a 
+    SamplingDriver which samples them along with the list of sensors.
+    """
+    if writer_options is None:
+        writer_options = {}
+    writer = sample_writer.SampleWriter(**writer_options)
+    driver = sampling_driver.SamplingDriver(writer=writer)
+    sensors = []
+    for entry in sensor_entries:
+        type_name = entry['type']
+        try:
+            sensor = sensor_adapters.make_sensor(type_name, entry.get('options'))
+        except Exception as ex:
+            print('could not start sensor {} with options {}: "{}"'.format(type_name,
+                                                                           entry.get('options'),
+                                                                           ex),
+                  file=sys.stderr, flush=True)
+            continue
+        driver.add_sensor(sensor,
+                          entry.get('interval', sampling_driver.DEFAULT_SAMPLE_INTERVAL_IN_SECONDS),
+                          entry.get('filename'),
+                          entry.get('phase', 0.0),
+                          entry.get('jitter', 0.0))
+        sensors.append(sensor)
+    return driver, sensors
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sample all configured sensors from one process.')
+    parser.add_argument('-c', '--config',
+                        help='name of the configuration file',
+                        default=DEFAULT_CONFIG_FILENAME)
+    parser.add_argument('-d', '--debug',
+                        help='turn on debugging',
+                        action='store_true')
+    parser.add_argument('-f', '--format',
+                        help='write logs as "text" or "binary"',
+                        choices=sample_writer.LOG_FORMATS)
+    args = parser.parse_args()
+
+    if (args.debug):
+        DEBUG = 1
+        print('turned on DEBUG from command line.',
+              file=sys.stderr, flush=True)
+    sampling_driver.DEBUG = DEBUG
+
+    sensor_entries, writer_options = load_config(args.config)
+    if args.format:
+        writer_options['log_format'] = args.format
+    if DEBUG:
+        print('sensor_entries = {}'.format(sensor_entries),
+              file=sys.stderr, flush=True)
+        print('writer_options = {}'.format(writer_options),
+              file=sys.stderr, flush=True)
+
+    driver, sensors = build_driver(sensor_entries, writer_options)
+    if not sensors:
+        print('no sensors to sample', file=sys.stderr, flush=True)
+        sys.exit(1)
+
+    # systemd stops the service with SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: driver.stop())
+    try:
+        driver.collect_samples()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.get_writer().close()
+        for s in sensors:
+            s.close()
@@ -0,0 +1,285 @@
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Ways for I2cAccess to drive the two open drain pins of a bit banged I2C 
+bus.  A backend has:
+  release(pin)     let the pin be pulled high, another device may hold it low
+  drive_low(pin)   pull the pin low
+  read(pin)        return the level of the pin, 0 or 1
+  close()          give the pins back
+Pins are board pin numbers, as I2cAccess has always used.
+
+The backends are:
+  rpi_gpio   RPi.GPIO, which changes the direction of the pin with 
+             GPIO.setup() for every edge, one of its slowest calls
+  lgpio      the lgpio library on the /dev/gpiochip character device with
+             the pins requested once as open drain outputs with pull ups,
+             so each edge is one write
+  mock       a simulated bus, with SimulatedI2cDevice objects on it, for
+             testing and benchmarks without hardware
+
+Each backend imports its library when it is created so only the one used 
+needs to be installed.
+
+HTU21D/GpioBackend.py and Si702x/GpioBackend.py are the same, as are the 
+two copies of I2cAccess.py.
+"""
+
+BACKEND_RPI_GPIO = 'rpi_gpio'
+BACKEND_LGPIO = 'lgpio'
+BACKEND_MOCK = 'mock'
+DEFAULT_BACKEND = BACKEND_RPI_GPIO
+
+DEFAULT_GPIO_CHIP = 0
+
+# BCM GPIO number of each board pin of the 40 pin header, for lgpio
+BOARD_TO_BCM = {3: 2, 5: 3, 7: 4, 8: 14, 10: 15, 11: 17, 12: 18, 13: 27,
+                15: 22, 16: 23, 18: 24, 19: 10, 21: 9, 22: 25, 23: 11, 24: 8,
+                26: 7, 27: 0, 28: 1, 29: 5, 31: 6, 32: 12, 33: 13, 35: 19,
+                36: 16, 37: 26, 38: 20, 40: 21}
+
+
+class RPiGpioBackend:
+    """
+    Pins driven with RPi.GPIO in BOARD numbering.
+    """
+    def __init__(self, clock_pin, data_pin):
+        import RPi.GPIO as GPIO
+        self.__gpio = GPIO
+        self.__pins = (clock_pin, data_pin)
+        GPIO.setmode(GPIO.BOARD)
+        # bind the calls made for every edge once
+        self.__setup = GPIO.setup
+        self.read = GPIO.input
+        self.__IN = GPIO.IN
+        self.__OUT = GPIO.OUT
+        self.__PUD_UP = GPIO.PUD_UP
+
+    def release(self, pin):
+        self.__setup(pin, self.__IN, pull_up_down=self.__PUD_UP)
+
+    def drive_low(self, pin):
+        self.__setup(pin, self.__OUT, initial=0)
+
+    def close(self):
+        for pin in self.__pins:
+            self.release(pin)
+        self.__gpio.cleanup(self.__pins)
+
+
+class LgpioBackend:
+    """
+    Pins requested from /dev/gpiochip<chip> as open drain outputs with pull
+    ups, through lgpio.  Writing 1 lets the pin float high and reading 
+    returns the level of the pin.
+    """
+    def __init__(self, clock_pin, data_pin, chip=DEFAULT_GPIO_CHIP):
+        import lgpio
+        for pin in (clock_pin, data_pin):
+            if pin not in BOARD_TO_BCM:
+                raise ValueError('board pin {} is not a GPIO'.format(pin))
+        self.__lgpio = lgpio
+        self.__handle = lgpio.gpiochip_open(chip)
+        self.__lines = {}
+        for pin in (clock_pin, data_pin):
+            line = BOARD_TO_BCM[pin]
+            lgpio.gpio_claim_output(self.__handle, line, 1, 
+                                    lgpio.SET_OPEN_DRAIN | lgpio.SET_PULL_UP)
+            self.__lines[pin] = line
+        self.__write = lgpio.gpio_write
+        self.__read = lgpio.gpio_read
+
+    def release(self, pin):
+        self.__write(self.__handle, self.__lines[pin], 1)
+
+    def drive_low(self, pin):
+        self.__write(self.__handle, self.__lines[pin], 0)
+
+    def read(self, pin):
+        return self.__read(self.__handle, self.__lines[pin])
+
+    def close(self):
+        if self.__handle is None:
+            return
+        for line in self.__lines.values():
+            self.__lgpio.gpio_free(self.__handle, line)
+        self.__lgpio.gpiochip_close(self.__handle)
+        self.__handle = None
+
+
+class SimulatedI2cDevice:
+    """
+    A device on a MockBackend bus which ACKs address and reads and writes
+    memory.  The first byte written after the address sets the memory 
+    pointer, as the register address of most devices does.
+    """
+    def __init__(self, address, memory=range(256)):
+        self.address = address
+        self.memory = list(memory)
+        self.pointer = 0
+        self.sda = 1      # 0 while the device pulls the data line low
+        self.active = False
+        self.bit = 0
+        self.byte_index = 0
+        self.shift = 0
+        self.tx = 0
+        self.reading = False
+        self.addressed = False
+        self.master_ack = False
+
+    def start(self):
+        self.active = True
+        self.bit = 0
+        self.byte_index = 0
+        self.shift = 0
+        self.reading = False
+        self.addressed = False
+        self.sda = 1
+
+    def stop(self):
+        self.active = False
+        self.sda = 1
+
+    def clock_rising(self, sda):
+        if not self.active:
+            return
+        self.bit += 1
+        if self.bit <= 8 and not (self.reading and self.byte_index > 0):
+            self.shift = (self.shift << 1) | sda
+        elif 9 == self.bit and self.reading and self.byte_index > 0:
+            self.master_ack = (0 == sda)
+
+    def clock_falling(self):
+        if not self.active:
+            return
+        if 8 == self.bit:
+            if 0 == self.byte_index:
+                self.addressed = (self.shift >> 1) == self.address
+                self.reading = bool(self.shift & 1)
+                self.sda = 0 if self.addressed else 1
+            elif self.addressed and not self.reading:
+                if 1 == self.byte_index:
+                    self.pointer = self.shift
+                else:
+                    self.memory[self.pointer % len(self.memory)] = self.shift
+                    self.pointer += 1
+                self.sda = 0
+            else:
+                self.sda = 1  # the master sends the ACK
+        elif 9 == self.bit:
+            self.bit = 0
+            self.shift = 0
+            self.byte_index += 1
+            if self.addressed and self.reading and (1 == self.byte_index or self.master_ack):
+                self.tx = self.memory[self.pointer % len(self.memory)]
+                self.pointer += 1
+                self.sda = (self.tx >> 7) & 1
+            else:
+                self.sda = 1
+                if not self.addressed or self.reading:
+                    self.active = False
+        elif self.addressed and self.reading and self.byte_index > 0 and 1 <= self.bit <= 7:
+            self.sda = (self.tx >> (7 - self.bit)) & 1
+
+
+class MockBackend:
+    """
+    A simulated bus with pull ups on the two pins and the given devices,
+    such as SimulatedI2cDevice, which see the START, STOP and clock edges.
+    The calls made are counted in release_count, drive_low_count and 
+    read_count.
+    """
+    def __init__(self, clock_pin, data_pin, devices=()):
+        self.clock_pin = clock_pin
+        self.data_pin = data_pin
+        self.devices = list(devices)
+        self.driven_low = set()
+        self.release_count = 0
+        self.drive_low_count = 0
+        self.read_count = 0
+
+    def __device_sda(self):
+        for device in self.devices:
+            if 0 == device.sda:
+                return 0
+        return 1
+
+    def __change(self, pin, low):
+        scl_old = 0 if self.clock_pin in self.driven_low else 1
+        sda_old = 0 if self.data_pin in self.driven_low else 1
+        if low:
+            self.driven_low.add(pin)
+        else:
+            self.driven_low.discard(pin)
+        scl = 0 if self.clock_pin in self.driven_low else 1
+        sda = 0 if self.data_pin in self.driven_low else 1
+        if 1 == scl_old and 1 == scl:
+            if 1 == sda_old and 0 == sda:
+                for device in self.devices:
+                    device.start()
+            elif 0 == sda_old and 1 == sda:
+                for device in self.devices:
+                    device.stop()
+        elif 0 == scl_old and 1 == scl:
+            line = sda & self.__device_sda()
+            for device in self.devices:
+                device.clock_rising(line)
+        elif 1 == scl_old and 0 == scl:
+            for device in self.devices:
+                device.clock_falling()
+
+    def release(self, pin):
+        self.release_count += 1
+        self.__change(pin, False)
+
+    def drive_low(self, pin):
+        self.drive_low_count += 1
+        self.__change(pin, True)
+
+    def read(self, pin):
+        self.read_count += 1
+        if pin in self.driven_low:
+            return 0
+        if pin == self.data_pin:
+            return self.__device_sda()
+        return 1
+
+    def close(self):
+        self.driven_low.clear()
+
+
+BACKENDS = {BACKEND_RPI_GPIO: RPiGpioBackend,
+            BACKEND_LGPIO: LgpioBackend,
+            BACKEND_MOCK: MockBackend}
+
+
+def make_backend(name, clock_pin, data_pin, **kwargs):
+    """
+    Create the backend called name for the two pins, kwargs go to the 
+    backend, e.g. chip for lgpio or devices for mock.
+    """
+    if name not in BACKENDS:
+        raise ValueError('GPIO backend "{}" is not one of {}'.format(name, sorted(BACKENDS.keys())))
+    return BACKENDS[name](clock_pin, data_pin, **kwargs)
@@ -29,22 +29,28 @@ periodically send the results to a file.
 
 send data in format of:
   <Timestamp> <Device> <RPI_ID> <degrees C> <Rel Humidity>
+or, with --format binary, in the format of binary_sample_log.py
 
 """
 
 import argparse
 import datetime
+import os
+import signal
+import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sample_writer
+
+import GpioBackend
 import Si702x
 
 DEBUG = 0
-if DEBUG:
-    import sys
 
 DEFAULT_SAMPLE_INTERVAL_IN_SECONDS = 60 * 10
-OUTPUT_FORMAT = '{} {} {} {:.3f} {:.3f}\n'
 RESULT_FILENAME_BASE = '/opt/Sensors/logs/'
+FIELD_NAMES = ('temp_C', 'rel_hum')
 
 #
 # main
@@ -57,6 +63,17 @@ if __name__ == '__main__':
                         default=DEFAULT_SAMPLE_INTERVAL_IN_SECONDS)
     parser.add_argument("-s", "--id_suffix", help="apply a suffix to the id", 
                         default="")
+    parser.add_argument("-g", "--gpio_backend", help="how the GPIO pins are driven",
+                        choices=sorted(GpioBackend.BACKENDS.keys()),
+                        default=GpioBackend.DEFAULT_BACKEND)
+    parser.add_argument("-b", "--i2c_bus", help="use the kernel driver of this I2C bus rather than GPIO pins",
+                        type=int, default=None)
+    parser.add_argument("-m", "--mode", help="how to wait for a conversion",
+                        choices=Si702x.Si702x_MODES, default=Si702x.Si702x_DEFAULT_MODE)
+    parser.add_argument("-R", "--resolution", help="RH and temperature resolution in bits, lower is faster",
+                        choices=["{}/{}".format(*r) for r in sorted(Si702x.Si702x_RESOLUTIONS.keys())],
+                        default="{}/{}".format(*Si702x.Si702x_DEFAULT_RESOLUTION))
+    sample_writer.add_writer_arguments(parser)
     args = parser.parse_args()
 
     if (args.debug):
@@ -83,7 +100,9 @@ if __name__ == '__main__':
     ## done parsing command line
     ##
 
-    sensor = Si702x.Si702x()
+    sensor = Si702x.Si702x(gpio_backend=args.gpio_backend, i2c_bus=args.i2c_bus,
+                           mode=args.mode,
+                           resolution=tuple(int(b) for b in args.resolution.split('/')))
     chip_type = sensor.get_chip_type()
     id_ = sensor.get_chip_eid()
     if DEBUG:
@@ -99,18 +118,20 @@ if __name__ == '__main__':
 
     data_name = RESULT_FILENAME_BASE + chip_type + '_' + id_
     
-    with open(data_name, 'a') as output:
+    # systemd stops the service with SIGTERM, exit so queued samples are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writer = sample_writer.SampleWriter(**sample_writer.get_writer_options(args))
+    try:
         next_sample_time = time.time()
         while True:
-            when = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            when = datetime.datetime.now(datetime.timezone.utc)
             temperature,rh = sensor.retrieve_temp_humidity_with_retries()    
-            result = OUTPUT_FORMAT.format(when,
-                                          chip_type,
-                                          id_, 
-                                          temperature,
-                                          rh)
-            output.write(result)
-            output.flush()
+            writer.write_samples(data_name,
+                                 [(chip_type,
+                                   id_, 
+                                   (temperature, rh))],
+                                 when,
+                                 FIELD_NAMES)
             
             next_sample_time = next_sample_time + sample_interval_in_seconds
             delay_time = next_sample_time - time.time()
@@ -120,3 +141,5 @@ if __name__ == '__main__':
         
             if 0 < delay_time:  # don't sleep if already next sample time
                 time.sleep(delay_time)
+    finally:
+        writer.close()
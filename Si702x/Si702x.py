@@ -31,6 +31,8 @@ Datasheet available from :
 https://www.silabs.com/documents/public/data-sheets/Si7021-A20.pdf
 
 By default CLOCK is pin 13 and DATA is pin 11  (these are the board pin #s)
+With i2c_bus the kernel I2C driver is used instead, see I2cDevAccess.py,
+e.g. bus 1 on board pins 3 (DATA) and 5 (CLOCK).
 
 NOTE:  The SI7013 can capture data from an external voltage or sensor.  This
     code only supports the same data as the SI702X chips.
@@ -40,7 +42,9 @@ NOTE:  The SI7013 can capture data from an external voltage or sensor.  This
 
 import time
 
+import GpioBackend
 import I2cAccess
+import I2cDevAccess
 
 DEFAULT_RETRIES=5
 
@@ -65,16 +69,82 @@ Si702x_CMD_READ_EID_2 = 0xFCC9
 Si702x_CMD_READ_FW_REVISION = 0x84B8
 
 Si702x_REST_TIME_IN_SEC = 0.1
-Si702x_MAX_CONVERSION_TIME_IN_SEC = 0.02
+Si702x_MAX_CONVERSION_TIME_IN_SEC = 0.025  # 12 bit RH 12 mSec + 14 bit temperature 10.8 mSec
+
+# resolution (<RH bits>, <temperature bits>) : (<USER_REG bits>, 
+#     <max conversion time>), a RH measurement converts the temperature too
+# times are the datasheet maximum with some margin
+Si702x_USER_REG_RESOLUTION_MASK = 0x81
+Si702x_RESOLUTIONS = {(12, 14): (0x00, Si702x_MAX_CONVERSION_TIME_IN_SEC),
+                      (8, 12): (0x01, 0.008),
+                      (10, 13): (0x80, 0.012),
+                      (11, 11): (0x81, 0.01)}
+Si702x_DEFAULT_RESOLUTION = (12, 14)
+
+# how a measurement waits for the conversion
+# (the Pi hardware I2C controller mishandles clock stretching, use the hold
+# mode with the bit-banged port)
+Si702x_MODE_SLEEP = 'sleep'  # NO_HOLD command, sleep the maximum conversion time
+Si702x_MODE_HOLD = 'hold'    # HOLD_MASTER command, the chip stretches the clock till done
+Si702x_MODE_POLL = 'poll'    # NO_HOLD command, read till the chip stops NACKing its address
+Si702x_MODES = (Si702x_MODE_SLEEP, Si702x_MODE_HOLD, Si702x_MODE_POLL)
+Si702x_DEFAULT_MODE = Si702x_MODE_SLEEP
+Si702x_POLL_INTERVAL_IN_SEC = 0.002
+Si702x_POLL_MARGIN_IN_SEC = 0.01   # keep polling this long past the maximum conversion time
+
+Si702x_CRC8_POLYNOMIAL = 0x31  # x^8 + x^5 + x^4 + 1, initial value 0
+
+
+def crc8_table(polynomial):
+    '''
+    return the 256 entry lookup table of a MSB first CRC-8 with the given
+    polynomial, the CRC of a single byte is table[byte]
+    '''
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ polynomial) & 0xff
+            else:
+                crc = (crc << 1) & 0xff
+        table.append(crc)
+    return table
+
+Si702x_CRC8_TABLE = crc8_table(Si702x_CRC8_POLYNOMIAL)
+
+
+def crc8(data):
+    '''
+    return the CRC-8 the Si702x sends after the MSB and LSB of a result
+    '''
+    crc = 0
+    for byte in data:
+        crc = Si702x_CRC8_TABLE[crc ^ byte]
+    return crc
+
 
 class Si702x:
     
     def __init__(self, i2c_addr=Si702x_DEFAULT_I2C_ADDR, 
-                 board_clock_pin=DEFAULT_CLOCK_BOARD_PIN, board_data_pin=DEFAULT_DATA_BOARD_PIN):
+                 board_clock_pin=DEFAULT_CLOCK_BOARD_PIN, board_data_pin=DEFAULT_DATA_BOARD_PIN,
+                 gpio_backend=GpioBackend.DEFAULT_BACKEND, i2c_bus=None,
+                 mode=Si702x_DEFAULT_MODE, resolution=Si702x_DEFAULT_RESOLUTION):
+        if mode not in Si702x_MODES:
+            raise ValueError('mode "{}" is not one of {}'.format(mode, Si702x_MODES))
         self.__i2c_addr = i2c_addr
+        self.__mode = mode
+        self.__measurement_times = []
+        self.__phase_retries = {}
         
-        self.__i2c_port = I2cAccess.I2cPort(clock_pin=board_clock_pin, data_pin=board_data_pin)
-        self.__i2c_dev = I2cAccess.I2cDevice(self.__i2c_port, self.__i2c_addr)
+        if i2c_bus is not None:
+            # hardware I2C through /dev/i2c-<i2c_bus>
+            self.__i2c_port = None
+            self.__i2c_dev = I2cDevAccess.I2cDevDevice(i2c_bus, self.__i2c_addr)
+        else:
+            self.__i2c_port = I2cAccess.I2cPort(clock_pin=board_clock_pin, data_pin=board_data_pin,
+                                                backend=gpio_backend)
+            self.__i2c_dev = I2cAccess.I2cDevice(self.__i2c_port, self.__i2c_addr)
 
         # reset the device
         self.__i2c_dev.send_bytes_no_offset((Si702x_CMD_RESET,))
@@ -83,6 +153,7 @@ class Si702x:
         ur_val = self.__i2c_dev.receive_bytes_8bit_offset(Si702x_CMD_READ_USER_REG_1, 1)
         if 0x3a != ur_val[0]:
             raise Exception('expected 0x02 from USER_REG after reset but got 0x{:02x}'.format(ur_val[0]))
+        self.set_resolution(resolution)
 
     
         # get firmware revision    
@@ -135,16 +206,129 @@ class Si702x:
         return self.__eid
     
     
-    def retrieve_temp_humidity(self):
+    def get_resolution(self):
+        '''
+        return the measurement resolution, (<RH bits>, <temperature bits>)
+        '''
+        return self.__resolution
+
+
+    def set_resolution(self, resolution):
+        '''
+        Set the measurement resolution, one of the keys of Si702x_RESOLUTIONS.
+        Lower resolutions convert faster and the waits follow.
+        '''
+        if resolution not in Si702x_RESOLUTIONS:
+            raise ValueError('resolution {} is not one of {}'.format(resolution, sorted(Si702x_RESOLUTIONS.keys())))
+        res_bits = Si702x_RESOLUTIONS[resolution][0]
+        # read-modify-write so the heater and reserved bits are kept
+        ur_val = self.__i2c_dev.receive_bytes_8bit_offset(Si702x_CMD_READ_USER_REG_1, 1)
+        new_val = (ur_val[0] & ~Si702x_USER_REG_RESOLUTION_MASK) | res_bits
+        if new_val != ur_val[0]:
+            self.__i2c_dev.send_bytes_8bit_offset(Si702x_CMD_WRITE_USER_REG_1, (new_val,))
+            ur_val = self.__i2c_dev.receive_bytes_8bit_offset(Si702x_CMD_READ_USER_REG_1, 1)
+            if new_val != ur_val[0]:
+                raise IOError('wrote 0x{:02x} to USER_REG but read back 0x{:02x}'.format(new_val, ur_val[0]))
+        self.__resolution = resolution
+        self.__conversion_times = Si702x_RESOLUTIONS[resolution][1:]
+
+
+    def get_measurement_mode(self):
+        '''
+        return how measurements wait for the conversion, one of Si702x_MODES
+        '''
+        return self.__mode
+
+
+    def get_measurement_times(self):
+        '''
+        return the seconds each conversion of the last retrieve took, from
+        sending the command till the result was read
+        '''
+        return self.__measurement_times
+
+
+    def get_phase_retries(self):
+        '''
+        return a dict of how often the RH measurement and the temperature
+        read of the last retrieve were repeated after a bad CRC or failed
+        transfer
+        '''
+        return self.__phase_retries
+
+
+    def __measure(self, hold_cmd, no_hold_cmd, max_conversion_time):
+        '''
+        Start a measurement, wait for it as the mode says and return the 
+        3 bytes read, MSB, LSB and CRC
+        '''
+        start = time.perf_counter()
+        if Si702x_MODE_HOLD == self.__mode:
+            # the chip holds the clock low after the read address till the
+            # conversion is done
+            raw_bytes = self.__i2c_dev.receive_bytes_8bit_offset(hold_cmd, 3)
+        else:
+            self.__i2c_dev.send_bytes_no_offset((no_hold_cmd,))
+            if Si702x_MODE_SLEEP == self.__mode:
+                time.sleep(max_conversion_time)
+                raw_bytes = self.__i2c_dev.receive_bytes_no_offset(3)
+            else:
+                # the chip NACKs its read address till the conversion is done
+                deadline = start + max_conversion_time + Si702x_POLL_MARGIN_IN_SEC
+                while True:
+                    time.sleep(Si702x_POLL_INTERVAL_IN_SEC)
+                    try:
+                        raw_bytes = self.__i2c_dev.receive_bytes_no_offset(3)
+                        break
+                    except I2cAccess.I2cIllegalStateError:
+                        if time.perf_counter() > deadline:
+                            raise
+        self.__measurement_times.append(time.perf_counter() - start)
+        return raw_bytes
+
+
+    def __retry_phase(self, phase, retries, action):
+        '''
+        Return action(), a bad CRC or failed transfer repeats only this 
+        phase, up to retries times, then the error is raised.
+        '''
+        for attempt in range(retries + 1):
+            try:
+                return action()
+            except (IOError, I2cAccess.I2cIllegalStateError):
+                if attempt == retries:
+                    raise
+                self.__phase_retries[phase] += 1
+
+
+    def __measure_rh(self):
+        raw_bytes = self.__measure(Si702x_CMD_MEASURE_RH_HOLD_MASTER_MODE,
+                                   Si702x_CMD_MEASURE_RH_NO_HOLD_MASTER_MODE,
+                                   self.__conversion_times[0])
+        crc = crc8(raw_bytes[:2])
+        if crc != raw_bytes[2]:
+            raise IOError('RH CRC mismatch, read 0x{:02x} but computed 0x{:02x}'.format(raw_bytes[2], crc))
+        return raw_bytes
+
+
+    def __read_temp(self):
+        # the temperature converted with the RH, no conversion and no CRC
+        return self.__i2c_dev.receive_bytes_8bit_offset(Si702x_CMD_READ_TEMP_FROM_RH_MEASUREMENT, 2)
+
+
+    def retrieve_temp_humidity(self, retries=0):
         '''
         Retrieve the raw data from the Si702x and apply the various correction factors to
         determine temperature and relative humidity
+        The RH CRC is checked.  A bad CRC or failed transfer repeats just 
+        that phase, the RH measurement or the temperature read, up to retries
+        times before the IOError or I2cAccess.I2cIllegalStateError is raised.
         Return the tuple <temperature in degrees C>, <relative humidity %>
         '''
+        self.__measurement_times = []
+        self.__phase_retries = {'RH': 0, 'temperature': 0}
         # Read humidity -- wait...
-        self.__i2c_dev.send_bytes_no_offset((Si702x_CMD_MEASURE_RH_NO_HOLD_MASTER_MODE,))
-        time.sleep(Si702x_MAX_CONVERSION_TIME_IN_SEC)
-        raw_bytes = self.__i2c_dev.receive_bytes_no_offset(3)
+        raw_bytes = self.__retry_phase('RH', retries, self.__measure_rh)
         raw = ((raw_bytes[0] & 0xff) << 8) + (raw_bytes[1] & 0xff)
         rh = (raw * 125 / 65536.0) - 6.0
         if rh > 100:
@@ -153,7 +337,7 @@ class Si702x:
             rh = 0.0
 
         # Then get the temperature
-        raw_bytes = self.__i2c_dev.receive_bytes_8bit_offset(Si702x_CMD_READ_TEMP_FROM_RH_MEASUREMENT, 3)
+        raw_bytes = self.__retry_phase('temperature', retries, self.__read_temp)
         raw = ((raw_bytes[0] & 0xff) << 8) + (raw_bytes[1] & 0xff)
         temp = (raw * 175.72 / 65536.0) - 46.85
 
@@ -161,18 +345,13 @@ class Si702x:
 
     def retrieve_temp_humidity_with_retries(self, retries=DEFAULT_RETRIES):
         """
-        Retrieve the temperature and humidity.  This will retry the action
-        "retries" times before giving up on errors.
+        Retrieve the temperature and humidity.  The phase that fails is
+        retried up to "retries" times before giving up.
         """
-        for _ in range(retries):
-            try:
-                temp,rh = self.retrieve_temp_humidity()
-                return temp,rh
-            except Exception as _:
-                # just toss problems for now and try again
-                pass
-        
-        raise RuntimeError('exceeded {} retries while retrieving data'.format(retries))
+        try:
+            return self.retrieve_temp_humidity(retries)
+        except (IOError, I2cAccess.I2cIllegalStateError) as e:
+            raise RuntimeError('exceeded {} retries while retrieving data'.format(retries)) from e
 
 
 #
@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Compact binary format for sample logs.
+
+A binary log holds the samples of one sensor.  The file starts with a
+header followed by fixed size records:
+
+  header:
+    8 bytes   magic b'SNSLOG01'
+    4 bytes   little endian length of the JSON text which follows
+    n bytes   UTF-8 JSON of {"sensor_type", "sensor_id", "fields",
+              "record_format"}, padded with spaces so records start on
+              an 8 byte boundary
+  record:
+    int64     UTC time of the sample in nanoseconds since the epoch
+    float32   one value for each name in "fields"
+
+All values are little endian.  The fixed record size lets a reader find
+any record without parsing the ones before it and lets load_numpy()
+memory map the records as a NumPy structured array.  NumPy is only needed
+for load_numpy().
+"""
+
+import datetime
+import json
+import os
+import struct
+
+MAGIC = b'SNSLOG01'
+HEADER_LENGTH_FORMAT = '<I'
+HEADER_ALIGNMENT = 8
+TIME_FORMAT = 'q'
+VALUE_FORMAT = 'f'
+BINARY_FILENAME_SUFFIX = '.bin'
+TEXT_FILENAME_SUFFIX = '.log'
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def record_format(field_count):
+    """
+    Return the struct format of a record with field_count values.
+    """
+    return '<' + TIME_FORMAT + VALUE_FORMAT * field_count
+
+
+def datetime_to_ns(when):
+    """
+    Return an aware datetime as integer nanoseconds since the epoch.
+    """
+    return ((when - EPOCH) // ONE_MICROSECOND) * 1000
+
+
+def ns_to_datetime(ns):
+    """
+    Return nanoseconds since the epoch as a UTC datetime.
+    """
+    return EPOCH + datetime.timedelta(microseconds=ns // 1000)
+
+
+def binary_filename(filename, sensor_id):
+    """
+    Return the name of the binary log for sensor_id which goes with the
+    text log filename.
+    
+    A '.log' suffix is dropped and the id is added unless the name already
+    ends with it, so '/opt/Sensors/logs/DS18B20.log' becomes 
+    '/opt/Sensors/logs/DS18B20_<id>.bin' while
+    '/opt/Sensors/logs/BME280_<uid>' becomes '/opt/Sensors/logs/BME280_<uid>.bin'.
+    """
+    base = filename
+    if base.endswith(TEXT_FILENAME_SUFFIX):
+        base = base[:-len(TEXT_FILENAME_SUFFIX)]
+    sensor_id = str(sensor_id)
+    if not base.endswith(sensor_id):
+        base = base + '_' + sensor_id
+    return base + BINARY_FILENAME_SUFFIX
+
+
+def make_header(sensor_type_name, sensor_id, field_names):
+    """
+    Return the bytes of the header for a new binary log.
+    """
+    header = {'sensor_type': sensor_type_name,
+              'sensor_id': str(sensor_id),
+              'fields': list(field_names),
+              'record_format': record_format(len(field_names))}
+    text = json.dumps(header).encode('UTF-8')
+    used = len(MAGIC) + struct.calcsize(HEADER_LENGTH_FORMAT) + len(text)
+    text = text + b' ' * (-used % HEADER_ALIGNMENT)
+    return MAGIC + struct.pack(HEADER_LENGTH_FORMAT, len(text)) + text
+
+
+def read_header(f):
+    """
+    Read the header from the start of the open binary file f.
+    
+    Return (header dictionary, offset of the first record).
+    """
+    f.seek(0)
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError('not a binary sample log, found magic {}'.format(magic))
+    length_size = struct.calcsize(HEADER_LENGTH_FORMAT)
+    length = struct.unpack(HEADER_LENGTH_FORMAT, f.read(length_size))[0]
+    text = f.read(length)
+    if len(text) != length:
+        raise ValueError('binary sample log header is truncated')
+    header = json.loads(text.decode('UTF-8'))
+    if header['record_format'] != record_format(len(header['fields'])):
+        raise ValueError('unsupported record format "{}"'.format(header['record_format']))
+    return header, len(MAGIC) + length_size + length
+
+
+class BinarySampleLog:
+    """
+    Append records to the binary log of one sensor.
+    
+    A new file gets a header.  An existing file must have a header with 
+    the same sensor and fields.  A partial record left at the end of the
+    file by a crash is cut off so following records stay aligned.
+    """
+    def __init__(self, filename, sensor_type_name, sensor_id, field_names):
+        self.__filename = filename
+        self.__struct = struct.Struct(record_format(len(field_names)))
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__file = open(filename, 'a+b')
+        self.__file.seek(0, os.SEEK_END)
+        size = self.__file.tell()
+        if 0 == size:
+            self.__file.write(make_header(sensor_type_name, sensor_id, field_names))
+            self.__file.flush()
+        else:
+            header, offset = read_header(self.__file)
+            if (header['sensor_type'] != sensor_type_name or
+                    header['sensor_id'] != str(sensor_id) or
+                    header['fields'] != list(field_names)):
+                self.__file.close()
+                raise ValueError('"{}" holds {} {} {} not {} {} {}'.format(filename,
+                                                                       header['sensor_type'],
+                                                                       header['sensor_id'],
+                                                                       header['fields'],
+                                                                       sensor_type_name,
+                                                                       sensor_id,
+                                                                       list(field_names)))
+            extra = (size - offset) % self.__struct.size
+            if extra:
+                self.__file.truncate(size - extra)
+        self.__file.seek(0, os.SEEK_END)
+
+    def pack(self, when, values):
+        """
+        Return the bytes of one record.
+        """
+        return self.__struct.pack(datetime_to_ns(when), *values)
+
+    def write(self, data):
+        """
+        Append bytes made by pack() to the file.
+        """
+        self.__file.write(data)
+
+    def flush(self):
+        self.__file.flush()
+
+    def fileno(self):
+        return self.__file.fileno()
+
+    def close(self):
+        self.__file.close()
+
+
+def read_records(filename):
+    """
+    Yield (datetime, values) for each record in a binary log without
+    using NumPy.
+    """
+    with open(filename, 'rb') as f:
+        header, offset = read_header(f)
+        record = struct.Struct(header['record_format'])
+        f.seek(offset)
+        while True:
+            data = f.read(record.size)
+            if len(data) < record.size:
+                return
+            values = record.unpack(data)
+            yield ns_to_datetime(values[0]), values[1:]
+
+
+def numpy_dtype(header):
+    """
+    Return the NumPy dtype of the records described by header.
+    """
+    import numpy
+    fields = [('time_ns', '<i8')]
+    fields.extend([(name, '<f4') for name in header['fields']])
+    return numpy.dtype(fields)
+
+
+def load_numpy(filename):
+    """
+    Memory map the records of a binary log.
+    
+    Return (header, structured array) where the array has a 'time_ns'
+    column and one float32 column for each field.  The array is read only
+    and only the pages which are used are read from storage.
+    """
+    import numpy
+    with open(filename, 'rb') as f:
+        header, offset = read_header(f)
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+    dtype = numpy_dtype(header)
+    count = (size - offset) // dtype.itemsize
+    if 0 == count:
+        return header, numpy.zeros(0, dtype=dtype)
+    return header, numpy.memmap(filename, dtype=dtype, mode='r',
+                                offset=offset, shape=(count,))
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    import sys
+    
+    for name in sys.argv[1:]:
+        for when, values in read_records(name):
+            print(when.isoformat(), ' '.join(['{:.3f}'.format(v) for v in values]))
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Keep the calibration data of I2C sensors on disk so a driver started again
+does not have to reset the chip and wait for the readings to settle when 
+the chip is still running the way it was left.
+
+Each entry is a JSON file named for the chip type, bus and address.  An 
+entry is only returned when it is for the expected chip ID and the MD5 UID
+of the cached calibration data matches the UID stored with it, so a 
+damaged entry, or one written for another chip ID, is never used.  The 
+drivers read the calibration blocks from the chip, which is cheap, and 
+only trust an entry whose UID matches them, so a chip swapped for another
+of the same type is reset.  The drivers also decide whether the chip is
+still configured as the entry says.
+
+Entries hold:
+  chip_type    e.g. 'BME280'
+  chip_id      the chip ID byte
+  i2c_bus      bus number
+  i2c_addr     address on the bus
+  uid          MD5 hex digest of the calibration blocks, the driver UID
+  calibration  list of calibration blocks, each a list of byte values
+  registers    control register values read back from the configured chip
+  configured   time.time() when the registers were written
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+DEBUG = 0
+
+DEFAULT_CACHE_DIRECTORY = '/opt/Sensors/cache/'
+CACHE_FILENAME_FORMAT = '{}_i2c-{}_0x{:02x}.json'  # type bus addr
+TEMPORARY_SUFFIX = '.tmp'
+
+
+def calibration_uid(blocks):
+    """
+    Return the MD5 hex digest of the calibration blocks, the UID used to
+    name the logs of a chip.
+    """
+    h = hashlib.new('md5')
+    for block in blocks:
+        h.update(bytes(block))
+    return h.hexdigest()
+
+
+def cache_filename(chip_type, i2c_bus, i2c_addr,
+                   cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Return the name of the entry for a chip at i2c_addr on i2c_bus.
+    """
+    return os.path.join(cache_directory,
+                        CACHE_FILENAME_FORMAT.format(chip_type, i2c_bus, i2c_addr))
+
+
+def load_entry(chip_type, i2c_bus, i2c_addr, chip_id,
+               cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Return the entry for the chip as a dictionary or None if there is no
+    valid entry.
+    """
+    filename = cache_filename(chip_type, i2c_bus, i2c_addr, cache_directory)
+    try:
+        with open(filename, 'r') as f:
+            entry = json.load(f)
+        blocks = [bytes(block) for block in entry['calibration']]
+        if (entry['chip_type'] != chip_type or
+            entry['chip_id'] != chip_id or
+            entry['i2c_bus'] != i2c_bus or
+            entry['i2c_addr'] != i2c_addr or
+            entry['uid'] != calibration_uid(blocks)):
+            if DEBUG:
+                print('ignoring cache entry "{}" for another chip'.format(filename),
+                      file=sys.stderr, flush=True)
+            return None
+        entry['calibration'] = [list(block) for block in blocks]
+        return entry
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if DEBUG:
+            print('ignoring cache entry "{}": {}'.format(filename, e),
+                  file=sys.stderr, flush=True)
+        return None
+
+
+def save_entry(entry, cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Write the entry, replacing any entry for the same chip type, bus and
+    address.  Return True if it was written.  A cache that cannot be 
+    written only costs time so errors are not raised.
+    """
+    filename = cache_filename(entry['chip_type'], entry['i2c_bus'], 
+                              entry['i2c_addr'], cache_directory)
+    temporary_filename = filename + TEMPORARY_SUFFIX
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        with open(temporary_filename, 'w') as f:
+            json.dump(entry, f, sort_keys=True)
+        # readers see the old entry or the new one, never part of one
+        os.replace(temporary_filename, filename)
+        return True
+    except OSError as e:
+        if DEBUG:
+            print('could not write cache entry "{}": {}'.format(filename, e),
+                  file=sys.stderr, flush=True)
+        return False
+
+
+def remove_entry(chip_type, i2c_bus, i2c_addr,
+                 cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Remove the entry for a chip if there is one.
+    """
+    try:
+        os.remove(cache_filename(chip_type, i2c_bus, i2c_addr, cache_directory))
+    except FileNotFoundError:
+        pass
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    cache_directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE_DIRECTORY
+    try:
+        names = sorted(os.listdir(cache_directory))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(cache_directory, name), 'r') as f:
+            entry = json.load(f)
+        print('{}  bus {}  addr 0x{:02x}  uid {}  registers {}'.format(
+              entry['chip_type'], entry['i2c_bus'], entry['i2c_addr'],
+              entry['uid'], ' '.join('0x{:02x}'.format(r) for r in entry['registers'])))
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Import the modules of the device directories of this project, which are
+not packages, by adding the directory to sys.path.  Kept apart from 
+sensor_adapters.py so the drivers and i2c_bus_manager.py can use it 
+without loading the adapter layer.
+"""
+
+import importlib
+import os
+import sys
+
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_driver(directory, module_name):
+    """
+    Import module_name from a directory of this project.
+    """
+    path = os.path.join(BASE_DIRECTORY, directory)
+    if path not in sys.path:
+        sys.path.append(path)
+    return importlib.import_module(module_name)
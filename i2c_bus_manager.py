@@ -0,0 +1,314 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Share the I2C buses of a Raspberry Pi between the drivers of one process
+and keep processes from interleaving their transfers.
+
+A LockedSMBus owns the one smbus.SMBus of a bus.  Each transfer, and each
+sequence of transfers run in a transaction(), holds a thread lock and an
+flock() on /run/lock/i2c-<bus>.lock so other processes using the same 
+lock file wait for it.  If the lock file can not be opened only the 
+threads of this process are kept apart.
+
+An I2cBusManager hands out the LockedSMBus of each bus, finds the chips 
+it has drivers for by reading their chip ID register, and hands out one
+driver per chip:
+
+  manager = I2cBusManager()
+  for driver in manager.get_drivers():
+      print(driver.get_chip_type(), driver.get_uid())
+
+Only the addresses in SCAN_ADDRESSES are read when scanning as reading
+register 0xD0 of some other chip could change its state.
+"""
+
+import contextlib
+import fcntl
+import glob
+import os
+import smbus
+import sys
+import threading
+
+import driver_import
+
+DEBUG = 0
+
+DEFAULT_LOCK_DIRECTORY = '/run/lock/'
+LOCK_FILENAME_FORMAT = 'i2c-{}.lock'  # bus
+I2C_DEVICE_GLOB = '/dev/i2c-*'
+
+CHIP_ID_REGISTER = 0xD0
+SCAN_ADDRESSES = (0x76, 0x77)
+# chip type, which is also the directory and module of the driver, for each chip ID
+CHIP_TYPES_BY_ID = {0x60: 'BME280',
+                    0x58: 'BMP280'}
+
+
+def available_buses():
+    """
+    Return the sorted list of I2C bus numbers with a /dev/i2c-<bus> device.
+    """
+    buses = []
+    for name in glob.glob(I2C_DEVICE_GLOB):
+        try:
+            buses.append(int(name.rsplit('-', 1)[1]))
+        except ValueError:
+            pass
+    return sorted(buses)
+
+
+class LockedSMBus:
+    """
+    An smbus.SMBus whose transfers are kept apart from those of other 
+    threads and processes.
+    """
+    def __init__(self, i2c_bus, lock_directory=DEFAULT_LOCK_DIRECTORY):
+        self.__i2c_bus = i2c_bus
+        self.__smbus = smbus.SMBus(i2c_bus)
+        self.__lock = threading.RLock()
+        self.__depth = 0
+        self.__lock_file = None
+        if lock_directory is not None:
+            lock_filename = os.path.join(lock_directory, LOCK_FILENAME_FORMAT.format(i2c_bus))
+            try:
+                self.__lock_file = open(lock_filename, 'a')
+            except OSError as e:
+                if DEBUG:
+                    print('not locking between processes, "{}": {}'.format(lock_filename, e),
+                          file=sys.stderr, flush=True)
+
+    def get_bus_number(self):
+        '''
+        return the number of the bus
+        '''
+        return self.__i2c_bus
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''
+        Hold the bus for a sequence of transfers.  Transactions can be 
+        nested and the process lock is only dropped by the outermost one.
+        '''
+        with self.__lock:
+            self.__depth += 1
+            try:
+                if 1 == self.__depth and self.__lock_file is not None:
+                    fcntl.flock(self.__lock_file, fcntl.LOCK_EX)
+                yield self
+            finally:
+                self.__depth -= 1
+                if 0 == self.__depth and self.__lock_file is not None:
+                    fcntl.flock(self.__lock_file, fcntl.LOCK_UN)
+
+    def read_byte(self, i2c_addr):
+        with self.transaction():
+            return self.__smbus.read_byte(i2c_addr)
+
+    def write_byte(self, i2c_addr, value):
+        with self.transaction():
+            return self.__smbus.write_byte(i2c_addr, value)
+
+    def read_byte_data(self, i2c_addr, register):
+        with self.transaction():
+            return self.__smbus.read_byte_data(i2c_addr, register)
+
+    def write_byte_data(self, i2c_addr, register, value):
+        with self.transaction():
+            return self.__smbus.write_byte_data(i2c_addr, register, value)
+
+    def read_i2c_block_data(self, i2c_addr, register, length):
+        with self.transaction():
+            return self.__smbus.read_i2c_block_data(i2c_addr, register, length)
+
+    def write_i2c_block_data(self, i2c_addr, register, data):
+        with self.transaction():
+            return self.__smbus.write_i2c_block_data(i2c_addr, register, data)
+
+    def close(self):
+        with self.__lock:
+            self.__smbus.close()
+            if self.__lock_file is not None:
+                self.__lock_file.close()
+                self.__lock_file = None
+
+
+class I2cBusManager:
+    """
+    Hand out one LockedSMBus per bus and one driver per chip.
+    """
+    def __init__(self, lock_directory=DEFAULT_LOCK_DIRECTORY):
+        self.__lock_directory = lock_directory
+        self.__lock = threading.Lock()
+        self.__buses = {}
+        self.__drivers = {}  # (bus, addr) : driver
+
+    def get_bus(self, i2c_bus=None):
+        '''
+        Return the LockedSMBus of i2c_bus.  If i2c_bus is None bus 1 is 
+        used, or bus 0 if there is no bus 1, as the drivers do.
+        '''
+        with self.__lock:
+            if i2c_bus is None:
+                try:
+                    return self.__open_bus(1)
+                except Exception as _: # not on 1 -- if not on 0 it is an error
+                    return self.__open_bus(0)
+            return self.__open_bus(i2c_bus)
+
+    def __open_bus(self, i2c_bus):
+        bus = self.__buses.get(i2c_bus)
+        if bus is None:
+            bus = LockedSMBus(i2c_bus, self.__lock_directory)
+            self.__buses[i2c_bus] = bus
+        return bus
+
+    def identify(self, i2c_bus, i2c_addr):
+        '''
+        Return the chip type at i2c_addr, None if nothing answers, or
+        raise ValueError for a chip ID without a driver.
+        '''
+        bus = self.get_bus(i2c_bus)
+        try:
+            chip_id = bus.read_i2c_block_data(i2c_addr, CHIP_ID_REGISTER, 1)[0]
+        except OSError:
+            return None
+        if chip_id not in CHIP_TYPES_BY_ID:
+            raise ValueError('unknown chip ID 0x{:02x} at 0x{:02x} on bus {}'.format(chip_id, i2c_addr, 
+                                                                                   bus.get_bus_number()))
+        return CHIP_TYPES_BY_ID[chip_id]
+
+    def scan(self, i2c_bus=None, addresses=SCAN_ADDRESSES):
+        '''
+        Return a list of (address, chip type) of the supported chips found
+        on i2c_bus.
+        '''
+        found = []
+        for i2c_addr in addresses:
+            try:
+                chip_type = self.identify(i2c_bus, i2c_addr)
+            except ValueError as e:
+                if DEBUG:
+                    print(e, file=sys.stderr, flush=True)
+                continue
+            if chip_type is not None:
+                found.append((i2c_addr, chip_type))
+        return found
+
+    def get_driver(self, i2c_bus=None, i2c_addr=SCAN_ADDRESSES[0], chip_type=None, **kwargs):
+        '''
+        Return the driver of the chip at i2c_addr on i2c_bus, creating it
+        with kwargs the first time it is asked for.  The chip type is read
+        from the chip if not given.  ValueError is raised if the driver 
+        already made is for another chip type or runs another profile.
+        '''
+        bus = self.get_bus(i2c_bus)
+        key = (bus.get_bus_number(), i2c_addr)
+        with self.__lock:
+            driver = self.__drivers.get(key)
+        if driver is not None:
+            self.__check_driver(driver, key, chip_type, kwargs.get('profile'))
+            return driver
+        if chip_type is None:
+            chip_type = self.identify(key[0], i2c_addr)
+            if chip_type is None:
+                raise IOError('no chip at 0x{:02x} on bus {}'.format(i2c_addr, key[0]))
+        module = driver_import.import_driver(chip_type, chip_type)
+        driver = getattr(module, chip_type)(i2c_bus=key[0], i2c_addr=i2c_addr,
+                                            smbus_handle=bus, **kwargs)
+        with self.__lock:
+            # another thread may have made one meanwhile, keep the first
+            driver = self.__drivers.setdefault(key, driver)
+        self.__check_driver(driver, key, chip_type, kwargs.get('profile'))
+        return driver
+
+    def __check_driver(self, driver, key, chip_type, profile):
+        '''
+        raise ValueError if driver is not for chip_type or does not run
+        profile, a driver shared by all its users can not run two profiles
+        '''
+        if chip_type is not None and chip_type != driver.get_chip_type():
+            raise ValueError('a {} is at 0x{:02x} on bus {}, not a {}'.format(driver.get_chip_type(),
+                                                                             key[1], key[0],
+                                                                             chip_type))
+        if profile is not None and profile != driver.get_profile():
+            raise ValueError('the {} at 0x{:02x} on bus {} runs profile "{}", not "{}"'.format(driver.get_chip_type(),
+                                                                                             key[1], key[0],
+                                                                                             driver.get_profile(),
+                                                                                             profile))
+
+    def get_drivers(self, buses=None, addresses=SCAN_ADDRESSES):
+        '''
+        Return drivers for all the supported chips found on buses, all 
+        the buses of the system if None.
+        '''
+        if buses is None:
+            buses = available_buses()
+        drivers = []
+        for i2c_bus in buses:
+            for i2c_addr, chip_type in self.scan(i2c_bus, addresses):
+                drivers.append(self.get_driver(i2c_bus, i2c_addr, chip_type))
+        return drivers
+
+    def close(self):
+        '''
+        close all the buses, the drivers handed out can no longer be used
+        '''
+        with self.__lock:
+            for bus in self.__buses.values():
+                bus.close()
+            self.__buses = {}
+            self.__drivers = {}
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_default_manager():
+    """
+    Return the I2cBusManager shared by the whole process.
+    """
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = I2cBusManager()
+        return _default_manager
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    manager = get_default_manager()
+    for driver in manager.get_drivers():
+        print('{} UID: {}  profile: {}'.format(driver.get_chip_type(), driver.get_uid(),
+                                               driver.get_profile()))
+        if 'BME280' == driver.get_chip_type():
+            print('  {}'.format(driver.retrieve_temperature_pressure_humidity()))
+        else:
+            print('  {}'.format(driver.retrieve_temperature_pressure()))
+    manager.close()
@@ -0,0 +1,617 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Query sample logs by time without reading the whole file.
+
+Logs are only ever appended to, in time order, so the lines of a text log
+can be found by time with a binary search.  A SampleLog memory maps the log
+and keeps a sparse index in <log>.idx which records the time and offset
+of the first line found every index_stride bytes.  A query does a binary
+search of the index and then reads at most index_stride bytes to find
+each end of the time range.  The index is brought up to date before each
+query by indexing only the part of the log added since the last one.
+
+Binary logs, see binary_sample_log.py, have fixed size records so they
+are searched directly and need no index.
+
+A log which SampleWriter splits into segments is queried with a
+SegmentedSampleLog, which picks the segments which hold the time range by
+their names and only opens those.  Compressed segments are decompressed
+into memory when they are queried.
+
+The result of a query is a SampleQueryResult which does not split the
+lines till they are used and converts each column the first time it is
+asked for, so asking for one column of a long range does not pay for the
+others.
+
+Example:
+  log = SampleLog('/opt/Sensors/logs/BME280_<uid>')
+  result = log.query_last(datetime.timedelta(hours=24))
+  pressure = result.get_column('pressure')
+  print(result.get_min('pressure'), result.get_max('pressure'))
+"""
+
+import array
+import bisect
+import datetime
+import gzip
+import io
+import mmap
+import os
+import struct
+
+import binary_sample_log
+import sample_writer
+
+INDEX_FILENAME_SUFFIX = '.idx'
+INDEX_MAGIC = b'SNSIDX01'
+INDEX_HEADER_FORMAT = '<8sqq'  # magic, stride, size of log when indexed
+DEFAULT_INDEX_STRIDE = 64 * 1024
+
+
+def parse_timestamp(text):
+    """
+    Return the ISO timestamp text (str or bytes) as nanoseconds since the
+    epoch.  Timestamps without a time zone are taken as UTC.
+    """
+    if isinstance(text, bytes):
+        text = text.decode('ascii')
+    when = datetime.datetime.fromisoformat(text)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return binary_sample_log.datetime_to_ns(when)
+
+
+def to_ns(when):
+    """
+    Return a datetime, or nanoseconds since the epoch, as nanoseconds
+    since the epoch.  None stays None.
+    """
+    if when is None or isinstance(when, int):
+        return when
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return binary_sample_log.datetime_to_ns(when)
+
+
+class SampleQueryResult:
+    """
+    The samples found by a query.
+    
+    Columns are built the first time they are asked for and kept.
+    Subclasses provide _load_rows(), _times_ns(), _ids(), _column(k) and
+    _field_names().
+    """
+    def __init__(self):
+        self.__rows = None
+        self.__columns = {}
+
+    def _get_rows(self):
+        if self.__rows is None:
+            self.__rows = self._load_rows()
+        return self.__rows
+
+    def __cached(self, key, function):
+        column = self.__columns.get(key)
+        if column is None:
+            column = function()
+            self.__columns[key] = column
+        return column
+
+    def get_count(self):
+        """
+        Return the number of samples.
+        """
+        return len(self._get_rows())
+
+    def get_field_names(self):
+        """
+        Return the names of the values of the samples.
+        """
+        return self._field_names()
+
+    def get_times_ns(self):
+        """
+        Return a list of the times of the samples as nanoseconds since the
+        epoch.
+        """
+        return self.__cached('time_ns', self._times_ns)
+
+    def get_times(self):
+        """
+        Return a list of the times of the samples as UTC datetimes.
+        """
+        return self.__cached('time', lambda: [binary_sample_log.ns_to_datetime(t)
+                                              for t in self.get_times_ns()])
+
+    def get_ids(self):
+        """
+        Return a list of the sensor id of each sample.
+        """
+        return self.__cached('id', self._ids)
+
+    def get_column(self, name):
+        """
+        Return a list of the values of the field called name, or the
+        field at index name if name is an int.
+        """
+        if 0 == self.get_count():
+            return []
+        if isinstance(name, int):
+            k = name
+        else:
+            names = self.get_field_names()
+            if name not in names:
+                raise KeyError('no field "{}" in {}'.format(name, names))
+            k = names.index(name)
+        return self.__cached(k, lambda: self._column(k))
+
+    def get_min(self, name):
+        """
+        Return the smallest value of a field or None if there are no samples.
+        """
+        column = self.get_column(name)
+        return min(column) if column else None
+
+    def get_max(self, name):
+        """
+        Return the largest value of a field or None if there are no samples.
+        """
+        column = self.get_column(name)
+        return max(column) if column else None
+
+
+class TextQueryResult(SampleQueryResult):
+    """
+    Samples from the lines of a text log between two offsets.
+    """
+    def __init__(self, data, sensor_id, field_names):
+        super().__init__()
+        self.__data = data
+        self.__sensor_id = None if sensor_id is None else str(sensor_id).encode('UTF-8')
+        self.__field_names = field_names
+
+    def _load_rows(self):
+        rows = [line.split() for line in self.__data.splitlines()]
+        rows = [r for r in rows if len(r) > 3]
+        if self.__sensor_id is not None:
+            rows = [r for r in rows if r[2] == self.__sensor_id]
+        self.__data = None
+        return rows
+
+    def _field_names(self):
+        if self.__field_names is None:
+            rows = self._get_rows()
+            if not rows:
+                return ()
+            type_name = rows[0][1].decode('UTF-8')
+            names = sample_writer.FIELD_NAMES_BY_TYPE.get(type_name)
+            if names is None or len(names) != len(rows[0]) - 3:
+                names = tuple(['value_{}'.format(n) for n in range(len(rows[0]) - 3)])
+            self.__field_names = names
+        return self.__field_names
+
+    def _times_ns(self):
+        return [parse_timestamp(r[0]) for r in self._get_rows()]
+
+    def _ids(self):
+        return [r[2].decode('UTF-8') for r in self._get_rows()]
+
+    def _column(self, k):
+        return [float(r[3 + k]) for r in self._get_rows()]
+
+
+class BinaryQueryResult(SampleQueryResult):
+    """
+    Samples from the records of a binary log.
+    """
+    def __init__(self, data, header):
+        super().__init__()
+        self.__data = data
+        self.__header = header
+
+    def _load_rows(self):
+        rows = list(struct.iter_unpack(self.__header['record_format'], self.__data))
+        self.__data = None
+        return rows
+
+    def _field_names(self):
+        return tuple(self.__header['fields'])
+
+    def _times_ns(self):
+        return [r[0] for r in self._get_rows()]
+
+    def _ids(self):
+        return [self.__header['sensor_id']] * self.get_count()
+
+    def _column(self, k):
+        return [r[1 + k] for r in self._get_rows()]
+
+
+class CombinedQueryResult(SampleQueryResult):
+    """
+    The samples of a list of results, in order.
+    """
+    def __init__(self, results):
+        super().__init__()
+        self.__results = results
+
+    def _load_rows(self):
+        return [row for r in self.__results for row in r._get_rows()]
+
+    def _field_names(self):
+        for r in self.__results:
+            if r.get_count():
+                return r.get_field_names()
+        return ()
+
+    def _times_ns(self):
+        return [t for r in self.__results for t in r.get_times_ns()]
+
+    def _ids(self):
+        return [i for r in self.__results for i in r.get_ids()]
+
+    def _column(self, k):
+        return [v for r in self.__results for v in r.get_column(k)]
+
+
+class _RecordTimes:
+    """
+    Sequence of the times of the records of a binary log for bisect.
+    """
+    def __init__(self, mm, offset, record_size):
+        self.__mm = mm
+        self.__offset = offset
+        self.__record_size = record_size
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<q', self.__mm, self.__offset + i * self.__record_size)[0]
+
+
+class SampleLog:
+    """
+    A text or binary sample log which can be queried by time.
+    
+    field_names names the values of a text log if they are not the ones
+    in sample_writer.FIELD_NAMES_BY_TYPE.
+    """
+    def __init__(self, filename, index_stride=DEFAULT_INDEX_STRIDE, field_names=None):
+        if index_stride < 1:
+            raise ValueError('index_stride must be >= 1')
+        self.__filename = filename
+        self.__index_stride = index_stride
+        self.__field_names = field_names
+        self.__mm = None
+        self.__size = 0
+        self.__header = None
+        self.__data_offset = 0
+        if filename.endswith(sample_writer.COMPRESSED_SUFFIX):
+            # a finished segment, it will not change so keep it in memory
+            self.__file = None
+            with gzip.open(filename, 'rb') as f:
+                data = f.read()
+            self.__size = len(data)
+            if data:
+                self.__mm = mmap.mmap(-1, len(data))
+                self.__mm.write(data)
+                self.__mm.seek(0)
+            f = io.BytesIO(data[:64 * 1024])
+        else:
+            self.__file = open(filename, 'rb')
+            f = self.__file
+        magic = f.read(len(binary_sample_log.MAGIC))
+        if magic == binary_sample_log.MAGIC:
+            self.__header, self.__data_offset = binary_sample_log.read_header(f)
+        self.__index_times = array.array('q')
+        self.__index_offsets = array.array('q')
+        self.__indexed_size = 0
+        self.__index_loaded = False
+        self.__saved_length = 0
+
+    def close(self):
+        if self.__mm is not None:
+            self.__mm.close()
+            self.__mm = None
+        if self.__file is not None:
+            self.__file.close()
+
+    def is_binary(self):
+        return self.__header is not None
+
+    def get_index_filename(self):
+        return self.__filename + INDEX_FILENAME_SUFFIX
+
+    def get_index_length(self):
+        """
+        Return the number of entries in the index.
+        """
+        return len(self.__index_times)
+
+    def __map(self):
+        """
+        Map the log again if it has grown and return its size.
+        """
+        if self.__file is None:
+            return self.__size
+        size = os.fstat(self.__file.fileno()).st_size
+        if size != self.__size or self.__mm is None:
+            if self.__mm is not None:
+                self.__mm.close()
+                self.__mm = None
+            if size:
+                self.__mm = mmap.mmap(self.__file.fileno(), size, access=mmap.ACCESS_READ)
+            self.__size = size
+        return size
+
+    def __line_time(self, start):
+        """
+        Return (time of the line at offset start or None if it can not be
+        parsed, offset of the next line) or (None, None) if there is no
+        complete line at start.
+        """
+        end = self.__mm.find(b'\n', start)
+        if end < 0:
+            return None, None
+        field_end = self.__mm.find(b' ', start, end)
+        try:
+            t = parse_timestamp(self.__mm[start:field_end if 0 <= field_end else end])
+        except ValueError:
+            t = None
+        return t, end + 1
+
+    def __complete_size(self):
+        """
+        Return the offset just past the last complete line.
+        """
+        return self.__mm.rfind(b'\n', 0, self.__size) + 1
+
+    def __load_index(self):
+        try:
+            with open(self.get_index_filename(), 'rb') as f:
+                header = f.read(struct.calcsize(INDEX_HEADER_FORMAT))
+                magic, stride, indexed_size = struct.unpack(INDEX_HEADER_FORMAT, header)
+                if magic != INDEX_MAGIC or stride != self.__index_stride:
+                    return False
+                entries = array.array('q')
+                entries.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return False
+        if indexed_size > self.__size:
+            return False  # the log was replaced by a shorter one
+        self.__index_times = entries[0::2]
+        self.__index_offsets = entries[1::2]
+        self.__indexed_size = indexed_size
+        if len(self.__index_offsets):
+            # the first entry must still match the log
+            t, _ = self.__line_time(self.__index_offsets[0])
+            if t != self.__index_times[0]:
+                return False
+        return True
+
+    def __save_index(self):
+        """
+        Append the entries not yet saved to the index file and record the
+        indexed size.
+        """
+        entries = array.array('q')
+        for k in range(self.__saved_length, len(self.__index_times)):
+            entries.append(self.__index_times[k])
+            entries.append(self.__index_offsets[k])
+        header = struct.pack(INDEX_HEADER_FORMAT, INDEX_MAGIC,
+                             self.__index_stride, self.__indexed_size)
+        try:
+            if 0 == self.__saved_length:
+                with open(self.get_index_filename(), 'wb') as f:
+                    f.write(header)
+                    f.write(entries.tobytes())
+            else:
+                with open(self.get_index_filename(), 'r+b') as f:
+                    f.seek(len(header) + self.__saved_length * 2 * entries.itemsize)
+                    f.write(entries.tobytes())
+                    f.seek(0)
+                    f.write(header)
+            self.__saved_length = len(self.__index_times)
+        except OSError:
+            pass  # an index which can not be saved is built again next time
+
+    def update_index(self):
+        """
+        Index the part of a text log added since the last update and
+        return the number of new index entries.
+        """
+        if self.is_binary():
+            return 0
+        size = self.__map()
+        if 0 == size:
+            return 0
+        if not self.__index_loaded:
+            self.__index_loaded = True
+            if self.__load_index():
+                self.__saved_length = len(self.__index_times)
+            else:
+                self.__index_times = array.array('q')
+                self.__index_offsets = array.array('q')
+                self.__indexed_size = 0
+                self.__saved_length = 0
+        complete_size = self.__complete_size()
+        if complete_size < self.__indexed_size:
+            # the log was truncated, start over
+            self.__index_times = array.array('q')
+            self.__index_offsets = array.array('q')
+            self.__indexed_size = 0
+            self.__saved_length = 0
+        if complete_size <= self.__indexed_size:
+            return 0
+
+        old_length = len(self.__index_times)
+        if old_length:
+            target = self.__index_offsets[-1] + self.__index_stride
+        else:
+            target = 0
+        while target < complete_size:
+            # first line which starts at or after target
+            start = 0 if 0 == target else self.__mm.find(b'\n', target - 1) + 1
+            t = None
+            while t is None and start < complete_size:
+                t, next_start = self.__line_time(start)
+                if t is None:
+                    start = next_start
+            if t is None:
+                break
+            self.__index_times.append(t)
+            self.__index_offsets.append(start)
+            target = start + self.__index_stride
+        self.__indexed_size = complete_size
+        self.__save_index()
+        return len(self.__index_times) - old_length
+
+    def __find_line(self, t, start, limit):
+        """
+        Return the offset of the first line at or after start with a time
+        of t or later, or limit if there is none.
+        """
+        i = bisect.bisect_left(self.__index_times, t) - 1
+        if 0 <= i and self.__index_offsets[i] > start:
+            start = self.__index_offsets[i]
+        while start < limit:
+            line_time, next_start = self.__line_time(start)
+            if line_time is not None and line_time >= t:
+                return start
+            start = next_start
+        return limit
+
+    def query(self, start=None, end=None, sensor_id=None):
+        """
+        Return a SampleQueryResult with the samples taken from start up
+        to, but not including, end.  start and end are datetimes or
+        nanoseconds since the epoch, None means the start or end of the
+        log.  sensor_id picks one sensor from a log which holds many.
+        """
+        start_ns = to_ns(start)
+        end_ns = to_ns(end)
+        if self.is_binary():
+            return self.__query_binary(start_ns, end_ns)
+        self.update_index()
+        if 0 == self.__size:
+            return TextQueryResult(b'', sensor_id, self.__field_names)
+        limit = self.__indexed_size
+        first = 0 if start_ns is None else self.__find_line(start_ns, 0, limit)
+        last = limit if end_ns is None else self.__find_line(end_ns, first, limit)
+        return TextQueryResult(self.__mm[first:last], sensor_id, self.__field_names)
+
+    def __query_binary(self, start_ns, end_ns):
+        size = self.__map()
+        record_size = struct.calcsize(self.__header['record_format'])
+        count = max(0, (size - self.__data_offset) // record_size)
+        if 0 == count:
+            return BinaryQueryResult(b'', self.__header)
+        times = _RecordTimes(self.__mm, self.__data_offset, record_size)
+        first = 0 if start_ns is None else bisect.bisect_left(times, start_ns, 0, count)
+        last = count if end_ns is None else bisect.bisect_left(times, end_ns, first, count)
+        data = self.__mm[self.__data_offset + first * record_size:
+                         self.__data_offset + last * record_size]
+        return BinaryQueryResult(data, self.__header)
+
+    def query_last(self, duration, sensor_id=None):
+        """
+        Return the samples of the last duration (a timedelta) up to now.
+        """
+        start = datetime.datetime.now(datetime.timezone.utc) - duration
+        return self.query(start, None, sensor_id)
+
+
+class SegmentedSampleLog:
+    """
+    A log which SampleWriter splits into segments, see 
+    sample_writer.find_segments().
+    
+    A log written before segments were used is taken to hold the samples
+    from before the first segment.
+    """
+    def __init__(self, filename, index_stride=DEFAULT_INDEX_STRIDE, field_names=None):
+        self.__filename = filename
+        self.__index_stride = index_stride
+        self.__field_names = field_names
+
+    def get_segments(self, start=None, end=None):
+        """
+        Return the names of the segments, oldest first, which may hold
+        samples taken from start up to end.
+        """
+        segments = [(to_ns(t), name)
+                    for t, name in sample_writer.find_segments(self.__filename)]
+        if os.path.exists(self.__filename):
+            segments.insert(0, (None, self.__filename))
+        start_ns = to_ns(start)
+        end_ns = to_ns(end)
+        result = []
+        for k, (segment_start, name) in enumerate(segments):
+            if k + 1 < len(segments):
+                segment_end = segments[k + 1][0]
+            else:
+                segment_end = None
+            if end_ns is not None and segment_start is not None and segment_start >= end_ns:
+                continue
+            if start_ns is not None and segment_end is not None and segment_end <= start_ns:
+                continue
+            result.append(name)
+        return result
+
+    def query(self, start=None, end=None, sensor_id=None):
+        """
+        Return a SampleQueryResult with the samples taken from start up
+        to, but not including, end, see SampleLog.query().
+        """
+        results = []
+        for name in self.get_segments(start, end):
+            log = SampleLog(name, self.__index_stride, self.__field_names)
+            try:
+                results.append(log.query(start, end, sensor_id))
+            finally:
+                log.close()
+        return CombinedQueryResult(results)
+
+    def query_last(self, duration, sensor_id=None):
+        """
+        Return the samples of the last duration (a timedelta) up to now.
+        """
+        start = datetime.datetime.now(datetime.timezone.utc) - duration
+        return self.query(start, None, sensor_id)
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    import sys
+    
+    log = SegmentedSampleLog(sys.argv[1])
+    result = log.query_last(datetime.timedelta(hours=24))
+    for name in result.get_field_names():
+        print('{} : {} samples, min {} max {}'.format(name,
+                                                      result.get_count(),
+                                                      result.get_min(name),
+                                                      result.get_max(name)))
@@ -0,0 +1,620 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Write samples from many sensors to their log files.
+
+A single SampleWriter is shared by all the sensors sampled in a process.
+Samples are put on a bounded queue so the sampling threads never wait on
+storage.  A writer thread collects them into batches and writes each
+batch to a file with one write, which on the SD cards of a Raspberry Pi
+saves a lot of small flash writes.
+
+A batch is written when batch_count samples are waiting or the oldest
+waiting sample is batch_time seconds old.  fsync_policy sets when the
+files are forced to storage:
+  FSYNC_NEVER     -- leave it to the operating system
+  FSYNC_BATCH     -- after every batch (group commit)
+  FSYNC_INTERVAL  -- after a batch if fsync_interval seconds have passed
+                     since the last fsync
+
+If the queue fills, because storage is stalled, new samples are dropped
+and counted rather than blocking the sampler.
+
+log_format picks how samples are written:
+  FORMAT_TEXT    -- lines in the format of
+                      <UTC-Timestamp> <Device-Type> <ID> <Data>+
+  FORMAT_BINARY  -- fixed size records in one file per sensor, see
+                    binary_sample_log.py for the format and the name of
+                    the file
+
+Logs can be split into segments so no file grows without bound.  rotate
+starts a new segment each ROTATE_HOURLY or ROTATE_DAILY period (by the
+UTC time of the samples) and rotate_size starts a new segment when one
+has grown to that many bytes.  Each segment is named for the time it
+starts, e.g. a log of
+  /opt/Sensors/logs/DS18B20.log
+is written to segments like
+  /opt/Sensors/logs/DS18B20.20261017T000000Z.log
+so readers can tell from the names which segments hold a time range, see
+find_segments().  With compress the segments are gzipped once the writer
+moves on to the next one.  The segment being written when the writer is
+closed is left uncompressed so it can be appended to when sampling starts
+again, other segments found uncompressed when a log is first written, e.g.
+after a crash, are compressed then.
+"""
+
+import datetime
+import glob
+import gzip
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import binary_sample_log
+
+OUTPUT_FORMAT = '{} {} {} {}\n' # when what id data+
+FLOAT_FORMAT = '{:.3f}'
+PLAIN_FORMAT = '{}'  # as SampleOnDemandSensors.py has always written
+
+FSYNC_NEVER = 'never'
+FSYNC_BATCH = 'batch'
+FSYNC_INTERVAL = 'interval'
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_BATCH, FSYNC_INTERVAL)
+
+FORMAT_TEXT = 'text'
+FORMAT_BINARY = 'binary'
+LOG_FORMATS = (FORMAT_TEXT, FORMAT_BINARY)
+
+ROTATE_NEVER = 'never'
+ROTATE_HOURLY = 'hourly'
+ROTATE_DAILY = 'daily'
+ROTATE_POLICIES = (ROTATE_NEVER, ROTATE_HOURLY, ROTATE_DAILY)
+
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+SEGMENT_SUFFIXES = ('.log', '.bin')
+COMPRESSED_SUFFIX = '.gz'
+
+DEFAULT_LOG_FORMAT = FORMAT_TEXT
+DEFAULT_ROTATE = ROTATE_NEVER
+DEFAULT_ROTATE_SIZE = 0  # bytes, 0 for no limit
+
+# names of the values logged for each type of sensor
+FIELD_NAMES_BY_TYPE = {'BME280': ('temp_C', 'pressure', 'rel_hum'),
+                       'BMP280': ('temp_C', 'pressure'),
+                       'DS18B20': ('temp_C',),
+                       'HTU21D': ('temp_C', 'rel_hum'),
+                       'Si7013': ('temp_C', 'rel_hum'),
+                       'Si7020': ('temp_C', 'rel_hum'),
+                       'Si7021': ('temp_C', 'rel_hum')}
+DEFAULT_BATCH_COUNT = 64
+DEFAULT_BATCH_TIME_IN_SECONDS = 5.0
+DEFAULT_FSYNC_POLICY = FSYNC_NEVER
+DEFAULT_FSYNC_INTERVAL_IN_SECONDS = 60.0
+DEFAULT_QUEUE_SIZE = 10000
+WRITER_CHECK_INTERVAL_IN_SECONDS = 1.0  # how often flush() and close() check the writer is alive
+
+
+def format_value(value, float_format=FLOAT_FORMAT):
+    """
+    Return a value as it is written in a log file.
+    """
+    if isinstance(value, float):
+        return float_format.format(value)
+    return str(value)
+
+
+def format_sample(when, sensor_type_name, sensor_id, data, float_format=FLOAT_FORMAT):
+    """
+    Return a log line for one sample.
+    
+    when is a datetime, data is a tuple of values.
+    """
+    return OUTPUT_FORMAT.format(when.isoformat(),
+                                sensor_type_name,
+                                sensor_id,
+                                ' '.join([format_value(v, float_format) for v in data]))
+
+
+def rotation_period(when, rotate):
+    """
+    Return the UTC start of the rotation period which holds when or None
+    if the log is not rotated by time.
+    """
+    when = when.astimezone(datetime.timezone.utc)
+    if rotate == ROTATE_HOURLY:
+        return when.replace(minute=0, second=0, microsecond=0)
+    if rotate == ROTATE_DAILY:
+        return when.replace(hour=0, minute=0, second=0, microsecond=0)
+    return None
+
+
+def split_suffix(filename):
+    """
+    Return (filename without suffix, suffix) where the suffix is one of
+    SEGMENT_SUFFIXES or ''.
+    """
+    for suffix in SEGMENT_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)], suffix
+    return filename, ''
+
+
+def segment_filename(filename, start):
+    """
+    Return the name of the segment of the log filename which starts at
+    the datetime start.
+    """
+    stem, suffix = split_suffix(filename)
+    return '{}.{}{}'.format(stem,
+                            start.astimezone(datetime.timezone.utc).strftime(SEGMENT_TIME_FORMAT),
+                            suffix)
+
+
+def find_segments(filename):
+    """
+    Return a list of (start datetime, segment filename), oldest first, of
+    the segments of the log filename, including compressed ones.
+    """
+    stem, suffix = split_suffix(filename)
+    pattern = glob.escape(stem) + '.*' + suffix
+    segments = []
+    for name in set(glob.glob(pattern) + glob.glob(pattern + COMPRESSED_SUFFIX)):
+        stamp = name
+        if stamp.endswith(COMPRESSED_SUFFIX):
+            stamp = stamp[:-len(COMPRESSED_SUFFIX)]
+        stamp = stamp[len(stem) + 1:len(stamp) - len(suffix)]
+        try:
+            start = datetime.datetime.strptime(stamp, SEGMENT_TIME_FORMAT)
+        except ValueError:
+            continue  # not a segment, e.g. an index file
+        segments.append((start.replace(tzinfo=datetime.timezone.utc), name))
+    segments.sort()
+    return segments
+
+
+def add_writer_arguments(parser):
+    """
+    Add the command-line arguments which pick how samples are written to
+    an argparse parser.
+    """
+    parser.add_argument('-f', '--format',
+                        help='write the log as "text" or "binary"',
+                        choices=LOG_FORMATS,
+                        default=DEFAULT_LOG_FORMAT)
+    parser.add_argument('-r', '--rotate',
+                        help='start a new log segment every hour or day',
+                        choices=ROTATE_POLICIES,
+                        default=DEFAULT_ROTATE)
+    parser.add_argument('--rotate_size',
+                        help='start a new log segment after this many MB',
+                        type=float,
+                        default=0)
+    parser.add_argument('-z', '--compress',
+                        help='gzip log segments when they are done',
+                        action='store_true')
+
+
+def get_writer_options(args):
+    """
+    Return the SampleWriter keyword arguments for command-line arguments
+    added by add_writer_arguments().
+    """
+    return {'log_format': args.format,
+            'rotate': args.rotate,
+            'rotate_size': int(args.rotate_size * 1024 * 1024),
+            'compress': args.compress}
+
+
+class SampleWriter:
+    """
+    Append samples to log files which are opened when first needed and
+    kept open till close() is called.
+    
+    Samples are written in batches from a background thread.  Call 
+    flush() to write everything queued so far and close() when done.
+    """
+    def __init__(self,
+                 batch_count=DEFAULT_BATCH_COUNT,
+                 batch_time=DEFAULT_BATCH_TIME_IN_SECONDS,
+                 fsync_policy=DEFAULT_FSYNC_POLICY,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL_IN_SECONDS,
+                 queue_size=DEFAULT_QUEUE_SIZE,
+                 log_format=DEFAULT_LOG_FORMAT,
+                 rotate=DEFAULT_ROTATE,
+                 rotate_size=DEFAULT_ROTATE_SIZE,
+                 compress=False):
+        if batch_count < 1:
+            raise ValueError('batch_count must be >= 1')
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError('fsync_policy "{}" is not one of {}'.format(fsync_policy,
+                                                                       FSYNC_POLICIES))
+        if log_format not in LOG_FORMATS:
+            raise ValueError('log_format "{}" is not one of {}'.format(log_format,
+                                                                     LOG_FORMATS))
+        if rotate not in ROTATE_POLICIES:
+            raise ValueError('rotate "{}" is not one of {}'.format(rotate,
+                                                                 ROTATE_POLICIES))
+        self.__log_format = log_format
+        self.__rotate = rotate
+        self.__rotate_size = rotate_size
+        self.__compress = compress
+        self.__batch_count = batch_count
+        self.__batch_time = batch_time
+        self.__fsync_policy = fsync_policy
+        self.__fsync_interval = fsync_interval
+        self.__queue = queue.Queue(queue_size)
+        self.__stats_lock = threading.Lock()
+        self.__stats = {'samples': 0,
+                        'batches': 0,
+                        'writes': 0,
+                        'fsyncs': 0,
+                        'dropped': 0,
+                        'rotations': 0,
+                        'errors': 0}
+        # only the writer thread uses these
+        self.__files = {}
+        self.__pending = {}
+        self.__pending_count = 0
+        self.__segments = {}  # log filename: [segment filename, period]
+        self.__size_checked = set()
+        self.__retired = []
+        self.__last_fsync_time = time.monotonic()
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run,
+                                         name='SampleWriter',
+                                         daemon=True)
+        self.__thread.start()
+
+    def get_log_format(self):
+        """
+        Return the format the samples are written in.
+        """
+        return self.__log_format
+
+    def write_samples(self, filename, samples, when=None, field_names=None,
+                      value_format=None):
+        """
+        Queue samples to be appended to filename and return at once.
+        
+        samples is a list of (<sensor type name>, <sensor id>, <data tuple>)
+        as returned by Sensor.retrieve_samples().  when is the datetime of
+        the samples and defaults to now.  field_names names the values in
+        the data tuples for the header of a binary log, they are called
+        value_0, value_1, ... if not given.  value_format is the format of
+        float values in a text log, FLOAT_FORMAT if not given.
+        
+        Return False if the queue was full and the samples were dropped.
+        """
+        if self.__closed:
+            raise ValueError('writer is closed')
+        if not self.__thread.is_alive():
+            # nothing would ever write them
+            with self.__stats_lock:
+                self.__stats['dropped'] += len(samples)
+            return False
+        if when is None:
+            when = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            self.__queue.put_nowait((filename, when, samples, field_names,
+                                     value_format or FLOAT_FORMAT))
+        except queue.Full:
+            with self.__stats_lock:
+                self.__stats['dropped'] += len(samples)
+            return False
+        return True
+
+    def flush(self):
+        """
+        Write all the samples queued so far and wait till that is done.
+        Return False if the writer thread is gone and they were not written.
+        """
+        done = threading.Event()
+        if not self.__put_control(done):
+            return False
+        while not done.wait(WRITER_CHECK_INTERVAL_IN_SECONDS):
+            if not self.__thread.is_alive():
+                return False
+        return True
+
+    def close(self):
+        """
+        Write all queued samples and close all the log files.
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        if self.__put_control(None):
+            self.__thread.join()
+
+    def __put_control(self, item):
+        """
+        Queue a flush or close request, waiting for room while the writer
+        thread is alive.  Return False if the thread is gone.
+        """
+        while self.__thread.is_alive():
+            try:
+                self.__queue.put(item, timeout=WRITER_CHECK_INTERVAL_IN_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        print('sample writer thread is not running', file=sys.stderr, flush=True)
+        return False
+
+    def get_stats(self):
+        """
+        Return a dictionary of counts of samples, batches, write calls,
+        fsync calls, dropped samples, segment rotations and write errors.
+        """
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    def __run(self):
+        batch_deadline = None
+        while True:
+            if batch_deadline is None:
+                timeout = None
+            else:
+                timeout = max(0.0, batch_deadline - time.monotonic())
+            try:
+                item = self.__queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # batch time is up
+
+            if isinstance(item, tuple):
+                filename, when, samples, field_names, value_format = item
+                self.__pending.setdefault(filename, []).append((when, samples, field_names,
+                                                                value_format))
+                self.__pending_count += len(samples)
+                if batch_deadline is None:
+                    batch_deadline = time.monotonic() + self.__batch_time
+                if self.__pending_count < self.__batch_count and \
+                        time.monotonic() < batch_deadline:
+                    continue
+                self.__safe_write_batch()
+            else:
+                self.__safe_write_batch()
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    self.__close_files()
+                    return
+            batch_deadline = None
+
+    def __safe_write_batch(self):
+        """
+        Write the pending samples.  An unexpected error drops the batch
+        and is counted and reported, so the writer thread keeps running.
+        """
+        try:
+            self.__write_batch()
+        except Exception as ex:
+            print('writing a batch of {} samples failed with "{!r}"'.format(self.__pending_count, ex),
+                  file=sys.stderr, flush=True)
+            with self.__stats_lock:
+                self.__stats['dropped'] += self.__pending_count
+                self.__stats['errors'] += 1
+            self.__pending = {}
+            self.__pending_count = 0
+            self.__retired = []
+
+    def __write_batch(self):
+        if not self.__pending:
+            return
+        fsync = (self.__fsync_policy == FSYNC_BATCH or
+                 (self.__fsync_policy == FSYNC_INTERVAL and
+                  time.monotonic() - self.__last_fsync_time >= self.__fsync_interval))
+        writes = 0
+        fsyncs = 0
+        errors = 0
+        if self.__log_format == FORMAT_BINARY:
+            chunks, errors = self.__pack_binary()
+        else:
+            chunks = {}
+            for filename, entries in self.__pending.items():
+                for when, samples, _, value_format in entries:
+                    name = self.__segment(filename, when)
+                    chunks.setdefault(name, []).extend([format_sample(when, t, i, d, value_format)
+                                                        for t, i, d in samples])
+            chunks = dict([(name, ''.join(c)) for name, c in chunks.items()])
+        for filename, data in chunks.items():
+            try:
+                output = self.__open(filename)
+                output.write(data)
+                output.flush()
+                writes += 1
+                if fsync:
+                    os.fsync(output.fileno())
+                    fsyncs += 1
+            except OSError as ex:
+                # keep going so one bad file does not stop the others
+                errors += 1
+                print('writing "{}" failed with "{}"'.format(filename, ex),
+                      file=sys.stderr, flush=True)
+        if fsync:
+            self.__last_fsync_time = time.monotonic()
+        rotations = len(self.__retired)
+        errors += self.__retire_segments()
+        with self.__stats_lock:
+            self.__stats['samples'] += self.__pending_count
+            self.__stats['batches'] += 1
+            self.__stats['writes'] += writes
+            self.__stats['fsyncs'] += fsyncs
+            self.__stats['rotations'] += rotations
+            self.__stats['errors'] += errors
+        self.__pending = {}
+        self.__pending_count = 0
+
+    def __pack_binary(self):
+        """
+        Return ({binary filename: records as bytes}, error count) for the
+        pending samples.
+        """
+        chunks = {}
+        errors = 0
+        for filename, entries in self.__pending.items():
+            for when, samples, field_names, _ in entries:
+                for t, i, d in samples:
+                    name = self.__segment(binary_sample_log.binary_filename(filename, i),
+                                          when)
+                    try:
+                        output = self.__files.get(name)
+                        if output is None:
+                            names = field_names
+                            if names is None:
+                                names = ['value_{}'.format(n) for n in range(len(d))]
+                            output = binary_sample_log.BinarySampleLog(name, t, i, names)
+                            self.__files[name] = output
+                        chunks.setdefault(name, []).append(output.pack(when, d))
+                    except (OSError, ValueError, TypeError, struct.error) as ex:
+                        errors += 1
+                        print('packing sample for "{}" failed with "{}"'.format(name, ex),
+                              file=sys.stderr, flush=True)
+        return dict([(name, b''.join(c)) for name, c in chunks.items()]), errors
+
+    def __segment_size(self, name):
+        try:
+            return os.path.getsize(name)
+        except OSError:
+            return 0
+
+    def __segment(self, filename, when):
+        """
+        Return the name of the file to write a sample of the log filename
+        taken at when, starting a new segment if it is time to.
+        """
+        if self.__rotate == ROTATE_NEVER and not self.__rotate_size:
+            return filename
+        current = self.__segments.get(filename)
+        name = self.__segment_name(filename, when, current)
+        if current is not None and name == current[0]:
+            return name
+        self.__retire_previous(filename, current, name)
+        self.__segments[filename] = [name, rotation_period(when, self.__rotate)]
+        self.__size_checked.add(filename)
+        return name
+
+    def __segment_name(self, filename, when, current):
+        """
+        Return the name of the segment of the log filename a sample taken
+        at when belongs in.  current is the [segment filename, period] being
+        written or None.  The size of the current segment is only looked at
+        once per batch.
+        """
+        period = rotation_period(when, self.__rotate)
+        if current is not None:
+            if period is not None and period < current[1]:
+                return current[0]  # late sample, keep it in the current segment
+            if period == current[1]:
+                if (not self.__rotate_size or
+                        filename in self.__size_checked):
+                    return current[0]
+                self.__size_checked.add(filename)
+                if self.__segment_size(current[0]) < self.__rotate_size:
+                    return current[0]
+                period = None  # name the new segment for this sample
+        name = segment_filename(filename, when if period is None else period)
+        if (self.__rotate_size and period is not None and
+                self.__segment_size(name) >= self.__rotate_size):
+            name = segment_filename(filename, when)
+        return name
+
+    def __retire_previous(self, filename, current, name):
+        """
+        Have __retire_segments() close, and compress, the segment being
+        replaced by name.  When the log filename is first written there is
+        none, but segments an earlier run left uncompressed are compressed.
+        """
+        if current is not None:
+            self.__retired.append(current[0])
+        elif self.__compress:
+            for _, segment in find_segments(filename):
+                if not segment.endswith(COMPRESSED_SUFFIX) and segment != name:
+                    self.__retired.append(segment)
+
+    def __retire_segments(self):
+        """
+        Close, and compress if asked to, the segments which were replaced
+        by new ones during the batch.  Return the number of errors.
+        """
+        errors = 0
+        for name in self.__retired:
+            output = self.__files.pop(name, None)
+            try:
+                if output is not None:
+                    if self.__fsync_policy != FSYNC_NEVER:
+                        os.fsync(output.fileno())
+                    output.close()
+                if self.__compress and os.path.exists(name):
+                    with open(name, 'rb') as f_in, \
+                            gzip.open(name + COMPRESSED_SUFFIX, 'wb') as f_out:
+                        while True:
+                            data = f_in.read(1024 * 1024)
+                            if not data:
+                                break
+                            f_out.write(data)
+                    os.remove(name)
+            except OSError as ex:
+                errors += 1
+                print('closing segment "{}" failed with "{}"'.format(name, ex),
+                      file=sys.stderr, flush=True)
+        self.__retired = []
+        self.__size_checked = set()
+        return errors
+
+    def __open(self, filename):
+        output = self.__files.get(filename)
+        if output is None:
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            output = open(filename, 'a')
+            self.__files[filename] = output
+        return output
+
+    def __close_files(self):
+        for filename, output in self.__files.items():
+            try:
+                if self.__fsync_policy != FSYNC_NEVER:
+                    os.fsync(output.fileno())
+                output.close()
+            except Exception as ex:
+                # close the rest anyway
+                with self.__stats_lock:
+                    self.__stats['errors'] += 1
+                print('closing "{}" failed with "{!r}"'.format(filename, ex),
+                      file=sys.stderr, flush=True)
+        self.__files = {}
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    writer = SampleWriter()
+    writer.write_samples('./sample_writer_test.log',
+                         [('test_sensor', 0, (42, 3.14159))])
+    writer.close()
@@ -24,8 +24,8 @@ SOFTWARE.
 
 @author: pgcrumley@gmail.com
 
-Capture data from a device attached to a Raspberry Pi and 
-periodically send the results to a file.
+Capture data from devices attached to a Raspberry Pi and 
+periodically send the results to files.
 
 send data in format of:
   <UTC-Timestamp> <Device-Type> <ID> <Data>+
@@ -33,87 +33,317 @@ send data in format of:
 """
 
 import datetime
+import heapq
+import itertools
+import random
+import sys
+import threading
 import time
 from sensor import Sensor
+from sample_writer import SampleWriter
 
 DEBUG = 1
-if DEBUG:
-    import sys
 
 DEFAULT_SAMPLE_INTERVAL_IN_SECONDS = 60 * 10
-OUTPUT_FORMAT = '{} {} {} {}\n' # when what id data+
-DEFAULT_FILENAME_FORMAT = '/opt/Sensors/logs/{}_{}.log'
+
+
+class SamplingJob:
+    """
+    A function the SamplingScheduler calls every interval seconds.
+    
+    The job first runs phase seconds after the scheduler starts, then on a
+    fixed grid of interval seconds so run times do not drift.  Each run is
+    delayed by a random amount up to jitter seconds so jobs with the same
+    interval do not all hit a bus at the same moment.
+    """
+    def __init__(self, function, interval, phase=0.0, jitter=0.0, name=None):
+        if interval <= 0:
+            raise ValueError('interval must be > 0')
+        if phase < 0:
+            raise ValueError('phase must be >= 0')
+        if jitter < 0 or jitter >= interval:
+            raise ValueError('jitter must be >= 0 and < interval')
+        self.__function = function
+        self.__interval = interval
+        self.__phase = phase
+        self.__jitter = jitter
+        self.__name = name if name else repr(function)
+        self.__next_slot = None
+        self.__run_count = 0
+        self.__missed_count = 0
+        self.__max_lateness = 0.0
+
+    def get_name(self):
+        return self.__name
+
+    def get_interval(self):
+        return self.__interval
+
+    def get_run_count(self):
+        """
+        Return the number of times the job has run.
+        """
+        return self.__run_count
+
+    def get_missed_count(self):
+        """
+        Return the number of scheduled runs which were skipped because
+        the job was more than one interval late.
+        """
+        return self.__missed_count
+
+    def get_max_lateness(self):
+        """
+        Return the largest number of seconds a run started after it was due.
+        """
+        return self.__max_lateness
+
+    def _start(self, start_time):
+        """
+        Set the first slot and return the time of the first run.
+        """
+        self.__next_slot = start_time + self.__phase
+        return self.__next_slot + self.__random_delay()
+
+    def _run(self, due_time, now):
+        """
+        Call the function for a run which was due at due_time.
+        """
+        lateness = now - due_time
+        if lateness > self.__max_lateness:
+            self.__max_lateness = lateness
+        self.__run_count += 1
+        self.__function()
+
+    def _advance(self):
+        """
+        Move to the next slot on the grid which is still in the future
+        and return (time of next run, number of slots missed).
+        """
+        self.__next_slot += self.__interval
+        missed = 0
+        now = time.monotonic()
+        if self.__next_slot <= now:
+            missed = int((now - self.__next_slot) // self.__interval) + 1
+            self.__next_slot += missed * self.__interval
+            self.__missed_count += missed
+        return self.__next_slot + self.__random_delay(), missed
+
+    def __random_delay(self):
+        if self.__jitter:
+            return random.uniform(0.0, self.__jitter)
+        return 0.0
+
+
+class SamplingScheduler:
+    """
+    Run many SamplingJobs, each at its own interval, from one thread.
+    
+    Jobs are held in a heap ordered by the time of their next run on the
+    time.monotonic() clock so changes to the system time do not disturb
+    the schedule.  The thread sleeps on an Event so stop() takes effect 
+    at once rather than after the current sleep.
+    
+    When a job falls more than one interval behind, the missed runs are
+    skipped rather than run back to back, and missed_function is called
+    with the job and the number of runs skipped.
+    """
+    def __init__(self, missed_function=None):
+        self.__missed_function = missed_function
+        self.__lock = threading.Lock()
+        self.__wake_event = threading.Event()
+        self.__stop_event = threading.Event()
+        self.__jobs = []
+        self.__heap = []
+        self.__sequence = itertools.count()  # keeps heap order stable
+        self.__running = False
+
+    def add_job(self, job):
+        """
+        Add a SamplingJob.  Jobs may be added while the scheduler runs.
+        """
+        with self.__lock:
+            self.__jobs.append(job)
+            if self.__running:
+                self.__push(job._start(time.monotonic()), job)
+        self.__wake_event.set()
+        return job
+
+    def get_jobs(self):
+        """
+        Return a list of the jobs.
+        """
+        with self.__lock:
+            return list(self.__jobs)
+
+    def run(self):
+        """
+        Run jobs as they come due till stop() is called.  A stop() before
+        run() makes it return at once, and run() can be called again once
+        it has returned.
+        """
+        with self.__lock:
+            self.__running = True
+            start_time = time.monotonic()
+            self.__heap = []
+            for job in self.__jobs:
+                self.__push(job._start(start_time), job)
+        try:
+            while not self.__stop_event.is_set():
+                with self.__lock:
+                    if self.__heap:
+                        due_time = self.__heap[0][0]
+                        delay_time = due_time - time.monotonic()
+                    else:
+                        delay_time = None  # nothing to do till a job is added
+                    self.__wake_event.clear()
+                if delay_time is None or 0 < delay_time:
+                    self.__wake_event.wait(delay_time)
+                    continue  # stopped, a job was added, or the delay passed
+
+                with self.__lock:
+                    due_time, _, job = heapq.heappop(self.__heap)
+                try:
+                    job._run(due_time, time.monotonic())
+                except Exception as ex:
+                    # a failing job must not stop the others
+                    print('job {} failed with "{}"'.format(job.get_name(), ex),
+                          file=sys.stderr, flush=True)
+                next_time, missed = job._advance()
+                if missed:
+                    self.__report_missed(job, missed)
+                with self.__lock:
+                    self.__push(next_time, job)
+        finally:
+            with self.__lock:
+                self.__running = False
+                # cleared here, not at the start, so an early stop() is not lost
+                self.__stop_event.clear()
+
+    def stop(self):
+        """
+        Make run() return as soon as the current job, if any, finishes.
+        """
+        self.__stop_event.set()
+        self.__wake_event.set()
+
+    def __push(self, when, job):
+        heapq.heappush(self.__heap, (when, next(self.__sequence), job))
+
+    def __report_missed(self, job, missed):
+        if self.__missed_function:
+            self.__missed_function(job, missed)
+        else:
+            print('job {} missed {} deadline(s), {} total'.format(job.get_name(),
+                                                                  missed,
+                                                                  job.get_missed_count()),
+                  file=sys.stderr, flush=True)
 
 
 class SamplingDriver:
     """
-    Framework to periodically sample a Sensor and append results to a file.
+    Framework to periodically sample Sensors and append results to files.
+    
+    Any number of sensors, each with its own interval and file, can be
+    added with add_sensor().  The sensors are all sampled by a
+    SamplingScheduler from the thread which calls collect_samples() and
+    share one SampleWriter.
     
-    This does not close() the sensor when stop() is called so the same
-    sensor can be used after samples are paused.
+    This does not close() the sensors when stop() is called so the same
+    sensors can be used after samples are paused.
     """ 
     def __init__(self, 
-                 sensor,
+                 sensor=None,
                  interval=DEFAULT_SAMPLE_INTERVAL_IN_SECONDS,
-                 filename=None
+                 filename=None,
+                 writer=None
                  ):
-        self.__sensor = sensor
-        self.__interval = interval
-        if filename:
-            self.__filename = filename
+        if writer:
+            self.__writer = writer
         else:
-            fn = DEFAULT_FILENAME_FORMAT.format(platform.node,
-                                                sensor.get_chip_type)
-            self.__filename = fn
+            self.__writer = SampleWriter()
+        self.__scheduler = SamplingScheduler()
+        if sensor:
+            self.add_sensor(sensor, interval, filename)
+
+    def add_sensor(self,
+                   sensor,
+                   interval=DEFAULT_SAMPLE_INTERVAL_IN_SECONDS,
+                   filename=None,
+                   phase=0.0,
+                   jitter=0.0):
+        """
+        Sample sensor every interval seconds and append results to filename.
+        
+        The first sample is taken phase seconds after collect_samples() is
+        called and each sample is delayed by up to jitter seconds.
+        
+        Return the SamplingJob for the sensor.
+        """
+        if not filename:
+            filename = sensor.get_default_log_filename()
             
         if DEBUG:
-            print('interval: "{}"'.format(self.__interval),
+            print('interval: "{}"'.format(interval),
                   file = sys.stderr, flush=True)
-            print('filename: "{}"'.format(self.__filename),
+            print('phase: "{}" jitter: "{}"'.format(phase, jitter),
                   file = sys.stderr, flush=True)
-            print('type: "{}"'.format(self.__sensor.get_sensor_type_name()),
+            print('filename: "{}"'.format(filename),
                   file = sys.stderr, flush=True)
-            print('id: "{}"'.format(self.__sensor.get_sensor_id()),
+            print('type: "{}"'.format(sensor.get_sensor_type_name()),
                   file = sys.stderr, flush=True)
-        self.__running = False
+            print('id: "{}"'.format(sensor.get_sensor_id()),
+                  file = sys.stderr, flush=True)
+        try:
+            field_names = sensor.get_data_tuple_names()
+        except NotImplementedError:
+            field_names = None
+        name = '{} {}'.format(sensor.get_sensor_type_name(), sensor.get_sensor_id())
+        job = SamplingJob(lambda: self.__sample(sensor, filename, field_names),
+                          interval, phase, jitter, name)
+        return self.__scheduler.add_job(job)
+
+    def get_writer(self):
+        """
+        Return the SampleWriter used for the samples.
+        """
+        return self.__writer
 
+    def get_jobs(self):
+        """
+        Return the SamplingJobs of the sensors.
+        """
+        return self.__scheduler.get_jobs()
 
     def collect_samples(self):
         """
-        Collect samples and send data to the file till stop() is called.
-        """
-        self.__running = True
-        with open(self.__filename, 'a') as output:
-            next_sample_time = time.time()
-            while self.__running:
-                sensor_name = self.__sensor.get_sensor_type_name()
-                sensor_id = self.__sensor.get_sensor_id()
-                data = self.__sensor.retrieve_data_string()    
-                if DEBUG:
-                    print('data: "{}"'.format(data),
-                          file = sys.stderr, flush=True)
-                when = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                result = OUTPUT_FORMAT.format(when,
-                                              sensor_name, 
-                                              sensor_id, 
-                                              data)
-                output.write(result)
-                output.flush()
-                
-                next_sample_time = next_sample_time + self.__interval
-                delay_time = next_sample_time - time.time()
-                if DEBUG:
-                    print('delay_time = {}'.format(delay_time),
-                          file=sys.stderr, flush=True)
-            
-                if 0 < delay_time:  # don't sleep if already next sample time
-                    time.sleep(delay_time)
+        Collect samples and send data to the files till stop() is called.
+        """
+        self.__scheduler.run()
+
+    def __sample(self, sensor, filename, field_names):
+        when = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            samples = sensor.retrieve_samples()
+        except Exception as ex:
+            # one failing sensor must not stop the others
+            print('sampling {} {} failed with "{}"'.format(sensor.get_sensor_type_name(),
+                                                           sensor.get_sensor_id(),
+                                                           ex),
+                  file=sys.stderr, flush=True)
+            return
+        if DEBUG:
+            print('data: "{}"'.format(samples),
+                  file = sys.stderr, flush=True)
+        self.__writer.write_samples(filename, samples, when, field_names,
+                                    sensor.get_value_format())
 
     def stop(self):
         """
-        Stop collecting samples
+        Stop collecting samples.  collect_samples() returns right away
+        unless a sample is being taken.
         """
-        self.__running = False
+        self.__scheduler.stop()
 
 
 class test_sensor(Sensor):
@@ -176,8 +406,9 @@ if __name__ == '__main__':
     driver.stop()
     t.join()
     
-    # close the sensor when finish
+    # close the sensor and log file when finish
     sensor.close()
+    driver.get_writer().close()
     
     
     
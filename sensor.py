@@ -29,6 +29,8 @@ Base class for a variety of sensors
 
 import json
 
+DEFAULT_LOG_FILENAME_FORMAT = '/opt/Sensors/logs/{}_{}.log'  # type id
+
 class Sensor:
     """
     Base class for a variety of sensors.
@@ -129,6 +131,36 @@ class Sensor:
         result = ' '.join([str(i) for i in d])
         return result
     
+    def retrieve_samples(self):
+        """
+        Retrieve data from the sensor and return a list of 
+          (<sensor type name>, <sensor id>, <data tuple>)
+        
+        A Sensor which stands for many devices (e.g. a string of DS18B20s)
+        overrides this to return one entry per device.
+        """
+        if not self.__alive:
+            raise ValueError('device is closed')
+        
+        return [(self.get_sensor_type_name(),
+                 self.get_sensor_id(),
+                 self.retrieve_data_tuple())]
+    
+    def get_default_log_filename(self):
+        """
+        Return the name of the file where samples are logged when no
+        other name is given.
+        """
+        return DEFAULT_LOG_FILENAME_FORMAT.format(self.get_sensor_type_name(),
+                                                  self.get_sensor_id())
+    
+    def get_value_format(self):
+        """
+        Return the format for the values in a text log, or None for the
+        writer's default.
+        """
+        return None
+    
     def retrieve_data(self):
         """
         Retrieve data from the sensor and return it in a JSON dictionary.
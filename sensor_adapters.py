@@ -0,0 +1,285 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Sensor subclasses which wrap the device drivers found in the directories
+of this project so they can be sampled by a SamplingDriver.
+
+Each adapter takes the options which the matching Sample*.py program
+takes and logs to the same file that program uses by default.
+
+make_sensor() creates an adapter from a type name and a dictionary of 
+options such as those found in the configuration of SensorsDaemon.py.
+
+The BME280 and BMP280 adapters get their drivers from the I2cBusManager of
+the process, see i2c_bus_manager.py, so sensors at 0x76 and 0x77 of one
+bus share a bus handle and do not interleave their transfers.
+"""
+
+import sample_writer
+from driver_import import BASE_DIRECTORY, import_driver
+from sensor import Sensor
+
+LOG_DIRECTORY = '/opt/Sensors/logs/'
+
+
+def get_raspberry_pi_serial():
+    """
+    Return the serial number of the Raspberry Pi or 'ID_TBD'.
+    """
+    result = 'ID_TBD'
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                info = line.split()
+                if len(info) > 2 and 'Serial' == info[0]:
+                    result = info[2]
+                    break
+    except OSError:
+        pass
+    return result
+
+
+class BME280_Sensor(Sensor):
+    """
+    A BME280 on an I2C bus.
+    """
+    def __init__(self, i2c_bus=None, i2c_addr=None, profile=None):
+        BME280 = import_driver('BME280', 'BME280')
+        import i2c_bus_manager
+        if i2c_addr is None:
+            i2c_addr = BME280.BME280_DEFAULT_I2C_ADDR
+        if profile is None:
+            profile = BME280.BME280_DEFAULT_PROFILE
+        # sensors on the same bus share one handle and lock
+        manager = i2c_bus_manager.get_default_manager()
+        self.__device = manager.get_driver(i2c_bus, i2c_addr, 'BME280', profile=profile)
+        super().__init__(self.__device.get_chip_type(), self.__device.get_uid())
+
+    def get_data_tuple_names(self):
+        return ('temp_C', 'pressure', 'rel_hum')
+
+    def retrieve_data_tuple(self):
+        return self.__device.retrieve_temperature_pressure_humidity()
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + 'BME280_' + self.get_sensor_id()
+
+
+class BMP280_Sensor(Sensor):
+    """
+    A BMP280 on an I2C bus.
+    """
+    def __init__(self, i2c_bus=None, i2c_addr=None, profile=None):
+        BMP280 = import_driver('BMP280', 'BMP280')
+        import i2c_bus_manager
+        if i2c_addr is None:
+            i2c_addr = BMP280.BMP280_DEFAULT_I2C_ADDR
+        if profile is None:
+            profile = BMP280.BMP280_DEFAULT_PROFILE
+        # sensors on the same bus share one handle and lock
+        manager = i2c_bus_manager.get_default_manager()
+        self.__device = manager.get_driver(i2c_bus, i2c_addr, 'BMP280', profile=profile)
+        super().__init__(self.__device.get_chip_type(), self.__device.get_uid())
+
+    def get_data_tuple_names(self):
+        return ('temp_C', 'pressure')
+
+    def retrieve_data_tuple(self):
+        return self.__device.retrieve_temperature_pressure()
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + 'BMP280_' + self.get_sensor_id()
+
+
+class DS18B20_Sensor(Sensor):
+    """
+    All the DS18B20 devices attached to the w1 bus of the Raspberry Pi.
+    """
+    def __init__(self):
+        DS18B20_Controller = import_driver('DS18B20', 'DS18B20_Controller')
+        self.__controller = DS18B20_Controller.DS18B20_Controller()
+        super().__init__('DS18B20', 'all')
+
+    def close(self):
+        self.__controller.close()
+        super().close()
+
+    def get_data_tuple_names(self):
+        return ('temp_C',)
+
+    def retrieve_data_tuple(self):
+        raise NotImplementedError('use retrieve_samples() for many devices')
+
+    def retrieve_samples(self):
+        temps = self.__controller.retrieve_all_temps()
+        return [(self.get_sensor_type_name(), i, (temps[i],)) for i in temps.keys()]
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + 'DS18B20.log'
+
+
+class DS18B20_via_Arduino_Sensor(Sensor):
+    """
+    All the DS18B20 devices attached to Arduinos on serial ports.
+    
+    ports is a list of port names, by default all likely ports are used.
+    reset_on_open lets opening the ports reset the Arduinos.
+    """
+    def __init__(self, ports=None, reset_on_open=False):
+        Controller = import_driver('DS18B20_via_Arduino',
+                                   'DS18B20_OnDemand_via_Arduino_Controller')
+        if ports is None:
+            ports = Controller.determine_ports()
+        self.__Controller = Controller
+        self.__controllers = Controller.find_DS18B20_device(ports, reset_on_open=reset_on_open)
+        super().__init__(Controller.SENSOR_TYPE_NAME, 'all')
+
+    def close(self):
+        for c in self.__controllers.values():
+            c.close()
+        super().close()
+
+    def get_data_tuple_names(self):
+        return ('temp_C',)
+
+    def retrieve_data_tuple(self):
+        raise NotImplementedError('use retrieve_samples() for many devices')
+
+    def retrieve_samples(self):
+        result = []
+        all_samples = self.__Controller.retrieve_all_temperatures(self.__controllers)
+        for name, c in self.__controllers.items():
+            samples = all_samples[name]
+            for s in samples.keys():
+                result.append((c.get_type(), s, (samples[s],)))
+        return result
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + 'DS18B20-via-Arduinos.log'
+
+    def get_value_format(self):
+        # the temperatures are logged as the Arduinos report them
+        return sample_writer.PLAIN_FORMAT
+
+
+class HTU21D_Sensor(Sensor):
+    """
+    A HTU21D on GPIO pins, or on a hardware I2C bus if i2c_bus is given.
+    
+    The id is the serial number of the Raspberry Pi unless a name is given.
+    """
+    def __init__(self, name=None, id_suffix=None, gpio_clock=None, gpio_data=None,
+                 gpio_backend=None, i2c_bus=None, mode=None, resolution=None,
+                 pipelined=False):
+        HTU21D = import_driver('HTU21D', 'HTU21D')
+        if gpio_clock is None:
+            gpio_clock = HTU21D.DEFAULT_CLOCK_BOARD_PIN
+        if gpio_data is None:
+            gpio_data = HTU21D.DEFAULT_DATA_BOARD_PIN
+        if gpio_backend is None:
+            gpio_backend = import_driver('HTU21D', 'GpioBackend').DEFAULT_BACKEND
+        if mode is None:
+            mode = HTU21D.HTU21D_DEFAULT_MODE
+        if resolution is None:
+            resolution = HTU21D.HTU21D_DEFAULT_RESOLUTION
+        self.__device = HTU21D.HTU21D(gpio_clock=gpio_clock, gpio_data=gpio_data,
+                                      gpio_backend=gpio_backend, i2c_bus=i2c_bus,
+                                      mode=mode, resolution=resolution)
+        self.__pipelined = pipelined
+        self.__retries = HTU21D.DEFAULT_RETRIES
+        sensor_id = name if name else get_raspberry_pi_serial()
+        if id_suffix:
+            sensor_id = sensor_id + '_' + id_suffix 
+        super().__init__(self.__device.get_chip_type(), sensor_id)
+
+    def get_data_tuple_names(self):
+        return ('temp_C', 'rel_hum')
+
+    def retrieve_data_tuple(self):
+        if self.__pipelined:
+            return self.__device.retrieve_temp_humidity_pipelined(self.__retries)
+        return self.__device.retrieve_temp_humidity_with_retries(self.__retries)
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + 'HTU21D_' + self.get_sensor_id()
+
+
+class Si702x_Sensor(Sensor):
+    """
+    A Si702x on GPIO pins, or on a hardware I2C bus if i2c_bus is given.
+    """
+    def __init__(self, id_suffix=None, board_clock_pin=None, board_data_pin=None,
+                 gpio_backend=None, i2c_bus=None, mode=None, resolution=None):
+        Si702x = import_driver('Si702x', 'Si702x')
+        if board_clock_pin is None:
+            board_clock_pin = Si702x.DEFAULT_CLOCK_BOARD_PIN
+        if board_data_pin is None:
+            board_data_pin = Si702x.DEFAULT_DATA_BOARD_PIN
+        if gpio_backend is None:
+            gpio_backend = import_driver('Si702x', 'GpioBackend').DEFAULT_BACKEND
+        if mode is None:
+            mode = Si702x.Si702x_DEFAULT_MODE
+        if resolution is None:
+            resolution = Si702x.Si702x_DEFAULT_RESOLUTION
+        self.__device = Si702x.Si702x(board_clock_pin=board_clock_pin,
+                                      board_data_pin=board_data_pin,
+                                      gpio_backend=gpio_backend,
+                                      i2c_bus=i2c_bus,
+                                      mode=mode,
+                                      resolution=resolution)
+        sensor_id = self.__device.get_chip_eid()
+        if id_suffix:
+            sensor_id = sensor_id + '_' + id_suffix 
+        super().__init__(self.__device.get_chip_type(), sensor_id)
+
+    def get_data_tuple_names(self):
+        return ('temp_C', 'rel_hum')
+
+    def retrieve_data_tuple(self):
+        return self.__device.retrieve_temp_humidity_with_retries()
+
+    def get_default_log_filename(self):
+        return LOG_DIRECTORY + self.get_sensor_type_name() + '_' + self.get_sensor_id()
+
+
+SENSOR_CLASSES = {'BME280': BME280_Sensor,
+                  'BMP280': BMP280_Sensor,
+                  'DS18B20': DS18B20_Sensor,
+                  'DS18B20_via_Arduino': DS18B20_via_Arduino_Sensor,
+                  'HTU21D': HTU21D_Sensor,
+                  'Si702x': Si702x_Sensor}
+
+
+def make_sensor(type_name, options=None):
+    """
+    Create the Sensor for type_name passing options as keyword arguments.
+    """
+    if type_name not in SENSOR_CLASSES:
+        raise ValueError('unknown sensor type "{}", expected one of {}'.format(type_name,
+                                                                            sorted(SENSOR_CLASSES.keys())))
+    if options is None:
+        options = {}
+    return SENSOR_CLASSES[type_name](**options)
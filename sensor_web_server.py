@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+"""
+MIT License
+
+Copyright (c) 2026 Paul G Crumley
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+@author: pgcrumley@gmail.com
+
+Shared serving layer for the *_WebServer.py programs.
+
+A background thread calls a sample function on its own schedule and keeps
+the JSON encoding of the latest result in a cache.  HTTP GET requests are
+handled by a ThreadingHTTPServer and only copy the cached bytes to the
+client so no request ever touches the sensor hardware and a slow sensor
+(e.g. a string of DS18B20 probes) does not block other clients.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEBUG = 0
+
+DEFAULT_REFRESH_INTERVAL_IN_SECONDS = 10
+DEFAULT_FIRST_SAMPLE_TIMEOUT_IN_SECONDS = 30
+# by default a cached sample older than this many refresh intervals is
+# no longer served as good data
+DEFAULT_MAX_AGE_IN_INTERVALS = 3
+
+
+class SampleCache:
+    """
+    Periodically call sample_function from a background thread and hold
+    the JSON encoding of the most recent result.
+
+    sample_function takes no arguments and returns something that can be
+    passed to json.dumps().  If a sample fails the previous result is kept
+    so clients continue to get the last good data, until it is older than
+    max_age seconds (DEFAULT_MAX_AGE_IN_INTERVALS intervals if None).
+    """
+    def __init__(self,
+                 sample_function,
+                 interval=DEFAULT_REFRESH_INTERVAL_IN_SECONDS,
+                 max_age=None):
+        self.__sample_function = sample_function
+        self.__interval = interval
+        if max_age is None:
+            max_age = DEFAULT_MAX_AGE_IN_INTERVALS * interval
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.__have_sample = threading.Event()
+        self.__stop_event = threading.Event()
+        self.__json_bytes = None
+        self.__sample_time = None
+        self.__last_error = None
+        self.__thread = None
+
+    def start(self):
+        """
+        Start the background sampling thread.
+        """
+        if self.__thread is not None:
+            raise ValueError('sample cache already started')
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run,
+                                         name='SampleCache',
+                                         daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop the background sampling thread and wait for it to finish.
+        """
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def refresh(self):
+        """
+        Take a sample now and update the cache.
+        """
+        try:
+            data = self.__sample_function()
+            json_bytes = bytes(json.dumps(data, indent=1), 'utf8')
+        except Exception as ex:
+            if DEBUG:
+                print('sample failed with "{}"'.format(ex),
+                      file=sys.stderr, flush=True)
+            with self.__lock:
+                self.__last_error = ex
+            return
+        with self.__lock:
+            self.__json_bytes = json_bytes
+            self.__sample_time = time.time()
+            self.__last_error = None
+        self.__have_sample.set()
+
+    def get_json_bytes(self,
+                       timeout=DEFAULT_FIRST_SAMPLE_TIMEOUT_IN_SECONDS):
+        """
+        Return the cached JSON as bytes.
+
+        Before the first sample is available wait up to timeout seconds
+        for it and return None if it does not arrive.
+        """
+        if not self.__have_sample.wait(timeout):
+            return None
+        with self.__lock:
+            return self.__json_bytes
+
+    def get_sample_time(self):
+        """
+        Return the time.time() of the cached sample or None.
+        """
+        with self.__lock:
+            return self.__sample_time
+
+    def get_max_age(self):
+        """
+        Return the age in seconds after which the cached sample is stale.
+        """
+        return self.__max_age
+
+    def is_stale(self):
+        """
+        Return True if the cached sample is older than the maximum age.
+        """
+        with self.__lock:
+            sample_time = self.__sample_time
+        return (sample_time is not None and
+                time.time() - sample_time > self.__max_age)
+
+    def get_last_error(self):
+        """
+        Return the exception from the most recent failed sample or None.
+        """
+        with self.__lock:
+            return self.__last_error
+
+    def __run(self):
+        next_sample_time = time.time()
+        while not self.__stop_event.is_set():
+            self.refresh()
+            next_sample_time = next_sample_time + self.__interval
+            delay_time = next_sample_time - time.time()
+            if DEBUG:
+                print('delay_time = {}'.format(delay_time),
+                      file=sys.stderr, flush=True)
+            if 0 < delay_time:  # don't sleep if already next sample time
+                self.__stop_event.wait(delay_time)
+            else:
+                next_sample_time = time.time()
+
+
+class CachedSample_HTTPServer_RequestHandler(BaseHTTPRequestHandler):
+    '''
+    A subclass of BaseHTTPRequestHandler which returns the JSON held
+    in the SampleCache of the server.
+    '''
+
+    def do_GET(self):
+        '''
+        handle the HTTP GET request
+        '''
+        data = self.server.sample_cache.get_json_bytes()
+        if data is None:
+            self.send_response(503)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            error = self.server.sample_cache.get_last_error()
+            result = {'error': str(error) if error else 'no sample available'}
+            self.wfile.write(bytes(json.dumps(result, indent=1), 'utf8'))
+            return
+        if self.server.sample_cache.is_stale():
+            # the sensor has been failing, don't pass old data off as current
+            self.send_response(503)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            error = self.server.sample_cache.get_last_error()
+            result = {'error': str(error) if error else 'sample is stale',
+                      'sample_age': time.time() - self.server.sample_cache.get_sample_time(),
+                      'max_age': self.server.sample_cache.get_max_age()}
+            self.wfile.write(bytes(json.dumps(result, indent=1), 'utf8'))
+            return
+
+        # Send response status code
+        self.send_response(200)
+
+        # Send headers
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+
+        # Write content as utf-8 data
+        self.wfile.write(data)
+        return
+
+    def log_message(self, format, *args):
+        if DEBUG:
+            super().log_message(format, *args)
+
+
+class CachedSampleHTTPServer(ThreadingHTTPServer):
+    '''
+    A ThreadingHTTPServer which serves the contents of a SampleCache.
+    '''
+    daemon_threads = True
+
+    def __init__(self, server_address, sample_cache,
+                 handler_class=CachedSample_HTTPServer_RequestHandler):
+        self.sample_cache = sample_cache
+        super().__init__(server_address, handler_class)
+
+
+def run(server_address,
+        sample_function,
+        interval=DEFAULT_REFRESH_INTERVAL_IN_SECONDS,
+        max_age=None):
+    """
+    Serve the results of sample_function on server_address, refreshing
+    the cached results every interval seconds.  Once the cached results
+    are older than max_age seconds requests get a 503.  Does not return.
+    """
+    sample_cache = SampleCache(sample_function, interval, max_age)
+    sample_cache.start()
+    httpd_server = CachedSampleHTTPServer(server_address, sample_cache)
+    print('running server listening on {}...'.format(server_address))
+    try:
+        httpd_server.serve_forever()
+    finally:
+        sample_cache.stop()
+
+
+#
+# main
+#
+if __name__ == '__main__':
+    #
+    # do something for a quick test
+    #
+    import itertools
+    counter = itertools.count(1)
+
+    def count_samples():
+        return [{'type': 'test', 'id': 0, 'count': next(counter)}]
+
+    run(('127.0.0.1', 8080), count_samples, interval=1)